@@ -1,69 +1,581 @@
 # backend/app.py (SIMPLIFIED)
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, send_file, stream_with_context
 from flask_cors import CORS
+import csv
+import json
 import os
-from datetime import datetime
+from collections import Counter
+from dataclasses import replace
+from datetime import date, datetime
+from services.invoice_store import create_invoice_store
+from services.invoice_archive import invoice_archive
+from services.invoice_numbers import InvoiceNumberAllocator
+from services.bulk_import import import_invoices, read_csv_rows, read_ndjson_rows
+from services.change_feed import invoice_change_feed
+from services.analytics import invoice_analytics, OUTSTANDING_STATUSES
+from services.reconciliation import reconcile_statement, read_statement_csv, read_statement_ofx
+from services.delivery import DeliveryQueue, DeliveryWorkerPool, default_adapters
+from services.invoice_messages import delivery_payload, payment_instructions
+from services.reminder_scheduler import ReminderScheduler
+from services.webhook_inbox import webhook_inbox
+from services.email_generator import TONES, email_generator
+from services.invoice_pdf import pdf_renderer
+from services.metrics import metrics
+from services.profiler import slow_request_profiler
+from services.process_lock import acquire_process_lock
+from validators import validate_field_types, validate_invoice_data
+from records import Channel, Invoice, InvoiceStatus, dumps_invoices, to_cents
+from routes.paypal_payments import paypal_payments
 
 app = Flask(__name__)
 CORS(app)
 
-# Simple database (replace with real DB later)
-invoices = []
+# Per-route latency and query counts on /metrics; PROFILE_SLOW_REQUEST_MS enables profiling
+metrics.init_app(app)
+slow_request_profiler.init_app(app)
+
+# Plans, config and the webhook; checkout needs user accounts, which the app does not have
+app.register_blueprint(paypal_payments, url_prefix='/api/paypal')
+
+# Invoice storage: in-memory by default, INVOICE_STORE=sqlite for a durable store
+invoice_store = create_invoice_store()
+
+# The dashboard has one account; the per-user change feed and analytics keep its invoices under this id
+STORE_USER_ID = 0
+# Invoices read from the store per page while streaming the listing as NDJSON
+STREAM_BATCH_SIZE = 500
+# Most changed invoices returned by one /api/invoices/changes response
+MAX_CHANGES_PAGE_SIZE = 1000
+# Upper bounds for the /api/invoices/analytics query parameters
+MAX_ANALYTICS_WEEKS = 52
+MAX_ANALYTICS_CLIENTS = 100
+
+# Unique per-day invoice numbers, shared across threads and worker processes
+invoice_numbers = InvoiceNumberAllocator()
+
+# Outbound WhatsApp/email sending; handlers only enqueue, workers do the sending
+delivery_queue = DeliveryQueue()
+delivery_workers = DeliveryWorkerPool(delivery_queue, default_adapters())
+
+def invoice_attachment(invoice):
+    """Cached PDF path for emailed invoices; rendering starts in the background"""
+    if invoice.channel != Channel.EMAIL:
+        return None
+    return pdf_renderer.prefetch(invoice)
+
+# Automatic reminders for overdue and soon-due invoices
+reminder_scheduler = ReminderScheduler(invoice_store, delivery_queue, attach=invoice_attachment)
+
+metrics.gauge('delivery_queue_depth', 'Deliveries waiting to be sent, per channel',
+              lambda: {(channel,): delivery_queue.depth(channel) for channel in delivery_workers.adapters},
+              ('channel',))
+metrics.gauge('webhook_inbox_depth', 'PayPal webhook events waiting to be applied', webhook_inbox.depth)
+metrics.gauge('reminders_scheduled', 'Invoices with a pending automatic reminder', reminder_scheduler.pending)
+metrics.gauge('invoices_stored', 'Invoices in the invoice store', invoice_store.count)
+metrics.gauge('invoices_archived', 'Paid invoices moved to the archive', invoice_archive.count)
+
+def find_invoice(invoice_id):
+    """An invoice from the store, or from the archive once it has been archived"""
+    return invoice_store.get(invoice_id) or invoice_archive.get(invoice_id)
+
+def record_changes(changes):
+    """Record (before, after) invoice pairs in the change feed and the analytics rollups.
+
+    `before` is None for a new invoice and `after` is None for one that
+    left the store.
+    """
+    invoice_change_feed.record(STORE_USER_ID, [after.id for before, after in changes if after is not None])
+    invoice_change_feed.record(STORE_USER_ID, [before.id for before, after in changes if after is None],
+                               deleted=True)
+    invoice_analytics.record_many(STORE_USER_ID, [
+        (before and before.status.label, after and after.status.label,
+         invoice.due_date, invoice.client_name, invoice.amount_cents)
+        for before, after in changes
+        for invoice in (before or after,)
+    ])
+
+def invoices_created(created):
+    reminder_scheduler.schedule_many(created)
+    record_changes([(None, invoice) for invoice in created])
+
+def invoices_issued(created):
+    """Invoices created as sent: record them and queue their delivery"""
+    invoices_created(created)
+    delivery_queue.enqueue_many([
+        (invoice.channel.label, delivery_payload(invoice, 'invoice', invoice_attachment(invoice)))
+        for invoice in created
+    ])
+
+def invoices_paid(invoices):
+    record_changes([(invoice, invoice.with_status(InvoiceStatus.PAID)) for invoice in invoices])
+
+def invoices_archived(invoices):
+    record_changes([(invoice, None) for invoice in invoices])
+
+def start_background_workers():
+    """Start this process's background threads.
+
+    Every process sends deliveries (jobs are leased, so workers never
+    double-send); the reminder scheduler, the webhook consumer and the
+    archiver run in exactly one process per host.
+    """
+    delivery_workers.start()
+    if acquire_process_lock('scheduler'):
+        reminder_scheduler.start()
+        webhook_inbox.start()
+        invoice_archive.start_archiver(invoice_store, on_removed=invoices_archived)
 
 @app.route('/api/create-invoice', methods=['POST'])
 def create_invoice():
     data = request.json
+
+    channel = data.get('channel', 'whatsapp')
+    if channel not in delivery_workers.adapters:
+        return jsonify({'success': False, 'error': f"Unsupported channel: {channel}"}), 400
     
-    # Generate invoice number
-    invoice_number = f"INV-{datetime.now().strftime('%Y%m%d')}-{len(invoices)+1}"
-    
-    # Create invoice object
-    invoice = {
-        'id': invoice_number,
-        'business_name': data.get('businessName'),
-        'client_name': data.get('clientName'),
-        'amount': data.get('amount'),
-        'due_date': data.get('dueDate'),
-        'tone': data.get('tone', 'professional'),
-        'channel': data.get('channel', 'whatsapp'),
-        'created_at': datetime.now().isoformat(),
-        'status': 'sent'
-    }
-    
-    invoices.append(invoice)
+    # Create invoice record; it is numbered once it is known to be valid
+    try:
+        invoice = Invoice.create(
+            None,
+            data.get('clientName'),
+            data.get('amount'),
+            business_name=data.get('businessName'),
+            client_email=data.get('clientEmail'),
+            client_phone=data.get('clientPhone'),
+            due_date=data.get('dueDate'),
+            tone=data.get('tone', 'professional'),
+            channel=channel,
+            created_at=datetime.now().isoformat(),
+            status='sent'
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    invoice = replace(invoice, id=invoice_numbers.next_number())
+    invoice_number = invoice.id
     
-    # TODO: Actually send via chosen channel
-    # For now, just log
-    print(f"Would send {invoice_number} via {invoice['channel']} with {invoice['tone']} tone")
+    invoice_store.add(invoice)
+    invoices_issued([invoice])
     
     return jsonify({
         'success': True,
         'invoice_id': invoice_number,
         'message': 'Invoice created successfully',
-        'payment_instructions': {
-            'bank': 'Standard Bank',
-            'account_number': '0123456789',
-            'branch_code': '123456',
-            'reference': invoice_number,
-            'email': 'payments@invoiceaccelerator.co.za'
-        }
+        'payment_instructions': payment_instructions(invoice_number)
     })
 
 @app.route('/api/send-reminder', methods=['POST'])
 def send_reminder():
-    data = request.json
-    invoice_id = data.get('invoice_id')
+    """Queue a reminder for an invoice and mark a pending invoice sent.
+
+    A `message` (the dashboard sends the email it generated) replaces the
+    standard reminder text.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'error': 'Expected a JSON object'}), 400
+    invoice_id, message = data.get('invoice_id'), data.get('message')
+    if message is not None and not isinstance(message, str):
+        return jsonify({'success': False, 'error': 'message must be text'}), 400
     
     # Find invoice
-    invoice = next((i for i in invoices if i['id'] == invoice_id), None)
+    invoice = invoice_store.get(invoice_id) if isinstance(invoice_id, str) else None
     
     if not invoice:
         return jsonify({'success': False, 'error': 'Invoice not found'}), 404
     
-    # TODO: Send reminder via chosen channel
-    print(f"Would send reminder for {invoice_id} via {invoice['channel']}")
+    payload = delivery_payload(invoice, 'reminder', invoice_attachment(invoice))
+    if message and message.strip():
+        payload['message'] = message
+    delivery_queue.enqueue(invoice.channel.label, payload)
+    if invoice.status == InvoiceStatus.PENDING:
+        sent = invoice_store.update_status(invoice.id, InvoiceStatus.SENT)
+        if sent is not None:
+            record_changes([(invoice, sent)])
     
-    return jsonify({'success': True, 'message': 'Reminder sent'})
+    return jsonify({'success': True, 'message': 'Reminder queued'})
+
+def stream_invoices(cursor=None):
+    """Yield one NDJSON line per invoice after `cursor`, reading the store a page at a time"""
+    while True:
+        invoices, cursor = invoice_store.page(cursor, STREAM_BATCH_SIZE)
+        for invoice in invoices:
+            yield invoice.to_json() + '\n'
+        if cursor is None:
+            return
+
+@app.route('/api/invoices', methods=['GET'])
+def list_invoices():
+    """Every invoice, newest first, one page of `limit` at a time.
+
+    Pass a response's `next_cursor` as `cursor` for the page after it. The
+    `revision` is the change feed's as the page was read; sync from there
+    to catch up on changes made while paging. With `stream=1` (or an
+    `Accept: application/x-ndjson` header) every invoice after the cursor
+    is streamed as NDJSON instead, in constant memory. With `due_from`
+    and/or `due_to`, the invoices due in that range are listed in due date
+    order instead (first `limit` only).
+    """
+    limit = max(1, min(request.args.get('limit', 50, type=int), 500))
+    due_from, due_to = request.args.get('due_from'), request.args.get('due_to')
+    if due_from or due_to:
+        invoices = invoice_store.due_between(due_from, due_to, limit)
+        return Response('{"success":true,"invoices":' + dumps_invoices(invoices) + '}',
+                        mimetype='application/json')
+
+    try:
+        cursor = int(request.args['cursor']) if request.args.get('cursor') else None
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid cursor'}), 400
+
+    stream = request.args.get('stream', '').lower() in ('1', 'true', 'ndjson')
+    if stream or request.accept_mimetypes.best == 'application/x-ndjson':
+        return Response(stream_with_context(stream_invoices(cursor)), mimetype='application/x-ndjson')
+
+    # Read first, so changes that land while the page is read are synced again rather than missed
+    revision = invoice_change_feed.revision(STORE_USER_ID)
+    invoices, next_cursor = invoice_store.page(cursor, limit)
+    return Response(
+        '{"success":true,"invoices":' + dumps_invoices(invoices)
+        + f',"revision":{revision}'
+        + f',"has_more":{json.dumps(next_cursor is not None)}'
+        + f',"next_cursor":{json.dumps(None if next_cursor is None else str(next_cursor))}}}',
+        mimetype='application/json'
+    )
+
+@app.route('/api/invoices/search', methods=['GET'])
+def search_invoices():
+    """Find invoices by part of the reference, client name or email, and amount/due date ranges"""
+    limit = max(1, min(request.args.get('limit', 50, type=int), 500))
+    try:
+        amount_min, amount_max = (
+            to_cents(request.args[name]) if request.args.get(name) else None
+            for name in ('amount_min', 'amount_max')
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    query = (request.args.get('q') or '').strip()
+    due_from, due_to = request.args.get('due_from'), request.args.get('due_to')
+    invoices = invoice_store.search(query, amount_min, amount_max, due_from, due_to, limit)
+    if not invoices and query and amount_min is None and amount_max is None and not (due_from or due_to):
+        # A complete reference also finds archived invoices
+        archived = invoice_archive.get(query)
+        invoices = [archived] if archived else []
+    return Response('{"success":true,"invoices":' + dumps_invoices(invoices) + '}',
+                    mimetype='application/json')
+
+@app.route('/api/invoices/<invoice_id>', methods=['GET'])
+def get_invoice(invoice_id):
+    """One invoice by id, whether it is still in the store or archived"""
+    invoice = invoice_store.get(invoice_id)
+    archived = invoice is None
+    if archived:
+        invoice = invoice_archive.get(invoice_id)
+    if not invoice:
+        return jsonify({'success': False, 'error': 'Invoice not found'}), 404
+    return Response(f'{{"success":true,"archived":{json.dumps(archived)},"invoice":{invoice.to_json()}}}',
+                    mimetype='application/json')
+
+@app.route('/api/invoices/<invoice_id>/status', methods=['POST'])
+def update_invoice_status(invoice_id):
+    """Set an invoice's status ('pending', 'sent' or 'paid')"""
+    data = request.get_json(silent=True) or {}
+    try:
+        status = InvoiceStatus.coerce(data.get('status'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    before = invoice_store.get(invoice_id)
+    invoice = invoice_store.update_status(invoice_id, status) if before else None
+    if invoice is None:
+        return jsonify({'success': False, 'error': 'Invoice not found'}), 404
+    record_changes([(before, invoice)])
+    return Response(f'{{"success":true,"invoice":{invoice.to_json()}}}', mimetype='application/json')
+
+@app.route('/api/invoices/changes', methods=['GET'])
+def invoice_changes():
+    """Invoices that changed after change feed revision `since`.
+
+    Returns the changed invoices, the ids of removed ones, the stats and the
+    `revision` to pass as `since` next time. While `has_more` is true the
+    client should ask again straight away. `reset` means `since` is ahead of
+    the server (e.g. the database was restored) and the list must be reloaded.
+    """
+    since = request.args.get('since', 0, type=int)
+    if since < 0:
+        return jsonify({'success': False, 'error': 'Invalid revision'}), 400
+    limit = max(1, min(request.args.get('limit', MAX_CHANGES_PAGE_SIZE, type=int), MAX_CHANGES_PAGE_SIZE))
+
+    revision = invoice_change_feed.revision(STORE_USER_ID)
+    if since > revision:
+        return jsonify({'success': True, 'reset': True, 'revision': revision})
+
+    changes = invoice_change_feed.changes_since(STORE_USER_ID, since, limit + 1)
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    if changes:
+        # Changes recorded after `revision` was read are included, so move past them
+        revision = changes[-1][1] if has_more else max(revision, changes[-1][1])
+
+    found = invoice_store.get_many([invoice_id for invoice_id, _, deleted in changes if not deleted])
+    deleted = [invoice_id for invoice_id, _, gone in changes if gone or invoice_id not in found]
+    return Response(
+        '{"success":true,"invoices":' + dumps_invoices(found.values())
+        + f',"deleted":{json.dumps(deleted)}'
+        + f',"stats":{json.dumps(store_stats())}'
+        + f',"revision":{revision}'
+        + f',"has_more":{json.dumps(has_more)}}}',
+        mimetype='application/json'
+    )
+
+def store_stats():
+    """The dashboard counts served by /api/invoice-stats and the change feed"""
+    counts = {status.label: invoice_store.count(status) for status in InvoiceStatus}
+    archived = invoice_archive.count()
+    counts['paid'] += archived
+    return {
+        'total_invoices': sum(counts.values()),
+        'pending_count': counts['pending'],
+        'sent_count': counts['sent'],
+        'paid_count': counts['paid'],
+        'archived_count': archived
+    }
+
+@app.route('/api/invoice-stats', methods=['GET'])
+def invoice_stats():
+    """Invoice counts per status, read from the store's status index and the archive totals"""
+    return jsonify({'success': True, 'stats': store_stats()})
+
+def load_outstanding_rollup(user_id):
+    """The store's unpaid invoices as analytics rollup rows; rebuild() sums them per due date and client"""
+    return [(invoice.due_date, invoice.client_name, 1, invoice.amount_cents)
+            for status in OUTSTANDING_STATUSES for invoice in invoice_store.by_status(status)]
+
+@app.route('/api/invoices/analytics', methods=['GET'])
+def invoice_analytics_summary():
+    """Ageing buckets, the largest outstanding clients and expected cash-in per week.
+
+    Answered from the analytics rollups, so the cost does not grow with the
+    number of invoices. `weeks` and `clients` size the cash-in and client lists.
+    """
+    weeks = max(1, min(request.args.get('weeks', 8, type=int), MAX_ANALYTICS_WEEKS))
+    clients = max(1, min(request.args.get('clients', 10, type=int), MAX_ANALYTICS_CLIENTS))
+
+    invoice_analytics.ensure_built(STORE_USER_ID, load_outstanding_rollup)
+    ageing = invoice_analytics.ageing(STORE_USER_ID)
+    return jsonify({
+        'success': True,
+        'analytics': {
+            'outstanding_total': sum(bucket['amount_cents'] for bucket in ageing.values()) / 100,
+            'outstanding_count': sum(bucket['count'] for bucket in ageing.values()),
+            'ageing': {
+                label: {'count': bucket['count'], 'amount': bucket['amount_cents'] / 100}
+                for label, bucket in ageing.items()
+            },
+            'clients': [
+                {'client_name': client_name, 'count': count, 'amount': amount_cents / 100}
+                for client_name, count, amount_cents in invoice_analytics.top_clients(STORE_USER_ID, clients)
+            ],
+            'cash_in': [
+                {'week_start': week_start, 'count': count, 'amount': amount_cents / 100}
+                for week_start, count, amount_cents in invoice_analytics.cash_in_by_week(STORE_USER_ID, weeks)
+            ]
+        }
+    })
+
+@app.route('/api/revenue', methods=['GET'])
+def revenue_by_month():
+    """Invoices paid per month over the last `months` months, archived ones included"""
+    months = max(1, min(request.args.get('months', 12, type=int), 120))
+    today = date.today()
+    year, month = divmod(today.year * 12 + today.month - 1 - (months - 1), 12)
+    since = f"{year:04d}-{month + 1:02d}"
+
+    # Recently paid invoices are still in the store; older months come from the archive totals
+    totals = invoice_archive.paid_by_month(since)
+    for invoice in invoice_store.by_status(InvoiceStatus.PAID):
+        paid_month = (invoice.paid_at or '')[:7]
+        if paid_month >= since:
+            count, amount_cents = totals.get(paid_month, (0, 0))
+            totals[paid_month] = (count + 1, amount_cents + invoice.amount_cents)
+
+    return jsonify({
+        'success': True,
+        'revenue': [
+            {'month': paid_month, 'count': count, 'amount': amount_cents / 100}
+            for paid_month, (count, amount_cents) in sorted(totals.items())
+        ]
+    })
+
+@app.route('/api/invoices/<invoice_id>/pdf', methods=['GET'])
+def invoice_pdf(invoice_id):
+    """Download an invoice as PDF, served from the render cache"""
+    invoice = find_invoice(invoice_id)
+    if not invoice:
+        return jsonify({'success': False, 'error': 'Invoice not found'}), 404
+
+    path, key = pdf_renderer.render(invoice)
+    # The cache key identifies the content, so it doubles as a strong ETag
+    return send_file(path, mimetype='application/pdf', download_name=f"{invoice.id}.pdf",
+                     etag=key, max_age=3600)
+
+@app.route('/api/invoices/pdfs', methods=['POST'])
+def render_invoice_pdfs():
+    """Render the PDFs of many invoices ahead of time, in parallel"""
+    data = request.get_json(silent=True)
+    invoice_ids = data.get('invoice_ids') if isinstance(data, dict) else None
+    if not isinstance(invoice_ids, list) or not all(isinstance(i, str) for i in invoice_ids):
+        return jsonify({'success': False, 'error': 'invoice_ids must be a list of invoice ids'}), 400
+
+    invoices, missing = [], []
+    for invoice_id in dict.fromkeys(invoice_ids):
+        invoice = find_invoice(invoice_id)
+        if invoice:
+            invoices.append(invoice)
+        else:
+            missing.append(invoice_id)
+
+    rendered = pdf_renderer.render_many(invoices)
+    return jsonify({
+        'success': True,
+        'rendered': rendered,
+        'cached': len(invoices) - rendered,
+        'missing': missing
+    })
+
+def email_request_errors(data):
+    """Everything /generate_email checks before rendering an email for an invoice dict"""
+    errors = validate_field_types(data) or validate_invoice_data(data)
+    try:
+        int(data.get('days_overdue') or 0)
+    except (TypeError, ValueError):
+        errors.append('Days overdue must be a number')
+    if isinstance(data.get('tone'), str) and data['tone'] not in TONES:
+        errors.append(f"Unknown tone: {data['tone']}")
+    if data.get('locale') is not None and not isinstance(data['locale'], str):
+        errors.append(f"locale must be text, not {type(data['locale']).__name__}")
+    return errors
+
+@app.route('/generate_email', methods=['POST'])
+def generate_email():
+    """Generate a chase email.
+
+    A single invoice (the dashboard form) is also saved as a pending invoice.
+    A JSON array of invoices only renders their emails, in one batch.
+    """
+    data = request.get_json(silent=True)
+
+    if isinstance(data, list):
+        if not all(isinstance(item, dict) for item in data):
+            return jsonify({'success': False, 'error': 'Expected a list of invoices'}), 400
+        # Nothing is rendered unless every invoice passes the single invoice checks
+        invalid = []
+        for index, item in enumerate(data):
+            errors = email_request_errors({'invoice_amount': item.get('amount'), **item})
+            if not (item.get('id') or item.get('invoice_id')):
+                errors.append('Invoice id is required')
+            if errors:
+                invalid.append({'index': index, 'errors': errors})
+        if invalid:
+            return jsonify({'success': False, 'error': 'Some invoices are invalid', 'invalid': invalid}), 400
+        return jsonify({'success': True, 'emails': email_generator.generate_batch(data)})
+
+    data = data or {}
+    errors = email_request_errors(data)
+    if errors:
+        return jsonify({'success': False, 'error': '; '.join(errors)}), 400
+
+    try:
+        invoice = Invoice.create(
+            None,
+            data['client_name'].strip(),
+            data['invoice_amount'],
+            client_email=data['client_email'],
+            due_date=data['due_date'],
+            days_overdue=int(data.get('days_overdue') or 0),
+            tone=data.get('tone', 'professional'),
+            channel='email',
+            created_at=datetime.now().isoformat(),
+            status='pending'
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    invoice = replace(invoice, id=invoice_numbers.next_number())
+
+    invoice_store.add(invoice)
+    invoices_created([invoice])
+
+    email = email_generator.generate(invoice.to_dict())
+    return jsonify({'success': True, 'email': email, 'invoice_id': invoice.id})
+
+@app.route('/api/bulk-invoices', methods=['POST'])
+def bulk_create_invoices():
+    """Create and send many invoices from a CSV upload, a CSV/NDJSON body or a JSON array.
+
+    Results are streamed back as NDJSON, one line per row followed by a
+    summary line. CSV and NDJSON input is read incrementally, so large files
+    are never held in memory; a JSON array has to be parsed up front.
+    """
+    upload = request.files.get('file')
+    if upload:
+        rows = read_csv_rows(upload.stream)
+    elif request.mimetype == 'text/csv':
+        rows = read_csv_rows(request.stream)
+    elif request.mimetype == 'application/x-ndjson':
+        rows = read_ndjson_rows(request.stream)
+    else:
+        rows = request.get_json(silent=True)
+        if not isinstance(rows, list):
+            return jsonify({'success': False, 'error': 'Expected a JSON array, NDJSON or a CSV file'}), 400
+
+    def generate():
+        created = failed = 0
+        try:
+            for result in import_invoices(rows, invoice_store, invoice_numbers,
+                                          on_created=invoices_issued):
+                if result['success']:
+                    created += 1
+                else:
+                    failed += 1
+                yield json.dumps(result) + '\n'
+        except (ValueError, csv.Error) as e:
+            # Undecodable or malformed CSV part way through the upload
+            yield json.dumps({'success': False, 'error': f"Could not parse input: {e}"}) + '\n'
+        yield json.dumps({'summary': {'created': created, 'failed': failed}}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/api/reconcile', methods=['POST'])
+def reconcile_bank_statement():
+    """Mark invoices paid from a bank statement (CSV or OFX upload or body).
+
+    The statement is read incrementally and reconciled in batches. The
+    lines that could not be reconciled are streamed back as NDJSON,
+    followed by a summary line with the count of each outcome.
+    """
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+    filename = (upload.filename or '') if upload else ''
+    mimetype = upload.mimetype if upload else request.mimetype
+    if filename.lower().endswith(('.ofx', '.qfx')) or mimetype in ('application/x-ofx', 'application/ofx'):
+        lines = read_statement_ofx(stream)
+    else:
+        lines = read_statement_csv(stream)
+
+    def generate():
+        summary = Counter()
+        try:
+            for result in reconcile_statement(lines, invoice_store, summary, archive=invoice_archive,
+                                              on_paid=invoices_paid):
+                yield json.dumps(result) + '\n'
+        except (ValueError, csv.Error) as e:
+            # Undecodable or malformed statement part way through the upload
+            yield json.dumps({'success': False, 'error': f"Could not parse statement: {e}"}) + '\n'
+        yield json.dumps({'summary': dict(summary)}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    # Development server; production runs under gunicorn (see gunicorn.conf.py)
+    start_background_workers()
+    # The reloader would start a second copy of the workers
+    app.run(debug=True, port=5000, use_reloader=False)
\ No newline at end of file
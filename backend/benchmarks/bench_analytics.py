@@ -0,0 +1,89 @@
+"""Dashboard analytics: the rollup queries versus scanning every invoice.
+
+Usage (from backend/):
+    python benchmarks/bench_analytics.py [invoices] [clients]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.analytics import InvoiceAnalytics
+from services.sqlite_db import get_connection, transaction
+
+USER_ID = 1
+
+def seed_invoices(conn, n, clients):
+    """A plain invoices table, as the ad-hoc scan would read it"""
+    conn.execute("CREATE TABLE invoices (id INTEGER PRIMARY KEY, user_id INTEGER, client_name TEXT, "
+                 "amount_cents INTEGER, due_date TEXT, status TEXT)")
+    conn.execute("CREATE INDEX idx_invoices_user ON invoices (user_id)")
+    rng = random.Random(1)
+    today = date.today()
+    with transaction(conn):
+        conn.executemany("INSERT INTO invoices (user_id, client_name, amount_cents, due_date, status) "
+                         "VALUES (?, ?, ?, ?, ?)",
+                         ((USER_ID, f"Client {rng.randrange(clients)}", rng.randrange(1000, 500000),
+                           (today + timedelta(days=rng.randrange(-400, 60))).isoformat(),
+                           rng.choice(('pending', 'sent', 'paid'))) for _ in range(n)))
+
+def scan_dashboard(conn):
+    """Everything the dashboard shows, computed from the invoices on every view"""
+    today = date.today()
+    ageing, clients, weeks = {}, {}, {}
+    for client_name, amount_cents, due_date in conn.execute(
+        "SELECT client_name, amount_cents, due_date FROM invoices "
+        "WHERE user_id = ? AND status IN ('pending', 'sent')", (USER_ID,)
+    ):
+        days = (today - date.fromisoformat(due_date)).days
+        bucket = 'not_due' if days < 0 else '0-30' if days <= 30 else '31-60' if days <= 60 \
+            else '61-90' if days <= 90 else '90+'
+        ageing[bucket] = ageing.get(bucket, 0) + amount_cents
+        clients[client_name] = clients.get(client_name, 0) + amount_cents
+        if days <= 0:
+            weeks[due_date] = weeks.get(due_date, 0) + amount_cents
+    return ageing, sorted(clients.items(), key=lambda item: -item[1])[:10], weeks
+
+def rollup_dashboard(analytics):
+    return (analytics.ageing(USER_ID), analytics.top_clients(USER_ID, 10),
+            analytics.cash_in_by_week(USER_ID, 8))
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def main(argv):
+    n = int(argv[0]) if argv else 1_000_000
+    clients = int(argv[1]) if len(argv) > 1 else 5000
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.db')
+        conn = get_connection(path)
+        seed_invoices(conn, n, clients)
+        analytics = InvoiceAnalytics(path)
+
+        start = time.perf_counter()
+        analytics.rebuild(USER_ID, conn.execute(
+            "SELECT due_date, client_name, COUNT(*), SUM(amount_cents) FROM invoices "
+            "WHERE user_id = ? AND status IN ('pending', 'sent') GROUP BY due_date, client_name", (USER_ID,)
+        ))
+        print(f"{n:,} invoices, {clients:,} clients")
+        print(f"rollup build         {(time.perf_counter() - start) * 1000:>10.1f} ms (once a day)")
+
+        print(f"scan every invoice   {timed(lambda: scan_dashboard(conn), 3):>10.1f} ms per view")
+        print(f"read rollups         {timed(lambda: rollup_dashboard(analytics), 50):>10.2f} ms per view")
+
+        start = time.perf_counter()
+        for i in range(1000):
+            analytics.record_status_change(USER_ID, 'pending', 'paid', date.today().isoformat(),
+                                           f"Client {i % clients}", 100)
+        print(f"incremental update   {(time.perf_counter() - start):>10.3f} ms per change")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
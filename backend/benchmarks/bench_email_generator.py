@@ -0,0 +1,48 @@
+"""Throughput of the chase email generator with the local stub model.
+
+Usage (from backend/):
+    python benchmarks/bench_email_generator.py [count]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.email_generator import EmailGenerator, StubEmailModel, TONES
+
+def make_invoices(n):
+    return [
+        {
+            'id': f"INV-20250101-{i + 1}",
+            'client_name': f"Client {i}",
+            'invoice_amount': random.uniform(100, 50_000),
+            'due_date': '2025-01-01',
+            'days_overdue': random.randint(0, 120),
+            'tone': random.choice(TONES),
+        }
+        for i in range(n)
+    ]
+
+def main(argv):
+    n = int(argv[0]) if argv else 100_000
+    invoices = make_invoices(n)
+
+    generator = EmailGenerator(StubEmailModel())
+    start = time.perf_counter()
+    for invoice in invoices:
+        generator.generate(invoice)
+    single = n / (time.perf_counter() - start)
+
+    generator = EmailGenerator(StubEmailModel())
+    start = time.perf_counter()
+    generator.generate_batch(invoices)
+    batch = n / (time.perf_counter() - start)
+
+    print(f"{n} invoices, {generator.misses} model calls")
+    print(f"generate():       {single:>12,.0f} emails/s")
+    print(f"generate_batch(): {batch:>12,.0f} emails/s")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
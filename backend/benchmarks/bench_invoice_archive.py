@@ -0,0 +1,92 @@
+"""Hot-path cost before and after archiving settled invoices, and archive lookups.
+
+Usage (from backend/):
+    python benchmarks/bench_invoice_archive.py [invoices] [--memory]
+
+Nine in ten invoices were paid long ago, as in an account with years of
+history. The reminder scan (every invoice with a due date) and the paid
+invoice listing are timed on the store before and after those invoices
+are moved to the archive, followed by lookups by id in the archive.
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import Invoice
+from services.invoice_archive import InvoiceArchive
+from services.invoice_store import InMemoryInvoiceStore, SQLiteInvoiceStore
+
+SETTLED_SHARE = 0.9
+
+def make_invoices(n):
+    rng = random.Random(5)
+    start = date(2022, 1, 1)
+    for i in range(n):
+        # Issued over four years, so invoices are added (and mostly paid) in date order
+        due = start + timedelta(days=i * 1400 // n + rng.randrange(30))
+        settled = rng.random() < SETTLED_SHARE
+        yield Invoice.create(
+            f"INV-20220101-{i + 1}", f"Client {rng.randrange(5000)}", rng.randrange(1000, 500000) / 100,
+            client_email=f"client{i}@example.co.za", due_date=due.isoformat(),
+            created_at=(due - timedelta(days=30)).isoformat(),
+            status='paid' if settled else rng.choice(('pending', 'sent')),
+            paid_at=(due - timedelta(days=rng.randrange(-20, 10))).isoformat() if settled else None,
+        )
+
+def timed(fn, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), result
+
+def hot_path(store):
+    for label, fn in (('reminder scan', store.due_between), ('paid invoices', lambda: store.by_status('paid'))):
+        ms, result = timed(fn)
+        print(f"  {label:<16} {ms:>9.1f} ms  {len(result):>9,} invoices")
+
+def bench(store, n, directory):
+    start = time.perf_counter()
+    store.add_many(make_invoices(n))
+    print(f"{type(store).__name__}, {n:,} invoices (loaded in {time.perf_counter() - start:.1f}s)")
+    print("before archiving")
+    hot_path(store)
+
+    archive = InvoiceArchive(os.path.join(directory, 'archive.db'))
+    start = time.perf_counter()
+    moved = archive.archive_settled(store, now=datetime(2026, 1, 1))
+    print(f"archived {moved:,} invoices in {time.perf_counter() - start:.1f}s")
+    print("after archiving")
+    hot_path(store)
+
+    blocks, compressed = archive._conn.execute(
+        "SELECT COUNT(*), SUM(LENGTH(data)) FROM invoice_archive_blocks"
+    ).fetchone()
+    print(f"archive: {blocks:,} blocks, {compressed / moved:.0f} bytes per invoice compressed")
+
+    ids = [row[0] for row in archive._conn.execute(
+        "SELECT invoice_id FROM invoice_archive_index ORDER BY RANDOM() LIMIT 200"
+    )]
+    ms, _ = timed(lambda: [archive.get(invoice_id) for invoice_id in ids], 1)
+    print(f"  get by id, cold  {ms / len(ids):>9.3f} ms")
+    ms, _ = timed(lambda: [archive.get(ids[0]) for _ in range(200)], 1)
+    print(f"  get by id, warm  {ms / 200:>9.3f} ms")
+
+def main(argv):
+    sizes = [int(a) for a in argv if not a.startswith('--')] or [1_000_000]
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            bench(SQLiteInvoiceStore(os.path.join(directory, 'bench.db')), n, directory)
+        if '--memory' in argv:
+            with tempfile.TemporaryDirectory() as directory:
+                bench(InMemoryInvoiceStore(), n, directory)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
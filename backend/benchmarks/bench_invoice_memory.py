@@ -0,0 +1,75 @@
+"""Memory and serialisation cost of invoice dicts versus Invoice records.
+
+Usage (from backend/):
+    python benchmarks/bench_invoice_memory.py [sizes...]
+
+For each size prints the traced memory held by the invoices and the time
+to render them all as a JSON array.
+"""
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import Invoice, dumps_invoices
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+def make_dicts(n):
+    return [{
+        'id': f"INV-20250101-{i + 1}",
+        'business_name': 'Acme',
+        'client_name': f"Client {i % 5000}",
+        'client_email': None,
+        'client_phone': f"+2782{i:07d}",
+        'invoice_amount': 100 + (i % 90000) / 100,
+        'due_date': f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}",
+        'days_overdue': 0,
+        'tone': 'professional',
+        'channel': 'whatsapp' if i % 2 else 'email',
+        'status': ('pending', 'sent', 'paid')[i % 3],
+        'created_at': '2025-01-01T00:00:00',
+    } for i in range(n)]
+
+def make_records(n):
+    return [Invoice.create(**{
+        'id': invoice['id'], 'client_name': invoice['client_name'],
+        'amount': invoice['invoice_amount'],
+        **{k: v for k, v in invoice.items() if k not in ('id', 'client_name', 'invoice_amount')},
+    }) for invoice in make_dicts(n)]
+
+def traced(build, n):
+    gc.collect()
+    tracemalloc.start()
+    invoices = build(n)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return invoices, current
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+def main(argv):
+    sizes = [int(a) for a in argv] or DEFAULT_SIZES
+
+    print(f"{'invoices':>10} {'kind':<8} {'MB':>8} {'B/inv':>7} {'json s':>8}")
+    for n in sizes:
+        dicts, dict_bytes = traced(make_dicts, n)
+        dict_time = timed(json.dumps, dicts)
+        del dicts
+        print(f"{n:>10} {'dict':<8} {dict_bytes / 1e6:>8.1f} {dict_bytes // n:>7} {dict_time:>8.3f}")
+
+        # Records are built from dicts, so measure only what is still held afterwards
+        records, record_bytes = traced(make_records, n)
+        record_time = timed(dumps_invoices, records)
+        del records
+        print(f"{n:>10} {'record':<8} {record_bytes / 1e6:>8.1f} {record_bytes // n:>7} {record_time:>8.3f}")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
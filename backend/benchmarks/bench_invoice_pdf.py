@@ -0,0 +1,49 @@
+"""Invoice PDF rendering: in-process versus the process pool, and cache hits.
+
+Usage (from backend/):
+    python benchmarks/bench_invoice_pdf.py [count] [workers]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import Invoice
+from services.invoice_pdf import PdfRenderer, pdf_fields, render_invoice_pdf
+
+def make_invoices(n):
+    return [Invoice.create(f"INV-20250101-{i + 1}", f"Client {i}", 100 + i, business_name='Acme',
+                           client_email=f"client{i}@example.com", due_date='2025-02-01',
+                           created_at='2025-01-01T00:00:00') for i in range(n)]
+
+def main(argv):
+    count = int(argv[0]) if argv else 2000
+    workers = int(argv[1]) if len(argv) > 1 else None
+    invoices = make_invoices(count)
+
+    start = time.perf_counter()
+    for invoice in invoices:
+        render_invoice_pdf(pdf_fields(invoice))
+    serial = time.perf_counter() - start
+    print(f"in-process render   {count / serial:>10.0f} PDFs/s")
+
+    with tempfile.TemporaryDirectory() as directory:
+        renderer = PdfRenderer(directory, workers)
+        renderer.render(invoices[0])  # start the pool outside the timing
+
+        start = time.perf_counter()
+        renderer.render_many(invoices[1:])
+        pooled = time.perf_counter() - start
+        print(f"pool render ({renderer.workers} procs) {(count - 1) / pooled:>8.0f} PDFs/s, written to disk")
+
+        start = time.perf_counter()
+        for invoice in invoices:
+            renderer.render(invoice)
+        cached = time.perf_counter() - start
+        print(f"cache hit           {count / cached:>10.0f} lookups/s")
+        renderer.shutdown()
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,81 @@
+"""Invoice search latency per query shape, for both store backends.
+
+Usage (from backend/):
+    python benchmarks/bench_invoice_search.py [invoices] [--memory]
+
+Every query should stay under 10 ms at 1M invoices on either store.
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import Invoice
+from services.invoice_store import InMemoryInvoiceStore, SQLiteInvoiceStore
+
+FIRST = ['Thabo', 'Lerato', 'Sipho', 'Naledi', 'John', 'Johanna', 'Pieter', 'Ayanda', 'Zanele', 'Kagiso',
+         'Mandla', 'Nomvula', 'David', 'Sarah', 'Ahmed', 'Priya', 'Bongani', 'Anele', 'Jabu', 'Karabo']
+LAST = ['Nkosi', 'Dlamini', 'Smith', 'van der Merwe', 'Botha', 'Naidoo', 'Mokoena', 'Khumalo', 'Pillay',
+        'Jacobs', 'Mahlangu', 'Petersen', 'Zulu', 'Ndlovu', 'Steyn', 'Mthembu', 'Fourie', 'Maseko']
+DOMAINS = ['gmail.com', 'outlook.com', 'yahoo.co.za', 'mweb.co.za', 'acme.co.za']
+
+def queries(n):
+    return [
+        ('substring name', {'text': 'ndlov'}),
+        ('substring email', {'text': 'mweb'}),
+        ('prefix 2 chars', {'text': 'jo'}),
+        ('common substring', {'text': 'inv'}),
+        ('email domain', {'text': 'gmail.com'}),
+        ('reference', {'text': f"INV-20250101-{n // 2 + 7}"}),
+        ('rare substring', {'text': 'zzq'}),
+        ('amount range', {'amount_min': 150000, 'amount_max': 150500}),
+        ('due date range', {'due_from': '2025-06-01', 'due_to': '2025-06-03'}),
+        ('name + amount', {'text': 'khumalo', 'amount_min': 100000, 'amount_max': 200000}),
+        ('name + due date', {'text': 'pillay', 'due_from': '2025-03-01', 'due_to': '2025-03-31'}),
+    ]
+
+def make_invoices(n):
+    rng = random.Random(7)
+    start = date(2025, 1, 1)
+    for i in range(n):
+        first, last = rng.choice(FIRST), rng.choice(LAST)
+        yield Invoice.create(
+            f"INV-20250101-{i + 1}", f"{first} {last}", rng.randrange(1000, 2000000) / 100,
+            client_email=f"{first}.{last.replace(' ', '')}{rng.randrange(1000)}@{rng.choice(DOMAINS)}".lower(),
+            due_date=(start + timedelta(days=rng.randrange(365))).isoformat(),
+            created_at='2025-01-01T00:00:00',
+        )
+
+def bench(store, n, repeat=20):
+    for label, query in queries(n):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            results = store.search(limit=50, **query)
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"  {label:<18} {statistics.median(timings):>8.2f} ms median "
+              f"{max(timings):>8.2f} ms max  {len(results):>3} results")
+
+def main(argv):
+    sizes = [int(a) for a in argv if not a.startswith('--')] or [1_000_000]
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = SQLiteInvoiceStore(os.path.join(tmp, 'bench.db'))
+            start = time.perf_counter()
+            store.add_many(make_invoices(n))
+            print(f"sqlite, {n:,} invoices (loaded and indexed in {time.perf_counter() - start:.1f}s)")
+            bench(store, n)
+
+        if '--memory' in argv:
+            store = InMemoryInvoiceStore()
+            store.add_many(make_invoices(n))
+            print(f"memory, {n:,} invoices")
+            bench(store, n)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
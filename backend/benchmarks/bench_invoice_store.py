@@ -0,0 +1,58 @@
+"""Lookup latency of the invoice stores as the number of invoices grows.
+
+Usage (from backend/):
+    python benchmarks/bench_invoice_store.py [--sqlite] [sizes...]
+
+Prints the mean get() latency per store size; it should stay flat from 1k to 1M.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import Invoice
+from services.invoice_store import InMemoryInvoiceStore, SQLiteInvoiceStore
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+LOOKUPS = 20_000
+
+def make_invoices(n):
+    for i in range(n):
+        yield Invoice.create(
+            f"INV-20250101-{i + 1}", f"Client {i % 5000}", 100 + i % 900,
+            business_name='Acme',
+            due_date=f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}",
+            tone='professional',
+            channel='whatsapp' if i % 2 else 'email',
+            created_at='2025-01-01T00:00:00',
+            status=('pending', 'sent', 'paid')[i % 3],
+        )
+
+def bench_lookups(store, n):
+    ids = [f"INV-20250101-{random.randint(1, n)}" for _ in range(LOOKUPS)]
+    start = time.perf_counter()
+    for invoice_id in ids:
+        store.get(invoice_id)
+    return (time.perf_counter() - start) / LOOKUPS * 1e6
+
+def main(argv):
+    use_sqlite = '--sqlite' in argv
+    sizes = [int(a) for a in argv if not a.startswith('--')] or DEFAULT_SIZES
+
+    print(f"{'backend':<8} {'invoices':>10} {'get() us':>10}")
+    for n in sizes:
+        store = InMemoryInvoiceStore()
+        store.add_many(make_invoices(n))
+        print(f"{'memory':<8} {n:>10} {bench_lookups(store, n):>10.2f}")
+
+        if use_sqlite:
+            with tempfile.TemporaryDirectory() as tmp:
+                store = SQLiteInvoiceStore(os.path.join(tmp, 'bench.db'))
+                store.add_many(make_invoices(n))
+                print(f"{'sqlite':<8} {n:>10} {bench_lookups(store, n):>10.2f}")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,93 @@
+"""PayPal service throughput against the local stub API.
+
+Usage (from backend/):
+    python benchmarks/bench_paypal_service.py [--threads 8] [--delay-ms 0] [calls]
+
+The app has no HTTP route that calls PayPal (checkout needs user accounts),
+so load_test.py cannot reach services/paypal_service.py. This drives one
+shared PayPalService directly from a pool of threads, as request handlers
+would, against benchmarks/paypal_stub.py: a mix of one-time payments,
+subscriptions and payment executions. Prints calls/s and p50/p99 latency per
+call, which covers the token cache, the pooled session and the circuit breaker.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from paypal_stub import start_stub_paypal
+
+CALLS = ('payment', 'subscription', 'execute')
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def call(service, name, i):
+    if name == 'payment':
+        return service.create_one_time_payment('basic', f"user{i}@example.com", i)
+    if name == 'subscription':
+        return service.create_subscription('pro', f"user{i}@example.com", i)
+    return service.execute_payment(f"PAY-{i}", f"PAYER-{i}")
+
+def main(argv):
+    threads = int(argv[argv.index('--threads') + 1]) if '--threads' in argv else 8
+    delay_ms = float(argv[argv.index('--delay-ms') + 1]) if '--delay-ms' in argv else 0
+    options = {argv[i + 1] for i, arg in enumerate(argv) if arg in ('--threads', '--delay-ms')}
+    sizes = [int(a) for a in argv if not a.startswith('--') and a not in options]
+    calls = sizes[0] if sizes else 20_000
+
+    stub, stub_url = start_stub_paypal(delay=delay_ms / 1000)
+    os.environ.update(PAYPAL_API_BASE=stub_url, PAYPAL_CLIENT_ID='stub', PAYPAL_CLIENT_SECRET='stub',
+                      PAYPAL_POOL_SIZE=str(threads))
+    from services.paypal_service import PayPalService
+    service = PayPalService()
+    # One INFO line per call would measure the console rather than the service
+    logging.getLogger().setLevel(logging.WARNING)
+
+    latencies = {name: [] for name in CALLS}
+    failures = {name: 0 for name in CALLS}
+    lock = threading.Lock()
+    counter = iter(range(calls))
+
+    def worker():
+        local = {name: [] for name in CALLS}
+        local_failures = {name: 0 for name in CALLS}
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            name = CALLS[i % len(CALLS)]
+            start = time.perf_counter()
+            result = call(service, name, i)
+            local[name].append(time.perf_counter() - start)
+            if not result.get('success'):
+                local_failures[name] += 1
+        with lock:
+            for name in CALLS:
+                latencies[name].extend(local[name])
+                failures[name] += local_failures[name]
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stub.shutdown()
+
+    print(f"{calls} calls from {threads} threads, stub delay {delay_ms:g} ms: {calls / elapsed:,.0f} calls/s")
+    print(f"{'call':<13} {'calls':>7} {'failed':>7} {'p50 ms':>9} {'p99 ms':>9}")
+    for name in CALLS:
+        values = sorted(latencies[name])
+        print(f"{name:<13} {len(values):>7} {failures[name]:>7} "
+              f"{percentile(values, 0.50) * 1000:>9.2f} {percentile(values, 0.99) * 1000:>9.2f}")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
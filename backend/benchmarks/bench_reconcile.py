@@ -0,0 +1,78 @@
+"""Bank statement reconciliation throughput and memory on a large statement.
+
+Usage (from backend/):
+    python benchmarks/bench_reconcile.py [--sqlite] [lines]
+
+Writes a CSV statement (mostly invoice references, some payments that
+only name the client, unknown credits and debits), reconciles it and
+prints lines/s and how much the process grew while reconciling.
+"""
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import Invoice
+from services.invoice_store import InMemoryInvoiceStore, SQLiteInvoiceStore
+from services.reconciliation import read_statement_csv, reconcile_statement
+
+NAMES = ['Thabo Nkosi', 'Lerato Dlamini', 'Sipho Botha', 'Naledi Naidoo', 'Johanna Pillay', 'Pieter Steyn']
+
+def make_invoices(n):
+    for i in range(n):
+        yield Invoice.create(f"INV-20250101-{i + 1}", f"{NAMES[i % len(NAMES)]} {i}", 100 + i / 100)
+
+def write_statement(path, lines, invoices):
+    rng = random.Random(3)
+    with open(path, 'w') as f:
+        f.write('Date,Description,Reference,Amount,Balance\n')
+        for i in range(lines):
+            kind = rng.random()
+            n = rng.randrange(invoices)
+            amount = f"{100 + n / 100:.2f}"
+            if kind < 0.80:
+                f.write(f"2025-02-01,EFT CREDIT,INV-20250101-{n + 1},{amount},0\n")
+            elif kind < 0.90:
+                # Paid without the reference: matched on amount and name
+                f.write(f"2025-02-01,PAYMENT FROM {NAMES[n % len(NAMES)].upper()} {n},,{amount},0\n")
+            elif kind < 0.95:
+                f.write(f"2025-02-01,CASH DEPOSIT,,{rng.randrange(1, 99)}.{rng.randrange(100):02d},0\n")
+            else:
+                f.write(f"2025-02-01,BANK FEE,,-{rng.randrange(5, 50)}.00,0\n")
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def main(argv):
+    use_sqlite = '--sqlite' in argv
+    sizes = [int(a) for a in argv if not a.startswith('--')]
+    lines = sizes[0] if sizes else 500_000
+    invoices = lines
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteInvoiceStore(os.path.join(tmp, 'bench.db')) if use_sqlite else InMemoryInvoiceStore()
+        store.add_many(make_invoices(invoices))
+        path = os.path.join(tmp, 'statement.csv')
+        write_statement(path, lines, invoices)
+
+        rss_before = max_rss_mb()
+        summary = Counter()
+        reported = 0
+        start = time.perf_counter()
+        with open(path, 'rb') as f:
+            for _ in reconcile_statement(read_statement_csv(f), store, summary):
+                reported += 1
+        elapsed = time.perf_counter() - start
+
+        print(f"{'sqlite' if use_sqlite else 'memory'} store, {invoices:,} invoices, {lines:,} statement lines")
+        print(f"reconciled in {elapsed:.2f}s ({lines / elapsed:,.0f} lines/s), "
+              f"peak RSS grew {max_rss_mb() - rss_before:.1f} MB")
+        print(f"{reported:,} lines reported; {dict(summary)}")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,66 @@
+"""Scalar vs batch invoice validation.
+
+Usage (from backend/):
+    python benchmarks/bench_validators.py [rows]
+
+Checks that validate_invoice_batch agrees with validate_invoice_data on
+every row, then reports rows/s for both.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from validators import np, validate_invoice_batch, validate_invoice_data
+
+# Roughly 1 row in 20 gets a bad value in each column
+BAD_NAMES = ['X', '  ', '']
+BAD_EMAILS = ['bad@', 'no-at.com', '']
+BAD_AMOUNTS = ['0', '-5', 'abc', None]
+
+def make_columns(n, clients=20_000):
+    rng = random.Random(42)
+    names, emails, amounts, due_dates = [], [], [], []
+    for _ in range(n):
+        client = rng.randrange(clients)
+        bad = rng.random() < 0.05
+        names.append(rng.choice(BAD_NAMES) if bad and rng.random() < 0.3 else f"Client {client}")
+        emails.append(rng.choice(BAD_EMAILS) if bad and rng.random() < 0.3 else f"accounts@client{client}.co.za")
+        amounts.append(rng.choice(BAD_AMOUNTS) if bad and rng.random() < 0.3 else f"{rng.uniform(50, 9000):.2f}")
+        due_dates.append('' if bad and rng.random() < 0.3 else f"2025-{rng.randint(1, 12):02d}-15")
+    return names, emails, amounts, due_dates
+
+def main(argv):
+    n = int(argv[0]) if argv else 1_000_000
+    names, emails, amounts, due_dates = make_columns(n)
+    rows = [
+        {'client_name': a, 'client_email': b, 'invoice_amount': c, 'due_date': d}
+        for a, b, c, d in zip(names, emails, amounts, due_dates)
+    ]
+
+    start = time.perf_counter()
+    expected = [validate_invoice_data(row) for row in rows]
+    scalar = time.perf_counter() - start
+
+    start = time.perf_counter()
+    error_mask, errors = validate_invoice_batch(names, emails, amounts, due_dates)
+    batch = time.perf_counter() - start
+
+    mismatches = sum(1 for i in range(n) if errors.get(i, []) != expected[i])
+    print(f"{n} rows, numpy={'yes' if np is not None else 'no'}, mismatches={mismatches}")
+    print(f"scalar: {n / scalar:>12,.0f} rows/s")
+    print(f"batch:  {n / batch:>12,.0f} rows/s")
+
+    if np is not None:
+        # Typed columns take the vectorised paths for names, amounts and dates
+        typed = (np.array(names), np.array(emails),
+                 np.array([float(a) if a not in ('abc', None) else float('nan') for a in amounts]),
+                 np.array(due_dates))
+        start = time.perf_counter()
+        validate_invoice_batch(*typed)
+        print(f"typed:  {n / (time.perf_counter() - start):>12,.0f} rows/s")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
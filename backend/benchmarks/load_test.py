@@ -0,0 +1,330 @@
+"""Load test for the invoice and payment APIs.
+
+For each dataset size the app is started in a separate process, on a fresh
+temporary database, with the store seeded with that many invoices. A pool
+of client threads then sends a weighted mix of create, list, stats, reminder
+and webhook requests for a fixed time. p50/p99 latency and requests per
+second are reported per scenario.
+
+No route calls PayPal (checkout needs user accounts), so PayPal throughput
+is not covered here: benchmarks/bench_paypal_service.py measures
+services/paypal_service.py directly against benchmarks/paypal_stub.py.
+
+Usage (from backend/):
+    python benchmarks/load_test.py [--sizes 1000,100000,1000000] [--store memory|sqlite]
+        [--server werkzeug|gunicorn] [--duration 15] [--concurrency 8] [--mix create=20,list=25,stats=20,reminder=20,webhook=15]
+        [--save-baseline] [--tolerance 0.25]
+
+--server gunicorn runs the production configuration (gunicorn.conf.py,
+several worker processes) on the SQLite store instead of the threaded
+development server. Results are compared with benchmarks/baselines.json,
+keyed by server, store and size. The exit status is 1 when throughput drops, or p99 latency rises, by
+more than the tolerance. --save-baseline records the current run instead.
+Baselines depend on the machine, so re-record them when moving hosts.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+DEFAULT_MIX = 'create=20,list=25,stats=20,reminder=20,webhook=15'
+SEED_START = date(2025, 1, 1)
+SEED_DAYS = 730
+SEED_CHUNK = 10_000
+
+def seeded_id(i):
+    return f"INV-SEED-{i}"
+
+def seed_invoices(n):
+    from records import Invoice
+    for i in range(n):
+        yield Invoice.create(
+            seeded_id(i), f"Client {i % 5000}", 100 + (i % 90000) / 100,
+            business_name='Load Test Ltd',
+            client_email=f"client{i % 5000}@example.com",
+            client_phone=f"+2782{i % 10_000_000:07d}",
+            due_date=(SEED_START + timedelta(days=i % SEED_DAYS)).isoformat(),
+            tone=('friendly', 'professional', 'firm')[i % 3],
+            channel='email' if i % 2 else 'whatsapp',
+            status=('pending', 'sent', 'paid')[i % 3],
+            created_at='2025-01-01T00:00:00',
+        )
+
+def seed_store(store, n):
+    batch = []
+    for invoice in seed_invoices(n):
+        batch.append(invoice)
+        if len(batch) == SEED_CHUNK:
+            store.add_many(batch)
+            batch = []
+    store.add_many(batch)
+
+def serve(port, seed):
+    """Server process: seed the store, start the background workers and serve the app"""
+    from werkzeug.serving import make_server
+    import app as application
+
+    seed_store(application.invoice_store, seed)
+    application.start_background_workers()
+    make_server('127.0.0.1', port, application.app, threaded=True).serve_forever()
+
+def server_command(args, size, env, workdir):
+    if args.server == 'werkzeug':
+        return [sys.executable, os.path.abspath(__file__), '--serve', '--port', str(args.port), '--seed', str(size)]
+
+    # gunicorn workers share the SQLite store, so seed it before they start
+    subprocess.run([sys.executable, os.path.abspath(__file__), '--seed-only', '--seed', str(size)],
+                   cwd=workdir, env=env, check=True)
+    return [sys.executable, '-m', 'gunicorn', '--config', os.path.join(BACKEND_DIR, 'gunicorn.conf.py'),
+            '--bind', f"127.0.0.1:{args.port}", 'app:app']
+
+# Scenario name -> function(session, base_url, rng, size) returning a response
+def create_invoice(session, base, rng, size):
+    return session.post(f"{base}/api/create-invoice", json={
+        'businessName': 'Load Test Ltd',
+        'clientName': f"Client {rng.randrange(5000)}",
+        'clientEmail': 'client@example.com',
+        'clientPhone': '+27820000000',
+        'amount': round(rng.uniform(50, 5000), 2),
+        'dueDate': (date.today() + timedelta(days=rng.randrange(-30, 60))).isoformat(),
+        'tone': rng.choice(('friendly', 'professional', 'firm')),
+        'channel': rng.choice(('whatsapp', 'email')),
+    })
+
+def list_invoices(session, base, rng, size):
+    due_from = (SEED_START + timedelta(days=rng.randrange(SEED_DAYS))).isoformat()
+    return session.get(f"{base}/api/invoices", params={'due_from': due_from, 'limit': 50})
+
+def invoice_stats(session, base, rng, size):
+    return session.get(f"{base}/api/invoice-stats")
+
+def send_reminder(session, base, rng, size):
+    return session.post(f"{base}/api/send-reminder", json={'invoice_id': seeded_id(rng.randrange(size))})
+
+def paypal_webhook(session, base, rng, size):
+    return session.post(f"{base}/api/paypal/webhook", json={
+        'id': f"WH-{uuid.uuid4()}",
+        'event_type': 'PAYMENT.SALE.COMPLETED',
+        'resource': {'id': f"SALE-{uuid.uuid4()}", 'amount': {'total': '299.00', 'currency': 'ZAR'}},
+    })
+
+def paypal_plans(session, base, rng, size):
+    return session.get(f"{base}/api/paypal/plans")
+
+SCENARIOS = {
+    'create': create_invoice,
+    'list': list_invoices,
+    'stats': invoice_stats,
+    'reminder': send_reminder,
+    'webhook': paypal_webhook,
+    'plans': paypal_plans,
+}
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def wait_until_ready(base, process, timeout=1800):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Server exited during startup with status {process.returncode}")
+        try:
+            if requests.get(f"{base}/api/invoice-stats", timeout=1).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise SystemExit('Server did not become ready in time')
+
+def drive(base, mix, size, duration, concurrency):
+    """Send the request mix from `concurrency` threads; returns {scenario: [latency seconds]} and errors"""
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client(seed):
+        rng = random.Random(seed)
+        session = requests.Session()
+        local = {name: [] for name in names}
+        local_errors = {name: 0 for name in names}
+        while time.perf_counter() < stop_at:
+            name = rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                ok = SCENARIOS[name](session, base, rng, size).status_code < 500
+            except requests.RequestException:
+                ok = False
+            local[name].append(time.perf_counter() - start)
+            if not ok:
+                local_errors[name] += 1
+        with lock:
+            for name in names:
+                latencies[name].extend(local[name])
+                errors[name] += local_errors[name]
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors
+
+def summarize(latencies, errors, duration):
+    results = {}
+    everything = []
+    for name, values in latencies.items():
+        values.sort()
+        everything.extend(values)
+        results[name] = {
+            'requests': len(values),
+            'errors': errors[name],
+            'rps': round(len(values) / duration, 1),
+            'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+            'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+        }
+    everything.sort()
+    results['overall'] = {
+        'requests': len(everything),
+        'errors': sum(errors.values()),
+        'rps': round(len(everything) / duration, 1),
+        'p50_ms': round(percentile(everything, 0.50) * 1000, 2),
+        'p99_ms': round(percentile(everything, 0.99) * 1000, 2),
+    }
+    return results
+
+def run_size(size, args, mix):
+    with tempfile.TemporaryDirectory() as workdir:
+        port = args.port
+        env = dict(os.environ,
+                   INVOICE_STORE='sqlite' if args.server == 'gunicorn' else args.store,
+                   INVOICE_DB_PATH=os.path.join(workdir, 'bench.db'),
+                   PYTHONPATH=BACKEND_DIR)
+        with open(os.path.join(workdir, 'server.log'), 'w') as server_log:
+            # Run from the temporary directory so logs/ and data/ land there
+            process = subprocess.Popen(
+                server_command(args, size, env, workdir),
+                cwd=workdir, env=env, stdout=server_log, stderr=subprocess.STDOUT
+            )
+            try:
+                base = f"http://127.0.0.1:{port}"
+                wait_until_ready(base, process)
+                # Warm up connections and caches before measuring
+                drive(base, mix, size, min(2, args.duration), args.concurrency)
+                latencies, errors = drive(base, mix, size, args.duration, args.concurrency)
+                return summarize(latencies, errors, args.duration)
+            finally:
+                process.terminate()
+                process.wait()
+
+def print_results(group, size, results):
+    print(f"\n{group}, {size:,} invoices")
+    print(f"{'scenario':<10} {'requests':>9} {'errors':>7} {'rps':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, row in results.items():
+        print(f"{name:<10} {row['requests']:>9} {row['errors']:>7} {row['rps']:>9.1f} "
+              f"{row['p50_ms']:>9.2f} {row['p99_ms']:>9.2f}")
+
+def compare(baseline, results, tolerance):
+    """Human-readable regressions of `results` against `baseline`"""
+    regressions = []
+    for name, row in results.items():
+        base = baseline.get(name)
+        if not base or not row['requests']:
+            continue
+        if row['rps'] < base['rps'] * (1 - tolerance):
+            regressions.append(f"{name}: {row['rps']} rps vs baseline {base['rps']}")
+        if row['p99_ms'] > base['p99_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {row['p99_ms']} ms vs baseline {base['p99_ms']}")
+    return regressions
+
+def load_baselines():
+    if not os.path.exists(BASELINES_PATH):
+        return {}
+    with open(BASELINES_PATH) as f:
+        return json.load(f)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)))
+    parser.add_argument('--store', choices=('memory', 'sqlite'), default='memory')
+    parser.add_argument('--server', choices=('werkzeug', 'gunicorn'), default='werkzeug')
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--mix', default=DEFAULT_MIX)
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--seed', type=int, default=0, help=argparse.SUPPRESS)
+    parser.add_argument('--seed-only', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.seed)
+        return
+    if args.seed_only:
+        from services.invoice_store import create_invoice_store
+        seed_store(create_invoice_store(), args.seed)
+        return
+    if args.server == 'gunicorn':
+        args.store = 'sqlite'
+
+    mix = parse_mix(args.mix)
+    baselines = load_baselines()
+    failed = False
+
+    # Baselines for the development server keep the plain store name
+    group = args.store if args.server == 'werkzeug' else f"{args.server}-{args.store}"
+    for size in (int(s) for s in args.sizes.split(',')):
+        results = run_size(size, args, mix)
+        print_results(group, size, results)
+
+        key = str(size)
+        if args.save_baseline:
+            baselines.setdefault(group, {})[key] = results
+            continue
+        baseline = baselines.get(group, {}).get(key)
+        if baseline is None:
+            print('No baseline recorded for this size')
+            continue
+        regressions = compare(baseline, results, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        failed = failed or bool(regressions)
+
+    if args.save_baseline:
+        with open(BASELINES_PATH, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\nBaselines written to {BASELINES_PATH}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Minimal local stand-in for the PayPal REST API used by the benchmarks.
+
+Answers the OAuth token, subscription, payment and execute endpoints that
+services/paypal_service.py calls, after an optional artificial delay, so
+load tests never reach PayPal.
+
+Usage (from backend/):
+    python benchmarks/paypal_stub.py [port] [delay_ms]
+"""
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class StubPayPalHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; without this, delayed ACKs add ~40 ms per reply
+    disable_nagle_algorithm = True
+    # Seconds to wait before answering, to mimic PayPal's latency
+    delay = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if self.delay:
+            time.sleep(self.delay)
+
+        if self.path == '/v1/oauth2/token':
+            self._reply(200, {'access_token': 'stub-token', 'token_type': 'Bearer', 'expires_in': 32400})
+        elif self.path == '/v1/billing/subscriptions':
+            self._reply(201, {'id': 'I-STUB', 'status': 'APPROVAL_PENDING',
+                              'links': [{'rel': 'approve', 'href': 'https://paypal.invalid/approve'}]})
+        elif self.path == '/v1/payments/payment':
+            self._reply(201, {'id': 'PAY-STUB', 'state': 'created',
+                              'links': [{'rel': 'approval_url', 'href': 'https://paypal.invalid/approve'}]})
+        elif self.path.endswith('/execute'):
+            self._reply(200, {'id': self.path.split('/')[-2], 'state': 'approved',
+                              'transactions': [{'amount': {'total': '299.00', 'currency': 'ZAR'}}]})
+        else:
+            self._reply(404, {'name': 'RESOURCE_NOT_FOUND', 'message': self.path})
+
+def start_stub_paypal(port=0, delay=0.0):
+    """Serve the stub on a background thread; returns (server, base URL)"""
+    handler = type('StubHandler', (StubPayPalHandler,), {'delay': delay})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='paypal-stub', daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8099
+    delay_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 0
+    server, url = start_stub_paypal(port, delay_ms / 1000)
+    print(f"Stub PayPal API listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,24 @@
+# Production server settings: gunicorn --config gunicorn.conf.py app:app (from backend/)
+import multiprocessing
+import os
+
+# Worker processes only share state through SQLite, so the in-memory store is not an option
+os.environ.setdefault('INVOICE_STORE', 'sqlite')
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+keepalive = 5
+# Recycle workers now and then to bound memory growth
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '10000'))
+max_requests_jitter = max_requests // 10
+
+# Import the app once in the master so workers fork with it already loaded
+preload_app = True
+
+def post_fork(server, worker):
+    # Threads do not survive fork, so background work starts in each worker
+    from app import start_background_workers
+    start_background_workers()
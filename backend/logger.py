@@ -1,36 +1,137 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
 import sys
+import threading
 from datetime import datetime
-import os
+
+LOG_DIR = 'logs'
+
+class DailyFileHandler(logging.FileHandler):
+    """Writes to logs/app_YYYYMMDD.log, switching files when the date changes"""
+
+    def __init__(self, directory=LOG_DIR, prefix='app'):
+        self.directory = directory
+        self.prefix = prefix
+        self._day = datetime.now().strftime('%Y%m%d')
+        super().__init__(self._path(self._day), delay=True)
+
+    def _path(self, day):
+        return os.path.join(self.directory, f"{self.prefix}_{day}.log")
+
+    def emit(self, record):
+        day = datetime.fromtimestamp(record.created).strftime('%Y%m%d')
+        if day != self._day:
+            self._day = day
+            self.baseFilename = os.path.abspath(self._path(day))
+            if self.stream:
+                self.stream.close()
+                self.stream = None
+        super().emit(record)
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; structured fields come from extra={'fields': {...}}"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to a background writer thread.
+
+    Unlike the stock QueueHandler the record is enqueued as-is, so message
+    formatting and JSON encoding happen on the writer thread rather than in
+    the request. The writer is restarted in a forked child process, where
+    the parent's thread no longer exists.
+    """
+
+    def __init__(self, handlers):
+        super().__init__(queue.SimpleQueue())
+        self._handlers = handlers
+        self._lock = threading.Lock()
+        self._pid = None
+        self._listener = None
+        self._ensure_listener()
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self.queue = queue.SimpleQueue()
+                self._listener = logging.handlers.QueueListener(
+                    self.queue, *self._handlers, respect_handler_level=True
+                )
+                self._listener.start()
+                self._pid = os.getpid()
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        self.queue.put_nowait(record)
+
+    def stop(self):
+        if self._listener and self._pid == os.getpid():
+            self._listener.stop()
 
 def setup_logger():
     # Create logs directory if it doesn't exist
-    if not os.path.exists('logs'):
-        os.makedirs('logs')
-    
-    # Configure logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(f'logs/app_{datetime.now().strftime("%Y%m%d")}.log'),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
-    
+    if not os.path.exists(LOG_DIR):
+        os.makedirs(LOG_DIR)
+
+    root = logging.getLogger()
+    if not any(isinstance(h, AsyncQueueHandler) for h in root.handlers):
+        file_handler = DailyFileHandler()
+        file_handler.setFormatter(JsonFormatter())
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(
+            logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        )
+
+        handler = AsyncQueueHandler([file_handler, console_handler])
+        root.setLevel(logging.INFO)
+        root.addHandler(handler)
+        # Flush whatever is still queued when the process exits
+        atexit.register(handler.stop)
+
     return logging.getLogger(__name__)
 
 # Create logger instance
 logger = setup_logger()
 
+def _log(level, message, args, fields):
+    # Skip building the record entirely when the level is disabled
+    if logger.isEnabledFor(level):
+        logger.log(level, message, *args, extra={'fields': fields})
+
 def log_database_operation(operation, user_id=None, details=""):
-    logger.info(f"DB {operation} - User: {user_id} - {details}")
+    _log(logging.INFO, "DB %s - User: %s - %s", (operation, user_id, details),
+         {'category': 'database', 'operation': operation, 'user_id': user_id, 'details': details})
 
 def log_ai_operation(operation, user_id=None, details=""):
-    logger.info(f"AI {operation} - User: {user_id} - {details}")
+    _log(logging.INFO, "AI %s - User: %s - %s", (operation, user_id, details),
+         {'category': 'ai', 'operation': operation, 'user_id': user_id, 'details': details})
 
 def log_payment_operation(operation, user_id=None, plan_id=None, details=""):
-    logger.info(f"PAYMENT {operation} - User: {user_id} - Plan: {plan_id} - {details}")
+    _log(logging.INFO, "PAYMENT %s - User: %s - Plan: %s - %s", (operation, user_id, plan_id, details),
+         {'category': 'payment', 'operation': operation, 'user_id': user_id, 'plan_id': plan_id,
+          'details': details})
 
 def log_error(operation, error, user_id=None):
-    logger.error(f"ERROR in {operation} - User: {user_id} - Error: {str(error)}")
\ No newline at end of file
+    _log(logging.ERROR, "ERROR in %s - User: %s - Error: %s", (operation, user_id, error),
+         {'category': 'error', 'operation': operation, 'user_id': user_id, 'error': error})
@@ -0,0 +1,237 @@
+import re
+from dataclasses import dataclass, fields, replace
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from enum import IntEnum
+from json.encoder import encode_basestring_ascii
+
+class _LabelledEnum(IntEnum):
+    """Integer-coded enum that is read and written as its lowercase name"""
+
+    @property
+    def label(self):
+        return self.name.lower()
+
+    @classmethod
+    def coerce(cls, value):
+        """Accept a member, its integer code or its label; anything else is a ValueError naming the labels"""
+        if isinstance(value, cls):
+            return value
+        try:
+            if isinstance(value, str):
+                return cls[value.upper()]
+            if isinstance(value, int) and not isinstance(value, bool):
+                return cls(value)
+        except (KeyError, ValueError):
+            pass
+        labels = [member.label for member in cls]
+        raise ValueError(f"Invalid {cls.__name__.removeprefix('Invoice').lower()}: {value} "
+                         f"(expected {', '.join(labels[:-1])} or {labels[-1]})")
+
+class InvoiceStatus(_LabelledEnum):
+    PENDING = 0
+    SENT = 1
+    PAID = 2
+
+class Tone(_LabelledEnum):
+    FRIENDLY = 0
+    PROFESSIONAL = 1
+    FIRM = 2
+
+class Channel(_LabelledEnum):
+    WHATSAPP = 0
+    EMAIL = 1
+
+def to_cents(amount):
+    """Convert a submitted amount (number or string) to integer cents"""
+    try:
+        cents = (Decimal(str(amount).strip()) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP)
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"Invalid amount: {amount}")
+    if not cents.is_finite():
+        raise ValueError(f"Invalid amount: {amount}")
+    return int(cents)
+
+def format_cents(cents):
+    """Exact decimal rendering of an amount in cents, e.g. 129950 -> '1299.50'"""
+    sign = '-' if cents < 0 else ''
+    whole, fraction = divmod(abs(cents), 100)
+    return f"{sign}{whole}.{fraction:02d}"
+
+@dataclass(frozen=True, slots=True)
+class Invoice:
+    """Compact invoice record shared by the invoice store and the API.
+
+    Status, tone and channel are stored as small integer enums and the amount
+    as integer cents. Records are immutable; use with_status() to change one.
+    `paid_at` is when the invoice was marked paid (None while it is open).
+    """
+    id: object
+    client_name: str
+    amount_cents: int
+    due_date: str = None
+    status: InvoiceStatus = InvoiceStatus.PENDING
+    tone: Tone = Tone.PROFESSIONAL
+    channel: Channel = Channel.WHATSAPP
+    business_name: str = None
+    client_email: str = None
+    client_phone: str = None
+    created_at: str = None
+    days_overdue: int = 0
+    paid_at: str = None
+
+    @property
+    def amount(self):
+        return self.amount_cents / 100
+
+    def with_status(self, status):
+        status = InvoiceStatus.coerce(status)
+        if status == self.status:
+            return self
+        paid_at = datetime.now().isoformat() if status == InvoiceStatus.PAID else None
+        return replace(self, status=status, paid_at=paid_at)
+
+    @classmethod
+    def create(cls, id, client_name, amount, **fields):
+        """Build a record from API-style values (labels, decimal amounts)"""
+        fields['client_name'] = client_name
+        for name in TEXT_FIELDS:
+            value = fields.get(name)
+            if value is not None and not isinstance(value, str):
+                raise ValueError(f"{name} must be text, not {type(value).__name__}")
+        del fields['client_name']
+        # Due dates are compared and bucketed as ISO strings, so nothing else is stored
+        if fields.get('due_date') and not is_iso_date(fields['due_date']):
+            raise ValueError(f"Invalid due date: {fields['due_date']}")
+        for name, enum in (('status', InvoiceStatus), ('tone', Tone), ('channel', Channel)):
+            if fields.get(name) is not None:
+                fields[name] = enum.coerce(fields[name])
+            else:
+                fields.pop(name, None)
+        return cls(id, client_name, to_cents(amount), **fields)
+
+    @classmethod
+    def from_model(cls, row):
+        """Build a record from a SQLAlchemy Invoice row"""
+        return cls(
+            id=row.id,
+            client_name=row.client_name,
+            amount_cents=to_cents(row.invoice_amount),
+            due_date=row.due_date,
+            status=InvoiceStatus.coerce(row.status),
+            client_email=row.client_email,
+            created_at=row.created_at.isoformat() if row.created_at else None,
+            days_overdue=row.days_overdue or 0,
+        )
+
+    @classmethod
+    def from_row(cls, row):
+        """Build a record from a stored row (INVOICE_FIELDS order, enums as integer codes)"""
+        return cls(row[0], row[1], row[2], row[3], InvoiceStatus(row[4]), Tone(row[5]),
+                   Channel(row[6]), *row[7:])
+
+    def to_row(self):
+        """The record's values in INVOICE_FIELDS order, as stored by the store and the archive"""
+        return tuple(getattr(self, field) for field in INVOICE_FIELDS)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'business_name': self.business_name,
+            'client_name': self.client_name,
+            'client_email': self.client_email,
+            'client_phone': self.client_phone,
+            'invoice_amount': self.amount,
+            'due_date': self.due_date,
+            'days_overdue': self.days_overdue,
+            'tone': self.tone.label,
+            'channel': self.channel.label,
+            'status': self.status.label,
+            'created_at': self.created_at,
+            'paid_at': self.paid_at,
+        }
+
+    def to_json(self, fields=None):
+        return _serializer(tuple(fields or JSON_FIELDS))(self)
+
+# Column order of stored invoice rows, which matches the record so rows map straight onto it
+INVOICE_FIELDS = tuple(field.name for field in fields(Invoice))
+
+ISO_DATE = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+def is_iso_date(value):
+    """True for a calendar date written as YYYY-MM-DD"""
+    if not ISO_DATE.fullmatch(value):
+        return False
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+# Client-supplied text fields; create() rejects values of any other type
+TEXT_FIELDS = ('client_name', 'client_email', 'client_phone', 'business_name', 'due_date')
+
+# Keys of an invoice JSON object, in output order
+JSON_FIELDS = (
+    'id', 'business_name', 'client_name', 'client_email', 'client_phone', 'invoice_amount',
+    'due_date', 'days_overdue', 'tone', 'channel', 'status', 'created_at', 'paid_at'
+)
+
+# Pre-encoded JSON strings for each enum, indexed by integer code
+_LABELS = {
+    'status': tuple(encode_basestring_ascii(member.label) for member in InvoiceStatus),
+    'tone': tuple(encode_basestring_ascii(member.label) for member in Tone),
+    'channel': tuple(encode_basestring_ascii(member.label) for member in Channel),
+}
+
+def _text(field):
+    """Encoder for a text field; ids may also be integers from SQLAlchemy rows"""
+    def encode(value):
+        if value.__class__ is str:
+            return encode_basestring_ascii(value)
+        if value is None:
+            return 'null'
+        if isinstance(value, str):
+            return encode_basestring_ascii(value)
+        if field == 'id' and isinstance(value, int) and not isinstance(value, bool):
+            return str(value)
+        raise ValueError(f"Invoice {field} must be text, not {type(value).__name__}")
+    return encode
+
+def _encoder(field):
+    """(record slot, function rendering its value as JSON) for a JSON field"""
+    if field == 'invoice_amount':
+        return 'amount_cents', format_cents
+    if field in _LABELS:
+        return field, _LABELS[field].__getitem__
+    if field == 'days_overdue':
+        return field, '%d'.__mod__
+    return field, _text(field)
+
+_serializers = {}
+
+def _serializer(fields):
+    """Return a function that renders a record as a JSON object with the given keys.
+
+    The (key, slot, encoder) list is worked out once per field list, so
+    rendering a record only reads its slots and joins the encoded values,
+    with no intermediate dict.
+    """
+    serializer = _serializers.get(fields)
+    if serializer is None:
+        unknown = set(fields) - set(JSON_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown invoice fields: {', '.join(sorted(unknown))}")
+        plan = [(f'"{field}":', *_encoder(field)) for field in fields]
+
+        def serializer(invoice):
+            return '{' + ','.join([key + encode(getattr(invoice, slot)) for key, slot, encode in plan]) + '}'
+
+        _serializers[fields] = serializer
+    return serializer
+
+def dumps_invoices(invoices, fields=None):
+    """Serialise a sequence of records to a JSON array without building dicts"""
+    serialize = _serializer(tuple(fields or JSON_FIELDS))
+    return '[' + ','.join(map(serialize, invoices)) + ']'
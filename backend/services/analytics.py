@@ -0,0 +1,193 @@
+import time
+from datetime import date, timedelta
+
+from services.sqlite_db import get_connection, transaction
+
+# Statuses that still count as money owed
+OUTSTANDING_STATUSES = ('pending', 'sent')
+
+# Ageing buckets as (label, fewest days overdue); invoices not yet due are 'not_due'
+AGEING_BUCKETS = (('0-30', 0), ('31-60', 31), ('61-90', 61), ('90+', 91))
+
+def _due_key(due_date):
+    """ISO date string the rollups are keyed on ('' when the invoice has no due date)"""
+    return str(due_date)[:10] if due_date else ''
+
+class InvoiceAnalytics:
+    """Per-user outstanding-invoice rollups for the analytics dashboard.
+
+    Two tables hold the unpaid invoices of each user, summed by due date
+    and by client. Writers call record_created / record_status_change /
+    record_deleted (or record_many for a batch of changes), which apply
+    the changes to both in one transaction, so
+    dashboard queries read a few hundred rollup rows instead of scanning
+    the invoices. Ageing needs no writes at all: buckets are computed from
+    the due dates relative to today when they are read.
+
+    A user's rollups are built with one grouped query (the `loader`) on
+    first read and rebuilt once they are `max_age` seconds old, which
+    corrects any drift, e.g. from a change made while they were built.
+    """
+
+    def __init__(self, path=None, max_age=86400):
+        self.path = path
+        self.max_age = max_age
+        get_connection(path).executescript('''
+            CREATE TABLE IF NOT EXISTS analytics_outstanding_by_due_date (
+                user_id INTEGER NOT NULL,
+                due_date TEXT NOT NULL,
+                invoice_count INTEGER NOT NULL,
+                amount_cents INTEGER NOT NULL,
+                PRIMARY KEY (user_id, due_date)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS analytics_outstanding_by_client (
+                user_id INTEGER NOT NULL,
+                client_name TEXT NOT NULL,
+                invoice_count INTEGER NOT NULL,
+                amount_cents INTEGER NOT NULL,
+                PRIMARY KEY (user_id, client_name)
+            ) WITHOUT ROWID;
+            -- Serves the largest-debtors query without sorting every client
+            CREATE INDEX IF NOT EXISTS idx_analytics_client_amount
+                ON analytics_outstanding_by_client (user_id, amount_cents);
+            CREATE TABLE IF NOT EXISTS analytics_rollup_builds (
+                user_id INTEGER PRIMARY KEY,
+                built_at REAL NOT NULL
+            );
+        ''')
+
+    @property
+    def _conn(self):
+        return get_connection(self.path)
+
+    def _apply(self, user_id, deltas):
+        """Add (due_date, client_name, count, amount_cents) deltas to the rollups in one transaction"""
+        if not deltas:
+            return
+        conn = self._conn
+        with transaction(conn):
+            # Users whose rollups were never built are loaded in full on first read
+            if conn.execute("SELECT 1 FROM analytics_rollup_builds WHERE user_id = ?", (user_id,)).fetchone() is None:
+                return
+            for table, column, rows in (
+                ('analytics_outstanding_by_due_date', 'due_date',
+                 [(user_id, _due_key(due_date), count, cents) for due_date, _, count, cents in deltas]),
+                ('analytics_outstanding_by_client', 'client_name',
+                 [(user_id, client_name or '', count, cents) for _, client_name, count, cents in deltas]),
+            ):
+                conn.executemany(
+                    f"INSERT INTO {table} (user_id, {column}, invoice_count, amount_cents) VALUES (?, ?, ?, ?) "
+                    f"ON CONFLICT (user_id, {column}) DO UPDATE SET "
+                    "invoice_count = invoice_count + excluded.invoice_count, "
+                    "amount_cents = amount_cents + excluded.amount_cents",
+                    rows
+                )
+                conn.executemany(
+                    f"DELETE FROM {table} WHERE user_id = ? AND {column} = ? AND invoice_count <= 0",
+                    {row[:2] for row in rows}
+                )
+
+    def record_created(self, user_id, status, due_date, client_name, amount_cents):
+        self.record_many(user_id, [(None, status, due_date, client_name, amount_cents)])
+
+    def record_deleted(self, user_id, status, due_date, client_name, amount_cents):
+        self.record_many(user_id, [(status, None, due_date, client_name, amount_cents)])
+
+    def record_status_change(self, user_id, old_status, new_status, due_date, client_name, amount_cents):
+        self.record_many(user_id, [(old_status, new_status, due_date, client_name, amount_cents)])
+
+    def record_many(self, user_id, changes):
+        """Apply (old_status, new_status, due_date, client_name, amount_cents) changes in one transaction.
+
+        The old status is None for a created invoice and the new one None
+        for a deleted invoice.
+        """
+        deltas = []
+        for old_status, new_status, due_date, client_name, amount_cents in changes:
+            delta = (new_status in OUTSTANDING_STATUSES) - (old_status in OUTSTANDING_STATUSES)
+            if delta:
+                deltas.append((due_date, client_name, delta, delta * amount_cents))
+        self._apply(user_id, deltas)
+
+    def rebuild(self, user_id, rows):
+        """Replace the user's rollups with (due_date, client_name, count, amount_cents) groups"""
+        by_due, by_client = {}, {}
+        for due_date, client_name, count, amount_cents in rows:
+            for totals, key in ((by_due, _due_key(due_date)), (by_client, client_name or '')):
+                current = totals.get(key, (0, 0))
+                totals[key] = (current[0] + count, current[1] + amount_cents)
+
+        conn = self._conn
+        with transaction(conn):
+            conn.execute("DELETE FROM analytics_outstanding_by_due_date WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM analytics_outstanding_by_client WHERE user_id = ?", (user_id,))
+            conn.executemany(
+                "INSERT INTO analytics_outstanding_by_due_date (user_id, due_date, invoice_count, amount_cents) "
+                "VALUES (?, ?, ?, ?)",
+                [(user_id, key, count, cents) for key, (count, cents) in by_due.items() if count > 0]
+            )
+            conn.executemany(
+                "INSERT INTO analytics_outstanding_by_client (user_id, client_name, invoice_count, amount_cents) "
+                "VALUES (?, ?, ?, ?)",
+                [(user_id, key, count, cents) for key, (count, cents) in by_client.items() if count > 0]
+            )
+            conn.execute(
+                "INSERT INTO analytics_rollup_builds (user_id, built_at) VALUES (?, ?) "
+                "ON CONFLICT (user_id) DO UPDATE SET built_at = excluded.built_at",
+                (user_id, time.time())
+            )
+
+    def ensure_built(self, user_id, loader):
+        row = self._conn.execute(
+            "SELECT built_at FROM analytics_rollup_builds WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        if row is None or time.time() - row[0] > self.max_age:
+            self.rebuild(user_id, loader(user_id))
+
+    def ageing(self, user_id, today=None):
+        """Outstanding {'count', 'amount_cents'} per ageing bucket, plus 'not_due' and 'no_due_date'"""
+        today = today or date.today()
+        # Most overdue first: each invoice falls into the first bucket it is old enough for
+        cases = ' '.join(f"WHEN due_date <= ? THEN '{label}'" for label, _ in reversed(AGEING_BUCKETS))
+        rows = self._conn.execute(
+            f"SELECT CASE WHEN due_date = '' THEN 'no_due_date' {cases} ELSE 'not_due' END AS bucket, "
+            "SUM(invoice_count), SUM(amount_cents) FROM analytics_outstanding_by_due_date "
+            "WHERE user_id = ? GROUP BY bucket",
+            [(today - timedelta(days=days)).isoformat() for _, days in reversed(AGEING_BUCKETS)] + [user_id]
+        )
+        buckets = {label: {'count': 0, 'amount_cents': 0}
+                   for label in ('not_due',) + tuple(label for label, _ in AGEING_BUCKETS) + ('no_due_date',)}
+        for bucket, count, amount_cents in rows:
+            buckets[bucket] = {'count': count, 'amount_cents': amount_cents}
+        return buckets
+
+    def top_clients(self, user_id, limit=10):
+        """The clients owing the most, largest first, as (client_name, count, amount_cents)"""
+        return [tuple(row) for row in self._conn.execute(
+            "SELECT client_name, invoice_count, amount_cents FROM analytics_outstanding_by_client "
+            "WHERE user_id = ? ORDER BY amount_cents DESC LIMIT ?",
+            (user_id, limit)
+        )]
+
+    def cash_in_by_week(self, user_id, weeks=8, today=None):
+        """Outstanding amounts falling due in each of the next `weeks` weeks (Monday starts)"""
+        today = today or date.today()
+        start = today - timedelta(days=today.weekday())
+        totals = [[start + timedelta(weeks=i), 0, 0] for i in range(weeks)]
+        rows = self._conn.execute(
+            "SELECT due_date, invoice_count, amount_cents FROM analytics_outstanding_by_due_date "
+            "WHERE user_id = ? AND due_date >= ? AND due_date < ?",
+            (user_id, start.isoformat(), (start + timedelta(weeks=weeks)).isoformat())
+        )
+        for due_date, count, amount_cents in rows:
+            try:
+                week = totals[(date.fromisoformat(due_date) - start).days // 7]
+            except ValueError:
+                # A malformed due date stored before they were validated; it sorts into the range as text
+                continue
+            week[1] += count
+            week[2] += amount_cents
+        return [(week_start.isoformat(), count, amount_cents) for week_start, count, amount_cents in totals]
+
+# Create global instance
+invoice_analytics = InvoiceAnalytics()
@@ -0,0 +1,145 @@
+import csv
+import io
+import json
+from dataclasses import replace
+from datetime import datetime
+
+from records import Invoice
+from validators import validate_field_types, validate_invoice_batch
+
+# Rows validated, numbered and inserted per transaction
+BULK_BATCH_SIZE = 1000
+
+# Accept the camelCase names used by /api/create-invoice as well as the
+# snake_case names the validators expect
+FIELD_ALIASES = {
+    'businessName': 'business_name',
+    'clientName': 'client_name',
+    'clientEmail': 'client_email',
+    'clientPhone': 'client_phone',
+    'amount': 'invoice_amount',
+    'invoiceAmount': 'invoice_amount',
+    'dueDate': 'due_date',
+}
+
+def normalize_row(row):
+    normalized = {}
+    for key, value in row.items():
+        if key is None:
+            continue
+        key = key.strip()
+        if isinstance(value, str):
+            value = value.strip()
+        normalized[FIELD_ALIASES.get(key, key)] = value
+    return normalized
+
+def read_csv_rows(stream):
+    """Yield dict rows from a binary CSV stream without reading it all into memory"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    yield from csv.DictReader(text)
+
+def read_ndjson_rows(stream):
+    """Yield one dict per non-empty line of a binary NDJSON stream.
+
+    Lines that are not valid JSON are yielded as the ValueError raised while
+    parsing them, so they are reported against their own row.
+    """
+    for line in stream:
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                yield e
+
+def import_invoices(rows, store, allocator, batch_size=BULK_BATCH_SIZE, on_created=None):
+    """Validate and create invoices from an iterable of rows.
+
+    Rows are processed in batches: each batch's valid rows get their invoice
+    numbers from one allocator block and are inserted with one add_many()
+    call. Invoices are created as sent and default to WhatsApp, like those
+    from /api/create-invoice. Yields a result dict per row (in input order)
+    as each batch completes, so callers can stream progress. `on_created`,
+    if given, is called with the list of invoices inserted by each batch.
+    """
+    batch = []
+    for row_number, row in enumerate(rows, 1):
+        batch.append((row_number, row))
+        if len(batch) >= batch_size:
+            yield from _import_batch(batch, store, allocator, on_created)
+            batch = []
+    if batch:
+        yield from _import_batch(batch, store, allocator, on_created)
+
+def _import_batch(batch, store, allocator, on_created):
+    results = []
+    checked = []
+    valid = []
+    for row_number, row in batch:
+        if isinstance(row, ValueError):
+            results.append({'row': row_number, 'success': False, 'errors': [f"Could not parse row: {row}"]})
+            continue
+        if not isinstance(row, dict):
+            results.append({'row': row_number, 'success': False, 'errors': ['Row must be an object']})
+            continue
+        row = normalize_row(row)
+        errors = validate_field_types(row)
+        if errors:
+            results.append({'row': row_number, 'success': False, 'errors': errors})
+        else:
+            result = {'row': row_number, 'success': True}
+            results.append(result)
+            checked.append((result, row))
+
+    if checked:
+        # One pass over the batch's columns, with validate_invoice_data's rules and messages
+        _, errors = validate_invoice_batch(
+            [row.get('client_name') for _, row in checked],
+            [row.get('client_email') for _, row in checked],
+            [row.get('invoice_amount', 0) for _, row in checked],
+            [row.get('due_date') for _, row in checked],
+        )
+        for i, (result, row) in enumerate(checked):
+            if i in errors:
+                result.update(success=False, errors=errors[i])
+            else:
+                valid.append((result, row))
+
+    created = []
+    created_at = datetime.now().isoformat()
+    for result, row in valid:
+        try:
+            created.append((result, Invoice.create(
+                None,
+                row['client_name'],
+                row['invoice_amount'],
+                business_name=row.get('business_name'),
+                client_email=row['client_email'],
+                client_phone=row.get('client_phone'),
+                due_date=row['due_date'],
+                tone=row.get('tone') or 'professional',
+                channel=row.get('channel') or 'whatsapp',
+                created_at=created_at,
+                status='sent'
+            )))
+        except ValueError as e:
+            result.update(success=False, errors=[str(e)])
+
+    if created:
+        # Numbered once they are known to be valid, so rejected rows use no numbers
+        invoice_ids = allocator.allocate_block(len(created))
+        invoices = []
+        for (result, invoice), invoice_id in zip(created, invoice_ids):
+            result['invoice_id'] = invoice_id
+            invoices.append(replace(invoice, id=invoice_id))
+        try:
+            store.add_many(invoices)
+        except Exception as e:
+            for result, _ in created:
+                result.update(success=False, errors=[f"Insert failed: {e}"])
+                del result['invoice_id']
+        else:
+            if on_created:
+                on_created(invoices)
+
+    return results
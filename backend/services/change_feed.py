@@ -0,0 +1,91 @@
+from services.sqlite_db import get_connection, transaction
+
+class InvoiceChangeFeed:
+    """Per-user revision log of invoice changes, for delta sync.
+
+    Each user has a revision number that only goes up. Every invoice change
+    bumps it and stamps the invoice with the new value, so "what changed
+    since revision N" is a range scan on (user_id, revision) whose cost
+    depends on the number of changes, not the size of the account. Only the
+    latest revision of each invoice is kept, so the log grows with the
+    number of invoices, not the number of edits. Deleted invoices keep a
+    tombstone row so that clients can drop them.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        conn = get_connection(path)
+        columns = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(invoice_changes)")}
+        if columns.get('invoice_id') == 'INTEGER':
+            # Invoice ids are text ('INV-...'); tables made with an INTEGER column are rebuilt below
+            with transaction(conn):
+                conn.execute("ALTER TABLE invoice_changes RENAME TO invoice_changes_old")
+                conn.execute("DROP INDEX IF EXISTS idx_invoice_changes_revision")
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS user_revisions (
+                user_id INTEGER PRIMARY KEY,
+                revision INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS invoice_changes (
+                user_id INTEGER NOT NULL,
+                invoice_id TEXT NOT NULL,
+                revision INTEGER NOT NULL,
+                deleted INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, invoice_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_invoice_changes_revision ON invoice_changes (user_id, revision);
+        ''')
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'invoice_changes_old'").fetchone():
+            with transaction(conn):
+                conn.execute(
+                    "INSERT INTO invoice_changes (user_id, invoice_id, revision, deleted) "
+                    "SELECT user_id, CAST(invoice_id AS TEXT), revision, deleted FROM invoice_changes_old"
+                )
+                conn.execute("DROP TABLE invoice_changes_old")
+
+    @property
+    def _conn(self):
+        return get_connection(self.path)
+
+    def record(self, user_id, invoice_ids, deleted=False):
+        """Stamp the invoices with new revisions of the user; returns the user's latest revision.
+
+        Every invoice gets a revision of its own, so a page of changes can
+        end anywhere without splitting a revision across pages.
+        """
+        invoice_ids = list(dict.fromkeys(invoice_ids))
+        if not invoice_ids:
+            return self.revision(user_id)
+        conn = self._conn
+        with transaction(conn):
+            latest = conn.execute(
+                "INSERT INTO user_revisions (user_id, revision) VALUES (?, ?) "
+                "ON CONFLICT (user_id) DO UPDATE SET revision = revision + excluded.revision "
+                "RETURNING revision",
+                (user_id, len(invoice_ids))
+            ).fetchone()[0]
+            first = latest - len(invoice_ids) + 1
+            conn.executemany(
+                "INSERT INTO invoice_changes (user_id, invoice_id, revision, deleted) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (user_id, invoice_id) DO UPDATE SET "
+                "revision = excluded.revision, deleted = excluded.deleted",
+                [(user_id, invoice_id, first + i, int(deleted)) for i, invoice_id in enumerate(invoice_ids)]
+            )
+        return latest
+
+    def revision(self, user_id):
+        """The user's latest revision (0 before their first change)"""
+        row = self._conn.execute("SELECT revision FROM user_revisions WHERE user_id = ?", (user_id,)).fetchone()
+        return row[0] if row else 0
+
+    def changes_since(self, user_id, since, limit):
+        """Return up to `limit` (invoice_id, revision, deleted) after `since`, oldest first"""
+        rows = self._conn.execute(
+            "SELECT invoice_id, revision, deleted FROM invoice_changes "
+            "WHERE user_id = ? AND revision > ? ORDER BY revision LIMIT ?",
+            (user_id, since, limit)
+        )
+        return [(invoice_id, revision, bool(deleted)) for invoice_id, revision, deleted in rows]
+
+# Create global instance
+invoice_change_feed = InvoiceChangeFeed()
@@ -0,0 +1,349 @@
+import base64
+import json
+import os
+import random
+import threading
+import time
+
+from logger import logger, log_error
+from services.sqlite_db import get_connection, transaction
+
+class DeliveryError(Exception):
+    """Raised by channel adapters when a message could not be delivered.
+
+    `retryable` is False for failures that no retry can fix, such as a
+    missing recipient; those jobs are dead-lettered at once.
+    """
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+class DeliveryQueue:
+    """Persistent queue of outbound messages stored in SQLite.
+
+    Jobs are claimed with a lease so a job held by a crashed worker becomes
+    available again once the lease expires. Jobs that exhaust their attempts
+    are moved to the dead-letter table.
+    """
+
+    def __init__(self, path=None, lease_seconds=300):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        # Bumped by wake(); idle workers wait for it to move past the value they last saw
+        self.generation = 0
+        self._wakeup = threading.Condition()
+        get_connection(path).executescript('''
+            CREATE TABLE IF NOT EXISTS delivery_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                channel TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                available_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                last_error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_delivery_jobs_ready
+                ON delivery_jobs (channel, available_at);
+            CREATE TABLE IF NOT EXISTS delivery_dead_letters (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id INTEGER NOT NULL,
+                channel TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                last_error TEXT,
+                failed_at REAL NOT NULL
+            );
+        ''')
+
+    @property
+    def _conn(self):
+        return get_connection(self.path)
+
+    def enqueue(self, channel, payload, max_attempts=5, delay=0):
+        """Add a job and return its id"""
+        now = time.time()
+        cursor = self._conn.execute(
+            "INSERT INTO delivery_jobs (channel, payload, max_attempts, available_at, created_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (channel, json.dumps(payload), max_attempts, now + delay, now)
+        )
+        self.wake()
+        return cursor.lastrowid
+
+    def enqueue_many(self, jobs, max_attempts=5):
+        """Add (channel, payload) jobs in one transaction"""
+        now = time.time()
+        conn = self._conn
+        with transaction(conn):
+            conn.executemany(
+                "INSERT INTO delivery_jobs (channel, payload, max_attempts, available_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(channel, json.dumps(payload), max_attempts, now, now) for channel, payload in jobs]
+            )
+        self.wake()
+
+    def claim(self, channel, limit=1):
+        """Lease up to `limit` ready jobs for the channel"""
+        now = time.time()
+        conn = self._conn
+        with transaction(conn):
+            rows = conn.execute(
+                "SELECT id, channel, payload, attempts, max_attempts FROM delivery_jobs "
+                "WHERE channel = ? AND available_at <= ? ORDER BY available_at LIMIT ?",
+                (channel, now, limit)
+            ).fetchall()
+            # Hide claimed jobs until the lease runs out
+            conn.executemany(
+                "UPDATE delivery_jobs SET available_at = ? WHERE id = ?",
+                [(now + self.lease_seconds, row['id']) for row in rows]
+            )
+        return [
+            {
+                'id': row['id'],
+                'channel': row['channel'],
+                'payload': json.loads(row['payload']),
+                'attempts': row['attempts'],
+                'max_attempts': row['max_attempts'],
+            }
+            for row in rows
+        ]
+
+    def complete(self, job):
+        self._conn.execute("DELETE FROM delivery_jobs WHERE id = ?", (job['id'],))
+
+    def retry(self, job, error, delay):
+        self._conn.execute(
+            "UPDATE delivery_jobs SET attempts = attempts + 1, available_at = ?, last_error = ? WHERE id = ?",
+            (time.time() + delay, str(error), job['id'])
+        )
+
+    def dead_letter(self, job, error):
+        conn = self._conn
+        with transaction(conn):
+            conn.execute(
+                "INSERT INTO delivery_dead_letters (job_id, channel, payload, attempts, last_error, failed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job['id'], job['channel'], json.dumps(job['payload']), job['attempts'] + 1,
+                 str(error), time.time())
+            )
+            conn.execute("DELETE FROM delivery_jobs WHERE id = ?", (job['id'],))
+
+    def dead_letters(self, limit=100):
+        rows = self._conn.execute(
+            "SELECT * FROM delivery_dead_letters ORDER BY id DESC LIMIT ?", (limit,)
+        )
+        return [dict(row) for row in rows]
+
+    def depth(self, channel=None):
+        """Number of jobs waiting (including leased and backing-off jobs)"""
+        if channel is None:
+            return self._conn.execute("SELECT COUNT(*) FROM delivery_jobs").fetchone()[0]
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM delivery_jobs WHERE channel = ?", (channel,)
+        ).fetchone()[0]
+
+    def wake(self):
+        """Wake every worker waiting for work in this process"""
+        with self._wakeup:
+            self.generation += 1
+            self._wakeup.notify_all()
+
+    def wait_for_work(self, timeout, seen):
+        """Block until wake() is called after `generation` was read as `seen`, or the timeout passes.
+
+        A job enqueued between reading `seen` and calling this returns at
+        once, so no worker misses a wakeup whichever worker wakes first.
+        """
+        with self._wakeup:
+            self._wakeup.wait_for(lambda: self.generation != seen, timeout)
+
+class ChannelAdapter:
+    """Sends one message over a channel; raises DeliveryError on failure.
+
+    `concurrency` caps how many messages the worker pool sends through the
+    adapter at the same time.
+    """
+    name = None
+    concurrency = 1
+
+    def send(self, payload):
+        raise NotImplementedError
+
+class LogAdapter(ChannelAdapter):
+    """Fallback used when a channel's provider is not configured"""
+
+    def __init__(self, name, concurrency=1):
+        self.name = name
+        self.concurrency = concurrency
+
+    def send(self, payload):
+        logger.info("Would send %s for %s via %s", payload.get('kind'), payload.get('invoice_id'), self.name)
+
+class WhatsAppAdapter(ChannelAdapter):
+    """Sends WhatsApp messages through Twilio"""
+    name = 'whatsapp'
+
+    def __init__(self, concurrency=4):
+        from twilio.rest import Client
+
+        self.concurrency = concurrency
+        self.from_number = os.getenv('TWILIO_WHATSAPP_FROM')
+        self.client = Client(os.getenv('TWILIO_ACCOUNT_SID'), os.getenv('TWILIO_AUTH_TOKEN'))
+
+    @staticmethod
+    def is_configured():
+        return bool(os.getenv('TWILIO_ACCOUNT_SID') and os.getenv('TWILIO_AUTH_TOKEN')
+                    and os.getenv('TWILIO_WHATSAPP_FROM'))
+
+    def send(self, payload):
+        if not payload.get('to'):
+            raise DeliveryError('No WhatsApp number for recipient', retryable=False)
+        try:
+            self.client.messages.create(
+                from_=f"whatsapp:{self.from_number}",
+                to=f"whatsapp:{payload['to']}",
+                body=payload['message']
+            )
+        except Exception as e:
+            raise DeliveryError(str(e))
+
+class EmailAdapter(ChannelAdapter):
+    """Sends email through SendGrid"""
+    name = 'email'
+
+    def __init__(self, concurrency=8):
+        from sendgrid import SendGridAPIClient
+
+        self.concurrency = concurrency
+        self.from_email = os.getenv('SENDGRID_FROM_EMAIL', 'payments@invoiceaccelerator.co.za')
+        self.client = SendGridAPIClient(os.getenv('SENDGRID_API_KEY'))
+
+    @staticmethod
+    def is_configured():
+        return bool(os.getenv('SENDGRID_API_KEY'))
+
+    @staticmethod
+    def _attachment(attachment):
+        from sendgrid.helpers.mail import Attachment, Disposition, FileContent, FileName, FileType
+
+        try:
+            with open(attachment['path'], 'rb') as f:
+                content = base64.b64encode(f.read()).decode()
+        except FileNotFoundError:
+            # Still being rendered; the job is retried after a backoff
+            raise DeliveryError(f"Attachment {attachment['filename']} is not ready")
+        return Attachment(FileContent(content), FileName(attachment['filename']),
+                          FileType('application/pdf'), Disposition('attachment'))
+
+    def send(self, payload):
+        from sendgrid.helpers.mail import Mail
+
+        if not payload.get('to'):
+            raise DeliveryError('No email address for recipient', retryable=False)
+        message = Mail(
+            from_email=self.from_email,
+            to_emails=payload['to'],
+            subject=payload.get('subject', 'Invoice'),
+            plain_text_content=payload['message']
+        )
+        if payload.get('attachment'):
+            message.attachment = self._attachment(payload['attachment'])
+        try:
+            response = self.client.send(message)
+        except Exception as e:
+            raise DeliveryError(str(e))
+        if response.status_code >= 300:
+            raise DeliveryError(f"SendGrid returned {response.status_code}")
+
+def default_adapters():
+    """Real adapters for configured providers, logging fallbacks otherwise"""
+    return {
+        'whatsapp': WhatsAppAdapter() if WhatsAppAdapter.is_configured() else LogAdapter('whatsapp'),
+        'email': EmailAdapter() if EmailAdapter.is_configured() else LogAdapter('email'),
+    }
+
+class DeliveryWorkerPool:
+    """Background threads that drain the delivery queue.
+
+    Each channel gets `adapter.concurrency` worker threads, which is what
+    enforces the per-channel concurrency limit. Failed sends are retried with
+    exponential backoff (base_delay * 2**attempt, capped at max_delay) and
+    dead-lettered after the job's max_attempts, or at once when the adapter
+    says the failure is not retryable.
+    """
+
+    def __init__(self, queue, adapters, poll_interval=1.0, base_delay=5, max_delay=3600):
+        self.queue = queue
+        self.adapters = adapters
+        self.poll_interval = poll_interval
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._stop = threading.Event()
+        self._threads = []
+
+    def backoff(self, attempts):
+        delay = min(self.max_delay, self.base_delay * 2 ** attempts)
+        # Jitter keeps retries from many jobs from arriving in lockstep
+        return delay * random.uniform(0.8, 1.2)
+
+    def process(self, job):
+        """Send one claimed job and record the outcome"""
+        adapter = self.adapters[job['channel']]
+        try:
+            adapter.send(job['payload'])
+        except Exception as e:
+            if not getattr(e, 'retryable', True) or job['attempts'] + 1 >= job['max_attempts']:
+                self.queue.dead_letter(job, e)
+                log_error('delivery', e)
+            else:
+                self.queue.retry(job, e, self.backoff(job['attempts']))
+            return False
+        self.queue.complete(job)
+        return True
+
+    def run_once(self, channel=None, limit=100):
+        """Synchronously process ready jobs; returns how many were handled"""
+        handled = 0
+        for name in ([channel] if channel else list(self.adapters)):
+            for job in self.queue.claim(name, limit):
+                self.process(job)
+                handled += 1
+        return handled
+
+    def _work(self, channel):
+        while not self._stop.is_set():
+            seen = self.queue.generation
+            try:
+                jobs = self.queue.claim(channel, 1)
+            except Exception as e:
+                log_error('delivery_claim', e)
+                jobs = []
+            if not jobs:
+                self.queue.wait_for_work(self.poll_interval, seen)
+                continue
+            try:
+                self.process(jobs[0])
+            except Exception as e:
+                # e.g. the queue could not record the outcome; the job's lease
+                # runs out and it is claimed again, so the thread carries on
+                log_error('delivery', e)
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        for channel, adapter in self.adapters.items():
+            for i in range(adapter.concurrency):
+                thread = threading.Thread(target=self._work, args=(channel,),
+                                          name=f"delivery-{channel}-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self.queue.wake()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
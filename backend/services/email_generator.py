@@ -0,0 +1,137 @@
+import threading
+from collections import OrderedDict
+from string import Template
+
+from logger import log_ai_operation
+
+# (upper bound in days overdue, bucket name); emails only differ in wording per bucket
+OVERDUE_BUCKETS = (
+    (0, 'not_due'),
+    (7, 'just_overdue'),
+    (30, 'overdue'),
+    (60, 'long_overdue'),
+)
+FINAL_BUCKET = 'seriously_overdue'
+
+TONES = ('friendly', 'professional', 'firm')
+DEFAULT_LOCALE = 'en-ZA'
+
+def overdue_bucket(days_overdue):
+    for upper, bucket in OVERDUE_BUCKETS:
+        if days_overdue <= upper:
+            return bucket
+    return FINAL_BUCKET
+
+class StubEmailModel:
+    """Local stand-in for the AI model.
+
+    A model is asked once per (tone, bucket, locale) for an email template
+    using $placeholders; the per-invoice details are substituted afterwards.
+    """
+
+    OPENINGS = {
+        'friendly': "Hi $client_name,\n\nI hope you're well! ",
+        'professional': "Dear $client_name,\n\n",
+        'firm': "Dear $client_name,\n\n",
+    }
+    BODIES = {
+        'not_due': "This is a reminder that invoice $invoice_id for $amount is due on $due_date.",
+        'just_overdue': "Invoice $invoice_id for $amount was due on $due_date and is now $days_overdue days overdue.",
+        'overdue': "Our records show that invoice $invoice_id for $amount is $days_overdue days overdue.",
+        'long_overdue': "Invoice $invoice_id for $amount remains unpaid, $days_overdue days after its due date of $due_date.",
+        'seriously_overdue': "Invoice $invoice_id for $amount is now $days_overdue days overdue and requires immediate attention.",
+    }
+    CLOSINGS = {
+        'friendly': " Could you let me know when we can expect payment?\n\nThanks so much,\n$sender",
+        'professional': " Please arrange payment at your earliest convenience.\n\nKind regards,\n$sender",
+        'firm': " Please settle this amount within 7 days to avoid further action.\n\nRegards,\n$sender",
+    }
+
+    def generate(self, tone, bucket, locale):
+        return self.OPENINGS[tone] + self.BODIES[bucket] + self.CLOSINGS[tone]
+
+class EmailGenerator:
+    """Renders chase emails from templates cached per (tone, bucket, locale).
+
+    The model is only called on a cache miss; its template is compiled once
+    and kept in an LRU cache of `cache_size` entries. Rendering an email is
+    then a single placeholder substitution.
+    """
+
+    def __init__(self, model, cache_size=1024):
+        self.model = model
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _template(self, tone, bucket, locale):
+        key = (tone, bucket, locale)
+        with self._lock:
+            template = self._cache.get(key)
+            if template is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return template
+
+        template = Template(self.model.generate(tone, bucket, locale))
+        log_ai_operation('email_template_generated', None, f"{tone}/{bucket}/{locale}")
+
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = template
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return template
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    @staticmethod
+    def _key(invoice, locale):
+        tone = invoice.get('tone') or 'professional'
+        if tone not in TONES:
+            raise ValueError(f"Unknown tone: {tone}")
+        days_overdue = int(invoice.get('days_overdue') or 0)
+        return tone, overdue_bucket(days_overdue), invoice.get('locale') or locale
+
+    @staticmethod
+    def _fields(invoice):
+        amount = invoice.get('invoice_amount', invoice.get('amount'))
+        try:
+            amount = f"R{float(amount):,.2f}"
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid amount: {amount}")
+        invoice_id = invoice.get('id') or invoice.get('invoice_id')
+        if not invoice_id:
+            raise ValueError('Invoice id is required')
+        return {
+            'client_name': invoice.get('client_name') or 'there',
+            'amount': amount,
+            'due_date': invoice.get('due_date') or '',
+            'days_overdue': int(invoice.get('days_overdue') or 0),
+            'invoice_id': invoice_id,
+            'sender': invoice.get('business_name') or 'InvoiceAccelerator',
+        }
+
+    def generate(self, invoice, locale=DEFAULT_LOCALE):
+        """Render the chase email for one invoice dict; ValueError if it has no id, amount or known tone"""
+        return self._template(*self._key(invoice, locale)).safe_substitute(self._fields(invoice))
+
+    def generate_batch(self, invoices, locale=DEFAULT_LOCALE):
+        """Render emails for many invoices, looking each template up once per batch"""
+        templates = {}
+        emails = []
+        for invoice in invoices:
+            key = self._key(invoice, locale)
+            template = templates.get(key)
+            if template is None:
+                template = templates[key] = self._template(*key)
+            emails.append(template.safe_substitute(self._fields(invoice)))
+        return emails
+
+# Create global instance
+email_generator = EmailGenerator(StubEmailModel())
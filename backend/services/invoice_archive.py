@@ -0,0 +1,271 @@
+import json
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from logger import logger, log_error
+from records import Invoice, InvoiceStatus
+from services.sqlite_db import get_connection, transaction
+
+# Invoices paid longer ago than this many days are moved to the archive
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_PAID_AFTER_DAYS', '90'))
+
+# Most invoices compressed together into one archive block
+ARCHIVE_BLOCK_SIZE = 1000
+
+# Decompressed blocks each process keeps for lookups by id
+BLOCK_CACHE_SIZE = 16
+
+def _month(invoice):
+    """YYYY-MM partition an archived invoice belongs to: the month it was paid in"""
+    return (invoice.paid_at or invoice.created_at or '')[:7]
+
+class InvoiceArchive:
+    """Append-only, compressed cold tier for settled invoices.
+
+    Paid invoices are moved out of the invoice store once they are
+    `ARCHIVE_AFTER_DAYS` old, so the store's indexes, counts and the
+    reminder scans only cover open and recently paid invoices. Archived
+    invoices are partitioned by the month they were paid in and written in
+    zlib-compressed blocks of up to ARCHIVE_BLOCK_SIZE records, which are
+    never modified afterwards. An index maps every archived id to its block,
+    so a lookup by id decompresses one block, and per-month totals keep
+    archived invoices in the stats and revenue figures without reading any
+    blocks. A discarded invoice is dropped from the index and the totals;
+    its row stays in its block, unread.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._blocks = OrderedDict()
+        get_connection(path).executescript('''
+            CREATE TABLE IF NOT EXISTS invoice_archive_blocks (
+                block_id INTEGER PRIMARY KEY,
+                month TEXT NOT NULL,
+                invoice_count INTEGER NOT NULL,
+                -- zlib-compressed JSON array of invoice rows (store column order)
+                data BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_invoice_archive_blocks_month ON invoice_archive_blocks (month);
+            CREATE TRIGGER IF NOT EXISTS trg_invoice_archive_blocks_update BEFORE UPDATE ON invoice_archive_blocks
+            BEGIN
+                SELECT RAISE(ABORT, 'invoice archive blocks are append-only');
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_invoice_archive_blocks_delete BEFORE DELETE ON invoice_archive_blocks
+            BEGIN
+                SELECT RAISE(ABORT, 'invoice archive blocks are append-only');
+            END;
+            CREATE TABLE IF NOT EXISTS invoice_archive_index (
+                invoice_id TEXT PRIMARY KEY,
+                block_id INTEGER NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_invoice_archive_index_block ON invoice_archive_index (block_id);
+            CREATE TABLE IF NOT EXISTS invoice_archive_months (
+                month TEXT PRIMARY KEY,
+                invoice_count INTEGER NOT NULL,
+                amount_cents INTEGER NOT NULL
+            );
+        ''')
+
+    @property
+    def _conn(self):
+        return get_connection(self.path)
+
+    def _archived_ids(self, invoice_ids):
+        invoice_ids = [str(invoice_id) for invoice_id in invoice_ids]
+        found = set()
+        for i in range(0, len(invoice_ids), 1000):
+            chunk = invoice_ids[i:i + 1000]
+            found.update(row[0] for row in self._conn.execute(
+                f"SELECT invoice_id FROM invoice_archive_index WHERE invoice_id IN ({', '.join('?' * len(chunk))})",
+                chunk
+            ))
+        return found
+
+    def append(self, invoices):
+        """Archive paid invoices; ones already archived are skipped. Returns how many were added"""
+        by_month = {}
+        for invoice in invoices:
+            if invoice.status != InvoiceStatus.PAID:
+                raise ValueError(f"Invoice {invoice.id} is not paid")
+            by_month.setdefault(_month(invoice), []).append(invoice)
+
+        added = 0
+        conn = self._conn
+        with transaction(conn):
+            for month, group in sorted(by_month.items()):
+                # A run that stopped between archiving and removing retries the same invoices
+                archived = self._archived_ids(invoice.id for invoice in group)
+                group = [invoice for invoice in group if str(invoice.id) not in archived]
+                if not group:
+                    continue
+                for start in range(0, len(group), ARCHIVE_BLOCK_SIZE):
+                    block = group[start:start + ARCHIVE_BLOCK_SIZE]
+                    data = zlib.compress(json.dumps([invoice.to_row() for invoice in block],
+                                                    separators=(',', ':')).encode(), 9)
+                    block_id = conn.execute(
+                        "INSERT INTO invoice_archive_blocks (month, invoice_count, data) VALUES (?, ?, ?)",
+                        (month, len(block), data)
+                    ).lastrowid
+                    conn.executemany("INSERT INTO invoice_archive_index (invoice_id, block_id) VALUES (?, ?)",
+                                     [(str(invoice.id), block_id) for invoice in block])
+                conn.execute(
+                    "INSERT INTO invoice_archive_months (month, invoice_count, amount_cents) VALUES (?, ?, ?) "
+                    "ON CONFLICT (month) DO UPDATE SET "
+                    "invoice_count = invoice_count + excluded.invoice_count, "
+                    "amount_cents = amount_cents + excluded.amount_cents",
+                    (month, len(group), sum(invoice.amount_cents for invoice in group))
+                )
+                added += len(group)
+        return added
+
+    def _block(self, block_id):
+        """{invoice id: row} for one block; blocks never change, so they are cached as is"""
+        with self._lock:
+            rows = self._blocks.get(block_id)
+            if rows is not None:
+                self._blocks.move_to_end(block_id)
+                return rows
+        data = self._conn.execute(
+            "SELECT data FROM invoice_archive_blocks WHERE block_id = ?", (block_id,)
+        ).fetchone()[0]
+        rows = {str(row[0]): row for row in json.loads(zlib.decompress(data))}
+        with self._lock:
+            self._blocks[block_id] = rows
+            if len(self._blocks) > BLOCK_CACHE_SIZE:
+                self._blocks.popitem(last=False)
+        return rows
+
+    def get(self, invoice_id):
+        row = self._conn.execute(
+            "SELECT block_id FROM invoice_archive_index WHERE invoice_id = ?", (str(invoice_id),)
+        ).fetchone()
+        return Invoice.from_row(self._block(row[0])[str(invoice_id)]) if row else None
+
+    def _ids_by_block(self, invoice_ids):
+        """{block id: [invoice id, ...]} for the ids that are archived"""
+        invoice_ids = [str(invoice_id) for invoice_id in invoice_ids]
+        by_block = {}
+        for i in range(0, len(invoice_ids), 1000):
+            chunk = invoice_ids[i:i + 1000]
+            for invoice_id, block_id in self._conn.execute(
+                f"SELECT invoice_id, block_id FROM invoice_archive_index "
+                f"WHERE invoice_id IN ({', '.join('?' * len(chunk))})", chunk
+            ):
+                by_block.setdefault(block_id, []).append(invoice_id)
+        return by_block
+
+    def get_many(self, invoice_ids):
+        """{id: invoice} for the ids that are archived, decompressing each block once"""
+        invoices = {}
+        for block_id, ids in self._ids_by_block(invoice_ids).items():
+            rows = self._block(block_id)
+            for invoice_id in ids:
+                invoices[invoice_id] = Invoice.from_row(rows[invoice_id])
+        return invoices
+
+    def month(self, month):
+        """Yield the invoices archived for one YYYY-MM partition"""
+        block_ids = [row[0] for row in self._conn.execute(
+            "SELECT block_id FROM invoice_archive_blocks WHERE month = ? ORDER BY block_id", (month,)
+        )]
+        # One block per query, so no read stays open while the caller works through the invoices
+        for block_id in block_ids:
+            data = self._conn.execute(
+                "SELECT data FROM invoice_archive_blocks WHERE block_id = ?", (block_id,)
+            ).fetchone()[0]
+            # Rows of discarded invoices are no longer indexed
+            indexed = {row[0] for row in self._conn.execute(
+                "SELECT invoice_id FROM invoice_archive_index WHERE block_id = ?", (block_id,)
+            )}
+            for row in json.loads(zlib.decompress(data)):
+                if str(row[0]) in indexed:
+                    yield Invoice.from_row(row)
+
+    def discard(self, invoice_ids):
+        """Drop the archived copies of invoices that are back in the store; returns how many were dropped"""
+        dropped = 0
+        conn = self._conn
+        with transaction(conn):
+            for block_id, ids in self._ids_by_block(invoice_ids).items():
+                rows = self._block(block_id)
+                month = conn.execute(
+                    "SELECT month FROM invoice_archive_blocks WHERE block_id = ?", (block_id,)
+                ).fetchone()[0]
+                conn.execute(
+                    "UPDATE invoice_archive_months "
+                    "SET invoice_count = invoice_count - ?, amount_cents = amount_cents - ? WHERE month = ?",
+                    (len(ids), sum(Invoice.from_row(rows[invoice_id]).amount_cents for invoice_id in ids), month)
+                )
+                conn.executemany("DELETE FROM invoice_archive_index WHERE invoice_id = ?",
+                                 [(invoice_id,) for invoice_id in ids])
+                dropped += len(ids)
+        return dropped
+
+    def count(self, status=None):
+        """Archived invoices (all of them paid)"""
+        if status is not None and InvoiceStatus.coerce(status) != InvoiceStatus.PAID:
+            return 0
+        return self._conn.execute(
+            "SELECT COALESCE(SUM(invoice_count), 0) FROM invoice_archive_months"
+        ).fetchone()[0]
+
+    def paid_by_month(self, since=None):
+        """{YYYY-MM: (count, amount_cents)} of archived invoices, from month `since` on"""
+        rows = self._conn.execute(
+            "SELECT month, invoice_count, amount_cents FROM invoice_archive_months WHERE month >= ?",
+            (since or '',)
+        )
+        return {month: (count, amount_cents) for month, count, amount_cents in rows}
+
+    def archive_settled(self, store, days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BLOCK_SIZE, now=None,
+                        on_removed=None):
+        """Move invoices paid more than `days` ago from the store into the archive; returns how many moved.
+
+        `on_removed`, if given, is called with the invoices each batch took
+        out of the store.
+        """
+        cutoff = ((now or datetime.now()) - timedelta(days=days)).isoformat()
+        moved = 0
+        while True:
+            invoices = store.paid_before(cutoff, batch_size)
+            if not invoices:
+                break
+            # Archived before they are removed, so stopping in between loses nothing
+            self.append(invoices)
+            removed = store.remove_many([invoice.id for invoice in invoices], InvoiceStatus.PAID)
+            moved += removed
+            if removed < len(invoices):
+                # Re-opened since they were read: the store keeps them, so their archived copies
+                # go, or they would be counted twice and a later pass would keep the stale copy
+                left = store.get_many([invoice.id for invoice in invoices])
+                self.discard(left)
+                invoices = [invoice for invoice in invoices if invoice.id not in left]
+            if removed and on_removed:
+                on_removed(invoices)
+            if not removed:
+                break
+        if moved:
+            logger.info("Archived %d paid invoice(s)", moved)
+        return moved
+
+    def start_archiver(self, store, days=ARCHIVE_AFTER_DAYS, interval=3600, on_removed=None):
+        """Run archive_settled() every `interval` seconds on a daemon thread"""
+        def run():
+            while True:
+                try:
+                    self.archive_settled(store, days, on_removed=on_removed)
+                except Exception as e:
+                    log_error('invoice_archive', e)
+                time.sleep(interval)
+
+        thread = threading.Thread(target=run, name='invoice-archiver', daemon=True)
+        thread.start()
+        return thread
+
+# Create global instance
+invoice_archive = InvoiceArchive()
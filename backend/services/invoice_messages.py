@@ -0,0 +1,55 @@
+from datetime import date
+
+from records import Channel, format_cents
+
+# Bank details clients pay into; the invoice number is the EFT reference
+PAYMENT_DETAILS = {
+    'bank': 'Standard Bank',
+    'account_number': '0123456789',
+    'branch_code': '123456',
+    'email': 'payments@invoiceaccelerator.co.za'
+}
+
+def payment_instructions(invoice_id):
+    return dict(PAYMENT_DETAILS, reference=invoice_id)
+
+# Opening of a reminder for each invoice tone
+REMINDER_OPENINGS = {
+    'friendly': "just a friendly reminder from {sender}",
+    'professional': "this is a reminder from {sender}",
+    'firm': "this is a final notice from {sender}",
+}
+
+def build_message(invoice, kind='invoice'):
+    """Plain-text invoice or reminder message for the invoice's channel"""
+    sender = invoice.business_name or 'InvoiceAccelerator'
+    amount = format_cents(invoice.amount_cents)
+    if kind == 'reminder':
+        opening = REMINDER_OPENINGS[invoice.tone.label]
+        # ISO dates compare correctly as strings
+        overdue = (invoice.due_date or '') < date.today().isoformat()
+        text = (f"Hi {invoice.client_name}, {opening.format(sender=sender)} that invoice "
+                f"{invoice.id} for R{amount} "
+                f"{'was' if overdue else 'is'} due on {invoice.due_date}.")
+    else:
+        text = (f"Hi {invoice.client_name}, {sender} has sent you invoice {invoice.id} "
+                f"for R{amount}, due on {invoice.due_date}.")
+
+    return (f"{text} Please pay by EFT to {PAYMENT_DETAILS['bank']}, account "
+            f"{PAYMENT_DETAILS['account_number']}, branch {PAYMENT_DETAILS['branch_code']}, "
+            f"using reference {invoice.id}.")
+
+def delivery_payload(invoice, kind='invoice', attachment=None):
+    """Job payload for the delivery queue; `attachment` is the path of the invoice PDF"""
+    to = invoice.client_email if invoice.channel == Channel.EMAIL else invoice.client_phone
+    payload = {
+        'kind': kind,
+        'invoice_id': invoice.id,
+        'to': to,
+        'subject': f"{'Reminder: ' if kind == 'reminder' else ''}Invoice {invoice.id}",
+        'message': build_message(invoice, kind),
+        'tone': invoice.tone.label
+    }
+    if attachment:
+        payload['attachment'] = {'path': attachment, 'filename': f"{invoice.id}.pdf"}
+    return payload
@@ -0,0 +1,72 @@
+import os
+import threading
+from datetime import datetime
+
+from services.sqlite_db import get_connection, transaction
+
+def format_invoice_number(day, sequence):
+    """Build an invoice number such as INV-20251116-42"""
+    return f"INV-{day}-{sequence}"
+
+class InvoiceNumberAllocator:
+    """Hands out unique invoice numbers sequenced per day.
+
+    The per-day counter lives in SQLite and is advanced inside a
+    BEGIN IMMEDIATE transaction, which serialises threads and worker
+    processes alike. Each thread reserves a block of sequence values at a
+    time and hands them out locally, so the shared counter is only touched
+    once per block rather than once per invoice. Values left in a block when
+    a process exits or the day rolls over are skipped, so numbers are
+    unique and increasing per thread but may have gaps.
+    """
+
+    def __init__(self, path=None, block_size=None, clock=datetime.now):
+        self.path = path
+        self.block_size = block_size or int(os.getenv('INVOICE_ID_BLOCK_SIZE', '50'))
+        self._clock = clock
+        self._local = threading.local()
+
+        get_connection(path).execute('''
+            CREATE TABLE IF NOT EXISTS invoice_sequences (
+                day TEXT PRIMARY KEY,
+                next_value INTEGER NOT NULL
+            )
+        ''')
+
+    def _reserve(self, day, count):
+        """Atomically claim `count` consecutive sequence values for `day`"""
+        conn = get_connection(self.path)
+        with transaction(conn):
+            conn.execute(
+                "INSERT OR IGNORE INTO invoice_sequences (day, next_value) VALUES (?, 1)", (day,)
+            )
+            start = conn.execute(
+                "SELECT next_value FROM invoice_sequences WHERE day = ?", (day,)
+            ).fetchone()[0]
+            conn.execute(
+                "UPDATE invoice_sequences SET next_value = ? WHERE day = ?", (start + count, day)
+            )
+        return range(start, start + count)
+
+    def next_number(self):
+        """Return the next invoice number for today"""
+        day = self._clock().strftime('%Y%m%d')
+        pid = os.getpid()
+        block = getattr(self._local, 'block', None)
+
+        # A block is only valid for the day and the process that reserved it;
+        # a forked worker must never reuse values reserved by its parent
+        if block is None or block[0] != day or block[1] != pid:
+            block = self._local.block = (day, pid, iter(self._reserve(day, self.block_size)))
+
+        sequence = next(block[2], None)
+        if sequence is None:
+            block = self._local.block = (day, pid, iter(self._reserve(day, self.block_size)))
+            sequence = next(block[2])
+
+        return format_invoice_number(day, sequence)
+
+    def allocate_block(self, count):
+        """Reserve `count` invoice numbers for today in a single transaction"""
+        day = self._clock().strftime('%Y%m%d')
+        return [format_invoice_number(day, sequence) for sequence in self._reserve(day, count)]
@@ -0,0 +1,257 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from records import format_cents
+from services.invoice_messages import PAYMENT_DETAILS
+from services.sqlite_db import DEFAULT_DB_PATH
+
+# Bump when the layout changes so cached PDFs are rendered again
+TEMPLATE_VERSION = '1'
+
+DEFAULT_CACHE_DIR = os.getenv('INVOICE_PDF_DIR', os.path.join(os.path.dirname(DEFAULT_DB_PATH), 'pdfs'))
+
+# Most PDFs sent to a pool process in one task by render_many
+RENDER_CHUNK_SIZE = 100
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 56
+
+def pdf_fields(invoice):
+    """The invoice values that appear on the PDF; they alone determine the cache key"""
+    return {
+        'id': str(invoice.id),
+        'business_name': invoice.business_name or 'InvoiceAccelerator',
+        'client_name': invoice.client_name or '',
+        'client_email': invoice.client_email or '',
+        'client_phone': invoice.client_phone or '',
+        'amount': f"R{format_cents(invoice.amount_cents)}",
+        'due_date': invoice.due_date or '',
+        'issued': (invoice.created_at or '')[:10],
+    }
+
+def cache_key(fields):
+    canonical = json.dumps(fields, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(f"{TEMPLATE_VERSION}\n{canonical}".encode()).hexdigest()
+
+def _escape(text):
+    # PDF string literal in WinAnsi (Latin-1) encoding
+    text = str(text).replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    return text.encode('latin-1', 'replace')
+
+def _layout(fields):
+    """(font, size, x, y, text) for every line of the invoice"""
+    lines = []
+    y = PAGE_HEIGHT - MARGIN
+
+    def add(text, font='F1', size=11, x=MARGIN, gap=16):
+        nonlocal y
+        lines.append((font, size, x, y, text))
+        y -= gap
+
+    add(fields['business_name'], 'F2', 18, gap=28)
+    add('INVOICE', 'F2', 14, gap=22)
+    add(f"Invoice number: {fields['id']}")
+    if fields['issued']:
+        add(f"Issued: {fields['issued']}")
+    add(f"Due: {fields['due_date']}", gap=30)
+
+    add('Bill to', 'F2', 12)
+    add(fields['client_name'])
+    for contact in (fields['client_email'], fields['client_phone']):
+        if contact:
+            add(contact)
+    y -= 14
+
+    add('Amount due', 'F2', 12)
+    add(fields['amount'], 'F2', 16, gap=34)
+
+    add('Payment instructions', 'F2', 12)
+    add(f"Bank: {PAYMENT_DETAILS['bank']}")
+    add(f"Account number: {PAYMENT_DETAILS['account_number']}")
+    add(f"Branch code: {PAYMENT_DETAILS['branch_code']}")
+    add(f"Reference: {fields['id']}")
+    add(f"Proof of payment: {PAYMENT_DETAILS['email']}")
+    return lines
+
+def render_invoice_pdf(fields):
+    """Render an invoice as a one-page PDF using the standard Helvetica fonts"""
+    stream = b''.join(
+        b'BT /%s %d Tf %d %d Td (%s) Tj ET\n' % (font.encode(), size, x, y, _escape(text))
+        for font, size, x, y, text in _layout(fields)
+    )
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] '
+        b'/Resources << /Font << /F1 4 0 R /F2 5 0 R >> >> /Contents 6 0 R >>' % (PAGE_WIDTH, PAGE_HEIGHT),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>',
+        b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream),
+    ]
+
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    out += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(out)
+
+def _write_atomic(path, data):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+def render_to_files(jobs):
+    """Pool task: render and store (path, fields) pairs; the bytes never travel back to the parent"""
+    for path, fields in jobs:
+        _write_atomic(path, render_invoice_pdf(fields))
+    return len(jobs)
+
+class PdfRenderer:
+    """Renders invoice PDFs in a process pool into a content-addressed disk cache.
+
+    A PDF is stored under the SHA-256 of its template version and the values
+    printed on it, so re-sends and reminders for an unchanged invoice reuse
+    the same file, and any edit produces a new one. The pool is created on
+    first use in each process (worker processes are forked) and uses the
+    spawn start method, which is safe from a multi-threaded server.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, workers=None):
+        # Absolute, because the path travels in delivery job payloads
+        self.directory = os.path.abspath(directory)
+        self.workers = workers or int(os.getenv('PDF_WORKERS', '0')) or os.cpu_count() or 1
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+        # cache key -> Future of a render in progress, so concurrent requests share it
+        self._pending = {}
+
+    def _executor(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+                    self._pending = {}
+                    self._pid = os.getpid()
+        return self._pool
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.pdf")
+
+    def _submit(self, items):
+        """Start rendering the (fields, key) pairs that are neither cached nor already in progress.
+
+        Returns the futures to wait on. New renders are sent to the pool in
+        chunks, so a bulk render costs one round-trip per chunk, not per PDF.
+        """
+        missing = [(fields, key) for fields, key in items if not os.path.exists(self.path(key))]
+        if not missing:
+            return []
+        pool = self._executor()
+        futures, new, seen = set(), [], set()
+        with self._lock:
+            for fields, key in missing:
+                future = self._pending.get(key)
+                if future is not None:
+                    futures.add(future)
+                elif key not in seen:
+                    seen.add(key)
+                    new.append((fields, key))
+
+            chunk_size = max(1, min(RENDER_CHUNK_SIZE, -(-len(new) // self.workers)))
+            submitted = []
+            for i in range(0, len(new), chunk_size):
+                chunk = new[i:i + chunk_size]
+                future = pool.submit(render_to_files, [(self.path(key), fields) for fields, key in chunk])
+                for _, key in chunk:
+                    self._pending[key] = future
+                submitted.append((future, [key for _, key in chunk]))
+        # Outside the lock: a callback runs at once if its render already finished
+        for future, keys in submitted:
+            future.add_done_callback(lambda _, keys=keys: self._forget(keys))
+            futures.add(future)
+        return futures
+
+    def _forget(self, keys):
+        with self._lock:
+            for key in keys:
+                self._pending.pop(key, None)
+
+    def _discard(self, pool):
+        """Drop a broken pool and its renders in progress; the next _executor() call starts a new one"""
+        with self._lock:
+            # Unless another thread has already replaced it
+            if self._pid == os.getpid() and (pool is None or self._pool is pool):
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+                self._pid = None
+                self._pending = {}
+
+    def _start(self, items, wait):
+        """_submit() the items, and wait for them if asked.
+
+        If a pool process died (killed for memory, say) the pool is broken:
+        every submit and every render it had in progress fails with
+        BrokenProcessPool. The pool is then replaced and the PDFs that are
+        still missing are submitted once more.
+        """
+        for retry in (False, True):
+            pool = self._pool if self._pid == os.getpid() else None
+            try:
+                futures = self._submit(items)
+                if wait:
+                    for future in futures:
+                        future.result()
+                return
+            except BrokenProcessPool:
+                self._discard(pool)
+                if retry:
+                    raise
+
+    def prefetch(self, invoice):
+        """Start rendering in the background; returns the cache path without waiting"""
+        fields = pdf_fields(invoice)
+        key = cache_key(fields)
+        self._start([(fields, key)], wait=False)
+        return self.path(key)
+
+    def render(self, invoice):
+        """Return (path, cache key) of the invoice's PDF, rendering it if needed"""
+        fields = pdf_fields(invoice)
+        key = cache_key(fields)
+        self._start([(fields, key)], wait=True)
+        return self.path(key), key
+
+    def render_many(self, invoices):
+        """Render many invoices in parallel across the pool; returns how many needed rendering"""
+        items = [(fields, cache_key(fields)) for fields in map(pdf_fields, invoices)]
+        pending = [key for _, key in items if not os.path.exists(self.path(key))]
+        self._start(items, wait=True)
+        return len(set(pending))
+
+    def shutdown(self):
+        if self._pool is not None and self._pid == os.getpid():
+            self._pool.shutdown()
+            self._pool = None
+            self._pid = None
+
+# Create global instance
+pdf_renderer = PdfRenderer()
@@ -0,0 +1,719 @@
+import os
+import sqlite3
+import itertools
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+
+from records import INVOICE_FIELDS, Channel, Invoice, InvoiceStatus
+from services.sqlite_db import get_connection, transaction
+
+# Search text shorter than a trigram matches as a prefix instead of a substring
+TRIGRAM = 3
+# Marks the start of an indexed client name or email in the SQLite search index
+PREFIX_MARK = '\x02'
+# Up to this many removals are deleted from a sorted index one bisect (and memmove)
+# at a time; past it, a single filtering pass over the index is cheaper
+BISECT_REMOVE_LIMIT = 256
+
+class InvoiceStore:
+    """Interface shared by the invoice store backends.
+
+    Invoices are immutable records.Invoice instances. Lookups by id are O(1)
+    and the status/channel/due date queries are served from indexes, so no
+    operation scans the whole store.
+    """
+
+    def add(self, invoice):
+        raise NotImplementedError
+
+    def add_many(self, invoices):
+        for invoice in invoices:
+            self.add(invoice)
+
+    def get(self, invoice_id):
+        raise NotImplementedError
+
+    def get_many(self, invoice_ids):
+        """{id: invoice} for the ids that exist"""
+        invoices = {}
+        for invoice_id in invoice_ids:
+            invoice = self.get(invoice_id)
+            if invoice is not None:
+                invoices[invoice_id] = invoice
+        return invoices
+
+    def update_status(self, invoice_id, status):
+        raise NotImplementedError
+
+    def update_status_many(self, invoice_ids, status):
+        """Set the status of many invoices at once; returns how many exist"""
+        return sum(self.update_status(invoice_id, status) is not None for invoice_id in invoice_ids)
+
+    def open_by_amount(self, amount_cents, limit=None):
+        """Invoices for exactly `amount_cents` that are not paid yet (at most `limit`)"""
+        raise NotImplementedError
+
+    def open_by_amounts(self, amounts, limit=None):
+        """{amount_cents: open invoices} for several amounts (at most `limit` each)"""
+        return {amount: self.open_by_amount(amount, limit) for amount in set(amounts)}
+
+    def by_status(self, status):
+        raise NotImplementedError
+
+    def by_channel(self, channel):
+        raise NotImplementedError
+
+    def paid_before(self, cutoff, limit=None):
+        """Paid invoices whose paid_at is before the ISO timestamp `cutoff` (at most `limit`)"""
+        raise NotImplementedError
+
+    def remove_many(self, invoice_ids, status=None):
+        """Delete invoices (only those still in `status`, if given); returns how many were deleted"""
+        raise NotImplementedError
+
+    def due_between(self, start=None, end=None, limit=None):
+        """Invoices with start <= due_date <= end, ordered by due date (at most `limit`)"""
+        raise NotImplementedError
+
+    def page(self, cursor=None, limit=50):
+        """Up to `limit` invoices, most recently added first, and the cursor of the next page.
+
+        Pass the returned cursor back to continue after the last invoice of
+        this page; it is None once there are no more invoices. Cursors are
+        positions, so paging stays correct while invoices are added.
+        """
+        raise NotImplementedError
+
+    def search(self, text=None, amount_min=None, amount_max=None, due_from=None, due_to=None, limit=50):
+        """Invoices matching every given filter (at most `limit`).
+
+        `text` matches case-insensitively anywhere in the id, client name or
+        client email; one or two characters match the start of the client
+        name or email, and a complete invoice id returns just that invoice.
+        Amounts are in cents; all ranges are inclusive. Text matches come
+        most recently added first; otherwise results are ordered by due date,
+        or by amount when only an amount range is given.
+        """
+        text = (text or '').strip()
+        ranges = (amount_min, amount_max, due_from or None, due_to or None)
+        invoice = self.get(text) if text else None
+        if invoice is not None:
+            return [invoice] if _in_ranges(invoice, *ranges) else []
+        return self._search(text, *ranges, limit)
+
+    def _search(self, text, amount_min, amount_max, due_from, due_to, limit):
+        raise NotImplementedError
+
+    def count(self, status=None):
+        raise NotImplementedError
+
+    def __len__(self):
+        return self.count()
+
+class InMemoryInvoiceStore(InvoiceStore):
+    """Process-local store: a dict by id plus secondary indexes"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._by_id = {}
+        # Dicts are used as insertion-ordered sets of invoice ids
+        self._by_status = {}
+        self._by_channel = {}
+        # Sorted (due_date, id) pairs; ISO dates sort lexicographically
+        self._due_index = []
+        # Sorted (amount_cents, sequence, id) triples, for amount ranges and exact amounts
+        self._amount_index = []
+        # Sorted (paid_at, id) pairs of paid invoices, so the oldest payments come first
+        self._paid_index = []
+        # Search grams -> ids: every trigram of the lower-cased id, client name
+        # and email, plus '^' + the first one and two characters of name and email.
+        # Also insertion-ordered, so reversed() walks a gram's ids newest first
+        self._text_index = {}
+        # Insertion sequence number of each id, for newest-first search results
+        self._sequence = {}
+        # (sequence, id) pairs, sorted as they are appended; pages start with a bisect
+        self._order = []
+        self._next_sequence = itertools.count()
+
+    def add(self, invoice):
+        grams = _prepare(invoice)
+        with self._lock:
+            if invoice.id in self._by_id:
+                raise KeyError(f"Invoice {invoice.id} already exists")
+            self._index(invoice, grams)
+            self._order.append((self._sequence[invoice.id], invoice.id))
+            insort(self._amount_index, _amount_entry(invoice, self._sequence[invoice.id]))
+            if invoice.due_date:
+                insort(self._due_index, (invoice.due_date, invoice.id))
+            if _paid_entry(invoice):
+                insort(self._paid_index, _paid_entry(invoice))
+        return invoice
+
+    def add_many(self, invoices):
+        # All or nothing, like the SQLite transaction: every check runs before any index changes
+        prepared = [(invoice, _prepare(invoice)) for invoice in invoices]
+        with self._lock:
+            seen = set()
+            for invoice, _ in prepared:
+                if invoice.id in self._by_id or invoice.id in seen:
+                    raise KeyError(f"Invoice {invoice.id} already exists")
+                seen.add(invoice.id)
+            for invoice, grams in prepared:
+                self._index(invoice, grams)
+            self._order.extend((self._sequence[invoice.id], invoice.id) for invoice, _ in prepared)
+            # Appended then sorted once: Timsort merges the new run into the existing
+            # one, where an insort per invoice would shift the whole list each time
+            self._amount_index.extend(_amount_entry(invoice, self._sequence[invoice.id])
+                                      for invoice, _ in prepared)
+            self._amount_index.sort()
+            self._due_index.extend((invoice.due_date, invoice.id) for invoice, _ in prepared if invoice.due_date)
+            self._due_index.sort()
+            paid = [_paid_entry(invoice) for invoice, _ in prepared if _paid_entry(invoice)]
+            if paid:
+                self._paid_index.extend(paid)
+                self._paid_index.sort()
+
+    def _index(self, invoice, grams):
+        """Add a checked invoice to the hashed indexes; nothing in here may raise part way.
+
+        The caller adds it to the sorted amount and due date indexes.
+        """
+        invoice_id = invoice.id
+        self._sequence[invoice_id] = next(self._next_sequence)
+        self._by_id[invoice_id] = invoice
+        self._by_status.setdefault(invoice.status, {})[invoice_id] = None
+        self._by_channel.setdefault(invoice.channel, {})[invoice_id] = None
+        for gram in grams:
+            self._text_index.setdefault(gram, {})[invoice_id] = None
+
+    def get(self, invoice_id):
+        # Records are immutable, so they are handed out without copying
+        return self._by_id.get(invoice_id)
+
+    def update_status(self, invoice_id, status):
+        status = InvoiceStatus.coerce(status)
+        with self._lock:
+            invoice = self._by_id.get(invoice_id)
+            if invoice is None:
+                return None
+            if invoice.status != status:
+                self._by_status[invoice.status].pop(invoice_id, None)
+                self._by_status.setdefault(status, {})[invoice_id] = None
+                if _paid_entry(invoice):
+                    self._paid_index = _remove_entries(self._paid_index, [_paid_entry(invoice)])
+                invoice = self._by_id[invoice_id] = invoice.with_status(status)
+                if _paid_entry(invoice):
+                    insort(self._paid_index, _paid_entry(invoice))
+            return invoice
+
+    def update_status_many(self, invoice_ids, status):
+        with self._lock:
+            return super().update_status_many(invoice_ids, status)
+
+    def open_by_amount(self, amount_cents, limit=None):
+        invoices = []
+        with self._lock:
+            lo = bisect_left(self._amount_index, (amount_cents,))
+            hi = bisect_left(self._amount_index, (amount_cents + 1,))
+            for k in range(lo, hi):
+                invoice = self._by_id[self._amount_index[k][2]]
+                if invoice.status != InvoiceStatus.PAID:
+                    invoices.append(invoice)
+                    if limit is not None and len(invoices) >= limit:
+                        break
+        return invoices
+
+    def by_status(self, status):
+        with self._lock:
+            ids = list(self._by_status.get(InvoiceStatus.coerce(status), ()))
+            return [self._by_id[i] for i in ids]
+
+    def by_channel(self, channel):
+        with self._lock:
+            ids = list(self._by_channel.get(Channel.coerce(channel), ()))
+            return [self._by_id[i] for i in ids]
+
+    def paid_before(self, cutoff, limit=None):
+        with self._lock:
+            hi = bisect_left(self._paid_index, (cutoff,))
+            if limit is not None:
+                hi = min(hi, limit)
+            return [self._by_id[i] for _, i in self._paid_index[:hi]]
+
+    def remove_many(self, invoice_ids, status=None):
+        status = InvoiceStatus.coerce(status) if status is not None else None
+        with self._lock:
+            removed = {}
+            for invoice_id in invoice_ids:
+                invoice = self._by_id.get(invoice_id)
+                if invoice is not None and (status is None or invoice.status == status):
+                    removed[invoice_id] = invoice
+            if removed:
+                invoices = removed.values()
+                sequences = [self._sequence[invoice.id] for invoice in invoices]
+                self._amount_index = _remove_entries(self._amount_index, [
+                    _amount_entry(invoice, sequence) for invoice, sequence in zip(invoices, sequences)
+                ])
+                self._order = _remove_entries(self._order, [
+                    (sequence, invoice.id) for invoice, sequence in zip(invoices, sequences)
+                ])
+                self._due_index = _remove_entries(self._due_index, [
+                    (invoice.due_date, invoice.id) for invoice in invoices if invoice.due_date
+                ])
+                self._paid_index = _remove_entries(self._paid_index, [
+                    _paid_entry(invoice) for invoice in invoices if _paid_entry(invoice)
+                ])
+            for invoice in removed.values():
+                self._unindex(invoice)
+        return len(removed)
+
+    def _unindex(self, invoice):
+        invoice_id = invoice.id
+        del self._by_id[invoice_id]
+        del self._sequence[invoice_id]
+        for index, key in ((self._by_status, invoice.status), (self._by_channel, invoice.channel)):
+            ids = index[key]
+            del ids[invoice_id]
+            if not ids:
+                del index[key]
+        for gram in _search_grams(invoice):
+            ids = self._text_index[gram]
+            del ids[invoice_id]
+            if not ids:
+                del self._text_index[gram]
+
+    def due_between(self, start=None, end=None, limit=None):
+        with self._lock:
+            lo, hi = self._due_span(start, end)
+            if limit is not None:
+                hi = min(hi, lo + limit)
+            return [self._by_id[i] for _, i in self._due_index[lo:hi]]
+
+    def page(self, cursor=None, limit=50):
+        with self._lock:
+            # The cursor is the sequence number of the previous page's last invoice
+            hi = bisect_left(self._order, (cursor,)) if cursor is not None else len(self._order)
+            lo = max(0, hi - limit)
+            invoices = [self._by_id[i] for _, i in reversed(self._order[lo:hi])]
+            return invoices, (self._order[lo][0] if lo else None)
+
+    def _due_span(self, due_from, due_to):
+        """(lo, hi) slice of the due date index covering the range"""
+        lo = bisect_left(self._due_index, (due_from,)) if due_from else 0
+        # '\uffff' sorts after every invoice id sharing the end date
+        hi = bisect_right(self._due_index, (due_to, '\uffff')) if due_to else len(self._due_index)
+        return lo, hi
+
+    def _amount_span(self, amount_min, amount_max):
+        """(lo, hi) slice of the amount index covering the range"""
+        lo = bisect_left(self._amount_index, (amount_min,)) if amount_min is not None else 0
+        hi = (bisect_left(self._amount_index, (amount_max + 1,)) if amount_max is not None
+              else len(self._amount_index))
+        return lo, hi
+
+    def _search(self, text, amount_min, amount_max, due_from, due_to, limit):
+        ranges = (amount_min, amount_max, due_from, due_to)
+        has_due = bool(due_from or due_to)
+        has_amount = amount_min is not None or amount_max is not None
+        text = text.lower()
+        with self._lock:
+            if text:
+                grams = _trigrams(text) if len(text) >= TRIGRAM else {'^' + text}
+                postings = sorted((self._text_index.get(gram, {}) for gram in grams), key=len)
+                smallest, others = postings[0], postings[1:]
+                # The narrowest range given, as (size, ids in it)
+                spans = []
+                if has_due:
+                    lo, hi = self._due_span(due_from, due_to)
+                    spans.append((hi - lo, (self._due_index[k][1] for k in range(lo, hi))))
+                if has_amount:
+                    lo, hi = self._amount_span(amount_min, amount_max)
+                    spans.append((hi - lo, (self._amount_index[k][2] for k in range(lo, hi))))
+                span_size, span_ids = min(spans, key=lambda span: span[0]) if spans else (0, None)
+                # Ids of the rarest gram walked, newest first, before `limit` of them are
+                # in the range too (taking the text and the range to be independent)
+                expected = len(smallest) * (span_size / len(self._by_id) if spans else 1)
+                walk_cost = min(len(smallest), limit * len(smallest) / max(expected, 1))
+                if spans and span_size < walk_cost:
+                    # A narrow range and a common gram: check the range's invoices against the text
+                    ids = sorted((i for i in span_ids if i in smallest),
+                                 key=self._sequence.__getitem__, reverse=True)
+                else:
+                    ids = reversed(smallest)
+                if spans:
+                    # Comparing the range first is cheapest and skips most of a common gram's ids
+                    ids = (i for i in ids if _in_ranges(self._by_id[i], *ranges))
+                candidates = (i for i in ids if all(i in posting for posting in others))
+                if len(text) >= TRIGRAM:
+                    # Every trigram matching does not make a substring match
+                    candidates = (i for i in candidates
+                                  if any(text in value for value in _search_values(self._by_id[i])))
+            elif has_due:
+                lo, hi = self._due_span(due_from, due_to)
+                candidates = (self._due_index[k][1] for k in range(lo, hi))
+            elif has_amount:
+                lo, hi = self._amount_span(amount_min, amount_max)
+                candidates = (self._amount_index[k][2] for k in range(lo, hi))
+            else:
+                candidates = reversed(self._by_id)
+
+            results = []
+            for invoice_id in candidates:
+                invoice = self._by_id[invoice_id]
+                if _in_ranges(invoice, *ranges):
+                    results.append(invoice)
+                    if len(results) >= limit:
+                        break
+            return results
+
+    def count(self, status=None):
+        if status is None:
+            return len(self._by_id)
+        return len(self._by_status.get(InvoiceStatus.coerce(status), ()))
+
+def _in_ranges(invoice, amount_min, amount_max, due_from, due_to):
+    if amount_min is not None and invoice.amount_cents < amount_min:
+        return False
+    if amount_max is not None and invoice.amount_cents > amount_max:
+        return False
+    if due_from and not (invoice.due_date and invoice.due_date >= due_from):
+        return False
+    if due_to and not (invoice.due_date and invoice.due_date <= due_to):
+        return False
+    return True
+
+def _amount_entry(invoice, sequence):
+    # Ties on amount keep insertion order
+    return invoice.amount_cents, sequence, invoice.id
+
+def _paid_entry(invoice):
+    """(paid_at, id) of a paid invoice whose payment time is known, else None"""
+    if invoice.status == InvoiceStatus.PAID and invoice.paid_at:
+        return invoice.paid_at, invoice.id
+    return None
+
+def _remove_entries(index, entries):
+    """Delete entries from a sorted index; returns the index, which may be a new list"""
+    if len(entries) <= BISECT_REMOVE_LIMIT:
+        for entry in entries:
+            i = bisect_left(index, entry)
+            if i < len(index) and index[i] == entry:
+                del index[i]
+        return index
+    entries = set(entries)
+    return [entry for entry in index if entry not in entries]
+
+def _prepare(invoice):
+    """Check an invoice can be indexed and return its search grams"""
+    for field in ('id', 'client_name', 'client_email', 'due_date'):
+        value = getattr(invoice, field)
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f"Invoice {field} must be text, not {type(value).__name__}")
+    if not isinstance(invoice.amount_cents, int):
+        raise ValueError(f"Invoice amount_cents must be an integer, not {type(invoice.amount_cents).__name__}")
+    return _search_grams(invoice)
+
+def _search_values(invoice):
+    return [value.lower() for value in (invoice.id, invoice.client_name, invoice.client_email) if value]
+
+def _trigrams(text):
+    return {text[i:i + TRIGRAM] for i in range(len(text) - TRIGRAM + 1)}
+
+def _search_grams(invoice):
+    grams = set()
+    for value in _search_values(invoice):
+        grams |= _trigrams(value)
+    for value in (invoice.client_name, invoice.client_email):
+        if value:
+            value = value.lower()
+            grams.update('^' + value[:n] for n in range(1, TRIGRAM) if len(value) >= n)
+    return grams
+
+def _search_terms_sql(row):
+    """SQL for the text indexed for a row: id, then name and email behind start markers.
+
+    The trigrams of the markers plus a name's or email's first one or two
+    characters let the trigram index answer short prefix queries too.
+    """
+    mark = f"char({ord(PREFIX_MARK)}, {ord(PREFIX_MARK)})"
+    return (f"{row}.id || char(10) || {mark} || COALESCE({row}.client_name, '') || char(10) || "
+            f"{mark} || COALESCE({row}.client_email, '')")
+
+class SQLiteInvoiceStore(InvoiceStore):
+    """Durable store backed by an indexed SQLite table"""
+
+    def __init__(self, path=None):
+        self.path = path
+        conn = get_connection(path)
+        search_exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'invoice_search'"
+        ).fetchone() is not None
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(invoices)")]
+        if columns and 'paid_at' not in columns:
+            # Payment times were not kept before and cannot be recovered, so invoices
+            # already paid keep a NULL paid_at: they stay in the store, out of the archive
+            conn.execute("ALTER TABLE invoices ADD COLUMN paid_at TEXT")
+        conn.executescript(f'''
+            CREATE TABLE IF NOT EXISTS invoices (
+                id TEXT PRIMARY KEY,
+                client_name TEXT,
+                amount_cents INTEGER NOT NULL,
+                due_date TEXT,
+                status INTEGER NOT NULL,
+                tone INTEGER NOT NULL,
+                channel INTEGER NOT NULL,
+                business_name TEXT,
+                client_email TEXT,
+                client_phone TEXT,
+                created_at TEXT,
+                days_overdue INTEGER NOT NULL DEFAULT 0,
+                paid_at TEXT
+            );
+            -- (status, paid_at) also finds the paid invoices that are due for archiving
+            DROP INDEX IF EXISTS idx_invoices_status;
+            CREATE INDEX IF NOT EXISTS idx_invoices_status_paid_at ON invoices (status, paid_at);
+            CREATE INDEX IF NOT EXISTS idx_invoices_channel ON invoices (channel);
+            -- (due_date, id) matches the ORDER BY of due_between, so LIMIT stops early
+            DROP INDEX IF EXISTS idx_invoices_due_date;
+            CREATE INDEX IF NOT EXISTS idx_invoices_due_date_id ON invoices (due_date, id);
+
+            -- Per-status counts kept up to date by triggers, so count() is a lookup
+            CREATE TABLE IF NOT EXISTS invoice_status_counts (
+                status INTEGER PRIMARY KEY,
+                count INTEGER NOT NULL
+            );
+            CREATE TRIGGER IF NOT EXISTS trg_invoices_count_insert AFTER INSERT ON invoices
+            BEGIN
+                INSERT INTO invoice_status_counts (status, count) VALUES (NEW.status, 1)
+                    ON CONFLICT (status) DO UPDATE SET count = count + 1;
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_invoices_count_delete AFTER DELETE ON invoices
+            BEGIN
+                UPDATE invoice_status_counts SET count = count - 1 WHERE status = OLD.status;
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_invoices_count_update AFTER UPDATE OF status ON invoices
+                WHEN NEW.status != OLD.status
+            BEGIN
+                UPDATE invoice_status_counts SET count = count - 1 WHERE status = OLD.status;
+                INSERT INTO invoice_status_counts (status, count) VALUES (NEW.status, 1)
+                    ON CONFLICT (status) DO UPDATE SET count = count + 1;
+            END;
+
+            -- Search: trigram full-text index of each invoice's search terms, kept in step
+            -- with the invoices by triggers
+            CREATE INDEX IF NOT EXISTS idx_invoices_amount ON invoices (amount_cents);
+            CREATE VIRTUAL TABLE IF NOT EXISTS invoice_search USING fts5 (
+                terms, content='', tokenize='trigram'
+            );
+            CREATE TRIGGER IF NOT EXISTS trg_invoices_search_insert AFTER INSERT ON invoices
+            BEGIN
+                INSERT INTO invoice_search (rowid, terms) VALUES (NEW.rowid, {_search_terms_sql('NEW')});
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_invoices_search_delete AFTER DELETE ON invoices
+            BEGIN
+                INSERT INTO invoice_search (invoice_search, rowid, terms) VALUES ('delete', OLD.rowid, {_search_terms_sql('OLD')});
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_invoices_search_update AFTER UPDATE OF id, client_name, client_email ON invoices
+            BEGIN
+                INSERT INTO invoice_search (invoice_search, rowid, terms) VALUES ('delete', OLD.rowid, {_search_terms_sql('OLD')});
+                INSERT INTO invoice_search (rowid, terms) VALUES (NEW.rowid, {_search_terms_sql('NEW')});
+            END;
+        ''')
+        with transaction(conn):
+            if not search_exists:
+                # Index the invoices stored before the search table existed
+                conn.execute(f"INSERT INTO invoice_search (rowid, terms) "
+                             f"SELECT rowid, {_search_terms_sql('invoices')} FROM invoices")
+            # Databases created before the counts table existed are counted once
+            if conn.execute("SELECT 1 FROM invoice_status_counts LIMIT 1").fetchone() is None:
+                conn.execute(
+                    "INSERT INTO invoice_status_counts (status, count) "
+                    "SELECT status, COUNT(*) FROM invoices GROUP BY status"
+                )
+
+    @property
+    def _conn(self):
+        return get_connection(self.path)
+
+    _INSERT = f"INSERT INTO invoices ({', '.join(INVOICE_FIELDS)}) VALUES ({', '.join('?' * len(INVOICE_FIELDS))})"
+    _SELECT = f"SELECT {', '.join(INVOICE_FIELDS)} FROM invoices"
+
+    def add(self, invoice):
+        try:
+            self._conn.execute(self._INSERT, invoice.to_row())
+        except sqlite3.IntegrityError:
+            raise KeyError(f"Invoice {invoice.id} already exists")
+        return invoice
+
+    def add_many(self, invoices):
+        rows = [invoice.to_row() for invoice in invoices]
+        with transaction(self._conn):
+            self._conn.executemany(self._INSERT, rows)
+
+    def get(self, invoice_id):
+        row = self._conn.execute(f"{self._SELECT} WHERE id = ?", (invoice_id,)).fetchone()
+        return Invoice.from_row(row) if row else None
+
+    def get_many(self, invoice_ids):
+        invoice_ids = list(invoice_ids)
+        invoices = {}
+        # Well under SQLite's limit on bound parameters per statement
+        for i in range(0, len(invoice_ids), 1000):
+            chunk = invoice_ids[i:i + 1000]
+            rows = self._conn.execute(f"{self._SELECT} WHERE id IN ({', '.join('?' * len(chunk))})", chunk)
+            for row in rows:
+                invoice = Invoice.from_row(row)
+                invoices[invoice.id] = invoice
+        return invoices
+
+    # A status change stamps paid_at (set when becoming paid, cleared otherwise)
+    _UPDATE_STATUS = ("UPDATE invoices SET status = ?, "
+                      "paid_at = CASE WHEN status = ? THEN paid_at ELSE ? END WHERE id = ?")
+
+    def _status_params(self, status):
+        """Parameters of _UPDATE_STATUS that precede the invoice id"""
+        paid_at = datetime.now().isoformat() if status == InvoiceStatus.PAID else None
+        return int(status), int(status), paid_at
+
+    def update_status_many(self, invoice_ids, status):
+        status = InvoiceStatus.coerce(status)
+        params = self._status_params(status)
+        conn = self._conn
+        with transaction(conn):
+            cursor = conn.executemany(self._UPDATE_STATUS,
+                                      ((*params, invoice_id) for invoice_id in invoice_ids))
+        return cursor.rowcount
+
+    def open_by_amount(self, amount_cents, limit=None):
+        rows = self._conn.execute(
+            f"{self._SELECT} WHERE amount_cents = ? AND status != ? LIMIT ?",
+            (amount_cents, int(InvoiceStatus.PAID), -1 if limit is None else limit)
+        )
+        return [Invoice.from_row(row) for row in rows]
+
+    def open_by_amounts(self, amounts, limit=None):
+        amounts = list(set(amounts))
+        invoices = {amount: [] for amount in amounts}
+        for i in range(0, len(amounts), 1000):
+            chunk = amounts[i:i + 1000]
+            # Numbered per amount so the limit applies to each one, not the whole query
+            rows = self._conn.execute(
+                f"SELECT * FROM (SELECT {', '.join(INVOICE_FIELDS)}, "
+                f"ROW_NUMBER() OVER (PARTITION BY amount_cents) AS n FROM invoices "
+                f"WHERE amount_cents IN ({', '.join('?' * len(chunk))}) AND status != ?) WHERE ? IS NULL OR n <= ?",
+                (*chunk, int(InvoiceStatus.PAID), limit, limit)
+            )
+            for row in rows:
+                invoice = Invoice.from_row(row[:-1])
+                invoices[invoice.amount_cents].append(invoice)
+        return invoices
+
+    def update_status(self, invoice_id, status):
+        status = InvoiceStatus.coerce(status)
+        conn = self._conn
+        with transaction(conn):
+            cursor = conn.execute(self._UPDATE_STATUS, (*self._status_params(status), invoice_id))
+            if cursor.rowcount == 0:
+                return None
+            row = conn.execute(f"{self._SELECT} WHERE id = ?", (invoice_id,)).fetchone()
+        return Invoice.from_row(row)
+
+    def by_status(self, status):
+        rows = self._conn.execute(f"{self._SELECT} WHERE status = ?", (int(InvoiceStatus.coerce(status)),))
+        return [Invoice.from_row(row) for row in rows]
+
+    def by_channel(self, channel):
+        rows = self._conn.execute(f"{self._SELECT} WHERE channel = ?", (int(Channel.coerce(channel)),))
+        return [Invoice.from_row(row) for row in rows]
+
+    def paid_before(self, cutoff, limit=None):
+        rows = self._conn.execute(
+            f"{self._SELECT} WHERE status = ? AND paid_at < ? ORDER BY paid_at LIMIT ?",
+            (int(InvoiceStatus.PAID), cutoff, -1 if limit is None else limit)
+        )
+        return [Invoice.from_row(row) for row in rows]
+
+    def remove_many(self, invoice_ids, status=None):
+        query, extra = "DELETE FROM invoices WHERE id = ?", ()
+        if status is not None:
+            query, extra = query + " AND status = ?", (int(InvoiceStatus.coerce(status)),)
+        conn = self._conn
+        with transaction(conn):
+            cursor = conn.executemany(query, ((invoice_id, *extra) for invoice_id in invoice_ids))
+        return cursor.rowcount
+
+    def due_between(self, start=None, end=None, limit=None):
+        clauses, params = ['due_date IS NOT NULL'], []
+        if start:
+            clauses.append('due_date >= ?')
+            params.append(start)
+        if end:
+            clauses.append('due_date <= ?')
+            params.append(end)
+        query = f"{self._SELECT} WHERE {' AND '.join(clauses)} ORDER BY due_date, id"
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        rows = self._conn.execute(query, params)
+        return [Invoice.from_row(row) for row in rows]
+
+    def page(self, cursor=None, limit=50):
+        query, params = f"SELECT rowid, {', '.join(INVOICE_FIELDS)} FROM invoices", []
+        if cursor is not None:
+            # The cursor is the rowid of the previous page's last invoice
+            query += " WHERE rowid < ?"
+            params.append(cursor)
+        # One row more than asked shows whether another page follows
+        rows = self._conn.execute(f"{query} ORDER BY rowid DESC LIMIT ?", params + [limit + 1]).fetchall()
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return [Invoice.from_row(row[1:]) for row in rows[:limit]], next_cursor
+
+    def _search(self, text, amount_min, amount_max, due_from, due_to, limit):
+        source, clauses, params = 'invoices', [], []
+        # Each order matches the index that finds the rows, so LIMIT stops the scan early
+        if text:
+            source = 'invoice_search JOIN invoices ON invoices.rowid = invoice_search.rowid'
+            order = 'invoice_search.rowid DESC'
+            clauses.append('invoice_search MATCH ?')
+            if len(text) < TRIGRAM:
+                # Padded with the start markers to a whole trigram, it only matches a prefix
+                text = PREFIX_MARK * (TRIGRAM - len(text)) + text
+            params.append('"%s"' % text.replace('"', '""'))
+        elif due_from or due_to:
+            order = 'invoices.due_date, invoices.id'
+        elif amount_min is not None or amount_max is not None:
+            order = 'invoices.amount_cents, invoices.rowid'
+        else:
+            order = 'invoices.rowid DESC'
+        for clause, value in (('amount_cents >= ?', amount_min), ('amount_cents <= ?', amount_max),
+                              ('due_date >= ?', due_from), ('due_date <= ?', due_to)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+
+        columns = ', '.join(f"invoices.{field}" for field in INVOICE_FIELDS)
+        query = f"SELECT {columns} FROM {source}"
+        if clauses:
+            query += f" WHERE {' AND '.join(clauses)}"
+        rows = self._conn.execute(f"{query} ORDER BY {order} LIMIT ?", params + [limit])
+        return [Invoice.from_row(row) for row in rows]
+
+    def count(self, status=None):
+        if status is None:
+            return self._conn.execute(
+                "SELECT COALESCE(SUM(count), 0) FROM invoice_status_counts"
+            ).fetchone()[0]
+        row = self._conn.execute(
+            "SELECT count FROM invoice_status_counts WHERE status = ?", (int(InvoiceStatus.coerce(status)),)
+        ).fetchone()
+        return row[0] if row else 0
+
+def create_invoice_store(backend=None, path=None):
+    """Build the store selected by INVOICE_STORE ('memory' or 'sqlite')"""
+    backend = backend or os.getenv('INVOICE_STORE', 'memory')
+    if backend == 'sqlite':
+        return SQLiteInvoiceStore(path)
+    if backend == 'memory':
+        return InMemoryInvoiceStore()
+    raise ValueError(f"Unknown invoice store backend: {backend}")
@@ -0,0 +1,218 @@
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, g, request
+
+# Upper bounds in seconds; the last (+Inf) bucket is implicit
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05, 0.1, 0.5, 1)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic counter, one series per label tuple"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield self.name, self.labelnames, labels, value
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per label tuple"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts (not cumulative), then sum and count
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            series = [(labels, list(counts), total, count)
+                      for labels, (counts, total, count) in self._series.items()]
+        names = self.labelnames + ('le',)
+        for labels, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                yield f'{self.name}_bucket', names, labels + (_format_value(bound),), cumulative
+            yield f'{self.name}_sum', self.labelnames, labels, total
+            yield f'{self.name}_count', self.labelnames, labels, count
+
+class Gauge:
+    """Value read at scrape time from a callback.
+
+    The callback returns a number, or a dict of label tuple -> number when
+    the gauge has labels. Used for queue depths, which live in SQLite.
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name, help, callback, labelnames=()):
+        self.name = name
+        self.help = help
+        self.callback = callback
+        self.labelnames = tuple(labelnames)
+
+    def samples(self):
+        values = self.callback()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labels, value in values.items():
+            yield self.name, self.labelnames, labels, value
+
+class MetricsRegistry:
+    """Collects the app's metrics and renders them in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._local = threading.local()
+        self._sqlalchemy_installed = False
+
+        self.request_latency = self.register(Histogram(
+            'http_request_duration_seconds', 'Time spent handling a request, up to the first byte',
+            ('endpoint', 'method', 'status')
+        ))
+        self.request_queries = self.register(Histogram(
+            'http_request_db_queries', 'Database queries issued per request',
+            ('endpoint',), COUNT_BUCKETS
+        ))
+        self.query_latency = self.register(Histogram(
+            'db_query_duration_seconds', 'Time spent executing database queries',
+            ('backend',), QUERY_BUCKETS
+        ))
+        self.paypal_latency = self.register(Histogram(
+            'paypal_request_duration_seconds', 'Latency of outbound PayPal API calls',
+            ('method', 'route', 'outcome')
+        ))
+        self.errors = self.register(Counter(
+            'app_errors_total', 'Unhandled exceptions raised while handling requests', ('endpoint',)
+        ))
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def gauge(self, name, help, callback, labelnames=()):
+        return self.register(Gauge(name, help, callback, labelnames))
+
+    def record_query(self, backend, seconds):
+        self.query_latency.observe(seconds, backend)
+        # Attribute the query to the request running on this thread, if any
+        state = getattr(self._local, 'queries', None)
+        if state is not None:
+            self._local.queries = state + 1
+
+    def render(self):
+        lines = []
+        for metric in list(self._metrics.values()):
+            try:
+                samples = list(metric.samples())
+            except Exception as e:
+                # A failing gauge callback must not break the whole scrape
+                lines.append(f'# {metric.name} unavailable: {e}')
+                continue
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labelnames, labels, value in samples:
+                lines.append(f'{name}{_format_labels(labelnames, labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def _before_request(self):
+        g._metrics_start = time.perf_counter()
+        self._local.queries = 0
+
+    def _finish(self, status):
+        start = g.pop('_metrics_start', None)
+        if start is None:
+            return
+        endpoint = request.endpoint or 'unmatched'
+        self.request_latency.observe(time.perf_counter() - start, endpoint, request.method, str(status))
+        self.request_queries.observe(self._local.queries, endpoint)
+        self._local.queries = None
+
+    def _after_request(self, response):
+        self._finish(response.status_code)
+        return response
+
+    def _teardown_request(self, error):
+        if error is not None:
+            self.errors.inc(request.endpoint or 'unmatched')
+        # Still pending only if the after_request hooks never ran
+        if '_metrics_start' in g:
+            self._finish(500)
+
+    def _install_sqlalchemy(self):
+        if self._sqlalchemy_installed:
+            return
+        try:
+            from sqlalchemy import event
+            from sqlalchemy.engine import Engine
+        except ImportError:
+            return
+
+        def before(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault('_metrics_start', []).append(time.perf_counter())
+
+        def after(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info['_metrics_start'].pop()
+            self.record_query(conn.dialect.name, time.perf_counter() - started)
+
+        event.listen(Engine, 'before_cursor_execute', before)
+        event.listen(Engine, 'after_cursor_execute', after)
+        self._sqlalchemy_installed = True
+
+    def init_app(self, app, endpoint='/metrics'):
+        """Time every request of the app and serve the metrics at `endpoint`"""
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        self._install_sqlalchemy()
+        app.add_url_rule(endpoint, 'metrics', lambda: Response(self.render(), mimetype=CONTENT_TYPE))
+
+# Create global instance
+metrics = MetricsRegistry()
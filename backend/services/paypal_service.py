@@ -1,23 +1,129 @@
 import os
-import paypalrestsdk
+import threading
+import time
 import requests
-from flask import jsonify
-from logger import logger, log_payment_operation
+from requests.adapters import HTTPAdapter
+from logger import log_payment_operation
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from services.metrics import metrics
+
+PAYPAL_API_BASES = {
+    'sandbox': 'https://api-m.sandbox.paypal.com',
+    'live': 'https://api-m.paypal.com'
+}
+
+# Refresh the OAuth token this many seconds before PayPal expires it
+TOKEN_REFRESH_MARGIN = 60
+
+class PayPalError(Exception):
+    """A PayPal call that could not be completed"""
 
 class PayPalService:
     def __init__(self):
         self.client_id = os.getenv('PAYPAL_CLIENT_ID')
         self.client_secret = os.getenv('PAYPAL_CLIENT_SECRET')
         self.mode = os.getenv('PAYPAL_MODE', 'sandbox')
+        # PAYPAL_API_BASE overrides the endpoint, e.g. to point at a local stub server
+        self.api_base = os.getenv('PAYPAL_API_BASE', PAYPAL_API_BASES.get(self.mode, PAYPAL_API_BASES['sandbox']))
+        self.timeout = (
+            float(os.getenv('PAYPAL_CONNECT_TIMEOUT', '3.05')),
+            float(os.getenv('PAYPAL_READ_TIMEOUT', '15'))
+        )
+        
+        # One keep-alive session shared by all request threads
+        pool_size = int(os.getenv('PAYPAL_POOL_SIZE', '10'))
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv('PAYPAL_BREAKER_THRESHOLD', '5')),
+            reset_timeout=float(os.getenv('PAYPAL_BREAKER_RESET', '30'))
+        )
         
-        # Configure PayPal SDK
-        paypalrestsdk.configure({
-            "mode": self.mode,
-            "client_id": self.client_id,
-            "client_secret": self.client_secret
-        })
+        self._token = None
+        self._token_expires_at = 0
+        self._token_lock = threading.Lock()
         
         self.is_configured = bool(self.client_id and self.client_secret)
+    
+    def _send(self, method, path, route=None, **kwargs):
+        """Send one HTTP request through the circuit breaker.
+
+        `route` is the path with ids left as placeholders and labels the
+        latency metric; it defaults to the path itself.
+        """
+        route = route or path
+        if not self.breaker.allow():
+            metrics.paypal_latency.observe(0.0, method, route, 'circuit_open')
+            raise CircuitOpenError('PayPal is currently unavailable')
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, f"{self.api_base}{path}", timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            metrics.paypal_latency.observe(time.perf_counter() - start, method, route, 'error')
+            self.breaker.record_failure()
+            raise PayPalError(f"PayPal request failed: {e}")
+        metrics.paypal_latency.observe(time.perf_counter() - start, method, route, f"{response.status_code // 100}xx")
+        
+        # Only server-side errors count against PayPal's health
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+    
+    def _get_access_token(self, force_refresh=False):
+        """Return a cached OAuth access token, fetching a new one shortly before it expires"""
+        if not force_refresh and self._token and time.monotonic() < self._token_expires_at:
+            return self._token
+        
+        with self._token_lock:
+            # Another thread may have refreshed it while we waited
+            if not force_refresh and self._token and time.monotonic() < self._token_expires_at:
+                return self._token
+            
+            response = self._send(
+                'POST', '/v1/oauth2/token',
+                auth=(self.client_id, self.client_secret),
+                data={'grant_type': 'client_credentials'},
+                headers={'Accept': 'application/json'}
+            )
+            if response.status_code != 200:
+                raise PayPalError(f"PayPal authentication failed ({response.status_code})")
+            
+            body = response.json()
+            self._token = body['access_token']
+            self._token_expires_at = time.monotonic() + int(body.get('expires_in', 0)) - TOKEN_REFRESH_MARGIN
+            return self._token
+    
+    def _api_call(self, method, path, payload=None, route=None):
+        """Call the PayPal REST API; returns (status_code, parsed JSON body)"""
+        response = None
+        for force_refresh in (False, True):
+            token = self._get_access_token(force_refresh=force_refresh)
+            response = self._send(method, path, route=route, json=payload, headers={
+                'Authorization': f"Bearer {token}",
+                'Content-Type': 'application/json'
+            })
+            # A revoked or expired token is refreshed once and the call retried
+            if response.status_code != 401:
+                break
+        
+        try:
+            body = response.json() if response.content else {}
+        except ValueError:
+            body = {}
+        return response.status_code, body
+    
+    @staticmethod
+    def _error_message(body):
+        return body.get('message') or body.get('error_description') or body.get('name') or 'PayPal request failed'
+    
+    @staticmethod
+    def _link(body, rel):
+        return next((link['href'] for link in body.get('links', []) if link.get('rel') == rel), None)
         
     def create_subscription(self, plan_id, user_email, user_id):
         """Create a PayPal subscription"""
@@ -36,7 +142,7 @@ class PayPalService:
             if not paypal_plan_id:
                 return {'success': False, 'error': 'Invalid plan ID'}
             
-            subscription = paypalrestsdk.Subscription({
+            status, body = self._api_call('POST', '/v1/billing/subscriptions', {
                 "plan_id": paypal_plan_id,
                 "subscriber": {
                     "email_address": user_email
@@ -55,16 +161,16 @@ class PayPalService:
                 }
             })
             
-            if subscription.create():
-                log_payment_operation('subscription_created', user_id, plan_id, f"PayPal ID: {subscription.id}")
+            if status in (200, 201):
+                log_payment_operation('subscription_created', user_id, plan_id, f"PayPal ID: {body['id']}")
                 return {
                     'success': True,
-                    'subscription_id': subscription.id,
-                    'approval_url': subscription.links[0].href if subscription.links else None,
-                    'status': subscription.status
+                    'subscription_id': body['id'],
+                    'approval_url': self._link(body, 'approve'),
+                    'status': body.get('status')
                 }
             else:
-                error_msg = subscription.error
+                error_msg = self._error_message(body)
                 log_payment_operation('subscription_failed', user_id, plan_id, f"Error: {error_msg}")
                 return {'success': False, 'error': error_msg}
                 
@@ -88,7 +194,7 @@ class PayPalService:
             if not amount:
                 return {'success': False, 'error': 'Invalid plan ID'}
             
-            payment = paypalrestsdk.Payment({
+            status, body = self._api_call('POST', '/v1/payments/payment', {
                 "intent": "sale",
                 "payer": {
                     "payment_method": "paypal"
@@ -115,20 +221,20 @@ class PayPalService:
                 }]
             })
             
-            if payment.create():
-                log_payment_operation('payment_created', user_id, plan_id, f"PayPal ID: {payment.id}")
+            if status in (200, 201):
+                log_payment_operation('payment_created', user_id, plan_id, f"PayPal ID: {body['id']}")
                 
                 # Find approval URL
-                approval_url = next((link.href for link in payment.links if link.rel == "approval_url"), None)
+                approval_url = self._link(body, 'approval_url')
                 
                 return {
                     'success': True,
-                    'payment_id': payment.id,
+                    'payment_id': body['id'],
                     'approval_url': approval_url,
-                    'status': payment.state
+                    'status': body.get('state')
                 }
             else:
-                error_msg = payment.error
+                error_msg = self._error_message(body)
                 log_payment_operation('payment_failed', user_id, plan_id, f"Error: {error_msg}")
                 return {'success': False, 'error': error_msg}
                 
@@ -139,17 +245,21 @@ class PayPalService:
     def execute_payment(self, payment_id, payer_id):
         """Execute a payment after user approval"""
         try:
-            payment = paypalrestsdk.Payment.find(payment_id)
+            status, body = self._api_call(
+                'POST', f"/v1/payments/payment/{payment_id}/execute", {"payer_id": payer_id},
+                route='/v1/payments/payment/{id}/execute'
+            )
             
-            if payment.execute({"payer_id": payer_id}):
+            if status == 200:
+                transactions = body.get('transactions') or []
                 return {
                     'success': True,
-                    'payment_id': payment.id,
-                    'state': payment.state,
-                    'amount': payment.transactions[0].amount.total if payment.transactions else None
+                    'payment_id': body.get('id', payment_id),
+                    'state': body.get('state'),
+                    'amount': transactions[0]['amount']['total'] if transactions else None
                 }
             else:
-                return {'success': False, 'error': payment.error}
+                return {'success': False, 'error': self._error_message(body)}
                 
         except Exception as e:
             return {'success': False, 'error': str(e)}
@@ -0,0 +1,29 @@
+import fcntl
+import os
+
+from services.sqlite_db import DEFAULT_DB_PATH
+
+# Open lock files by name; kept for the life of the process
+_held = {}
+
+def acquire_process_lock(name, directory=None):
+    """Try to become the one process on this host that runs `name`.
+
+    Takes a non-blocking exclusive flock on <directory>/<name>.lock (next to
+    the SQLite database by default). The lock is held until the process
+    exits, so when the holder dies the next process to ask takes over.
+    Returns True if this process holds the lock.
+    """
+    if name in _held:
+        return _held[name][0] == os.getpid()
+
+    directory = directory or os.path.dirname(DEFAULT_DB_PATH) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd = os.open(os.path.join(directory, f"{name}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return False
+    _held[name] = (os.getpid(), fd)
+    return True
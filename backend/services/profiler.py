@@ -0,0 +1,130 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import g, request
+
+from logger import logger
+
+PROFILE_DIR = os.path.join('logs', 'profiles')
+MAX_STACK_DEPTH = 128
+
+def _folded_stack(frame):
+    """Render a frame's stack root-first as 'file:function;file:function;...'"""
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+class SlowRequestProfiler:
+    """Opt-in sampling profiler for slow requests.
+
+    While enabled, a background thread samples the stacks of the threads
+    that are serving requests every `interval` seconds. When a request takes
+    longer than `threshold_ms` its samples are written to PROFILE_DIR in the
+    folded format read by flamegraph.pl and speedscope. At most one profile
+    per endpoint is written every `cooldown` seconds.
+    """
+
+    def __init__(self, threshold_ms=None, interval=0.005, cooldown=60, directory=PROFILE_DIR):
+        self.threshold_ms = threshold_ms
+        self.interval = interval
+        self.cooldown = cooldown
+        self.directory = directory
+        self._active = {}
+        self._last_dump = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    @property
+    def enabled(self):
+        return self.threshold_ms is not None
+
+    def _ensure_sampler(self):
+        # The sampler thread does not survive a fork into a worker process
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._active = {}
+                self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                active = list(self._active.items())
+            if not active:
+                continue
+            frames = sys._current_frames()
+            stacks = [(samples, _folded_stack(frames[ident])) for ident, samples in active if ident in frames]
+            with self._lock:
+                for samples, stack in stacks:
+                    samples[stack] += 1
+
+    def _before_request(self):
+        self._ensure_sampler()
+        samples = Counter()
+        g._profile = (time.perf_counter(), samples)
+        with self._lock:
+            self._active[threading.get_ident()] = samples
+
+    def _after_request(self, response):
+        profile = g.pop('_profile', None)
+        if profile is None:
+            return response
+        start, samples = profile
+        with self._lock:
+            self._active.pop(threading.get_ident(), None)
+            # A copy the sampler cannot touch; it may still hold the original from its last pass
+            samples = samples.copy()
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if elapsed_ms >= self.threshold_ms and samples:
+            self._dump(request.endpoint or 'unmatched', elapsed_ms, samples)
+        return response
+
+    def _dump(self, endpoint, elapsed_ms, samples):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_dump.get(endpoint, -self.cooldown) < self.cooldown:
+                return
+            self._last_dump[endpoint] = now
+
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(self.directory, f"{stamp}_{endpoint}_{elapsed_ms:.0f}ms_{os.getpid()}.folded")
+        try:
+            with open(path, 'w') as f:
+                for stack, count in samples.most_common():
+                    f.write(f"{stack} {count}\n")
+        except OSError as e:
+            logger.warning("Could not write request profile %s: %s", path, e)
+            return
+        logger.info("Slow request %s took %.0fms, profile written to %s", endpoint, elapsed_ms, path)
+
+    def init_app(self, app):
+        """Profile the app's requests if a threshold is configured"""
+        if not self.enabled:
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+def profiler_from_env():
+    """Build the profiler from PROFILE_SLOW_REQUEST_MS (unset: disabled)"""
+    threshold = os.getenv('PROFILE_SLOW_REQUEST_MS')
+    return SlowRequestProfiler(
+        threshold_ms=float(threshold) if threshold else None,
+        interval=float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', '5')) / 1000
+    )
+
+# Create global instance
+slow_request_profiler = profiler_from_env()
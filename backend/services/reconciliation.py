@@ -0,0 +1,214 @@
+import csv
+import io
+import re
+from difflib import get_close_matches
+
+from records import InvoiceStatus, format_cents, to_cents
+
+# Statement lines matched and marked paid per transaction
+RECONCILE_BATCH_SIZE = 5000
+
+# Invoice numbers as clients type them into a payment reference:
+# INV-20251116-42, inv 20251116 42, INV20251116/42
+REFERENCE_PATTERN = re.compile(r'INV[\s\-_/.]*(\d{8})[\s\-_/.]*(\d+)', re.IGNORECASE)
+
+# Fuzzy matching: share of the client name's words that must appear in the
+# line, and the most open invoices with one amount worth comparing names against
+FUZZY_MIN_SCORE = 0.5
+FUZZY_MAX_CANDIDATES = 200
+
+# Bank CSV headers (lower-cased) mapped onto statement line fields; the
+# first column present wins
+CSV_COLUMNS = {
+    'id': ('id', 'transaction id', 'fitid'),
+    'date': ('date', 'transaction date', 'posting date', 'value date'),
+    'amount': ('amount', 'credit', 'credit amount', 'amount (zar)', 'value'),
+    'reference': ('reference', 'ref', 'payment reference', 'their reference'),
+    'description': ('description', 'narrative', 'details', 'memo', 'transaction description'),
+    'payer': ('payer', 'name', 'counterparty', 'from'),
+}
+
+OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+OFX_FIELDS = {'FITID': 'id', 'DTPOSTED': 'date', 'TRNAMT': 'amount', 'REFNUM': 'reference',
+              'MEMO': 'description', 'NAME': 'payer'}
+
+# Amounts as most banks export them, e.g. 1200.50 or -299.00
+PLAIN_AMOUNT = re.compile(r'(-?)(\d+)(?:\.(\d{1,2}))?')
+
+def parse_amount(text):
+    """Statement amount in cents: accepts 'R 1 200,50', '1,200.50' and '-299.00'"""
+    text = str(text or '').strip()
+    match = PLAIN_AMOUNT.fullmatch(text)
+    if match:
+        # Skips Decimal for the common case; this runs once per statement line
+        sign, whole, fraction = match.groups()
+        cents = int(whole) * 100 + int((fraction or '0').ljust(2, '0'))
+        return -cents if sign else cents
+    text = text.replace('R', '').replace(' ', '').replace('\xa0', '')
+    if ',' in text and '.' not in text and re.search(r',\d{2}$', text):
+        text = text.replace(',', '.')
+    return to_cents(text.replace(',', ''))
+
+def read_statement_csv(stream):
+    """Yield statement lines from a binary bank CSV stream without reading it all into memory"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    reader = csv.reader(text)
+    header = [name.strip().lower() for name in next(reader, [])]
+    columns = {}
+    for field, names in CSV_COLUMNS.items():
+        for name in names:
+            if name in header:
+                columns[field] = header.index(name)
+                break
+    for row in reader:
+        if any(row):
+            yield {field: row[index].strip() for field, index in columns.items() if index < len(row)}
+
+def read_statement_ofx(stream, chunk_size=65536):
+    """Yield statement lines from the <STMTTRN> entries of a binary OFX stream (SGML or XML)"""
+    text = io.TextIOWrapper(stream, encoding='utf-8', errors='replace')
+    buffer, line = '', None
+    while True:
+        chunk = text.read(chunk_size)
+        buffer += chunk
+        # The tag at the last '<' may continue in the next chunk
+        end = len(buffer) if not chunk else max(buffer.rfind('<'), 0)
+        for match in OFX_TAG.finditer(buffer, 0, end):
+            closing, tag, value = match.groups()
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if closing:
+                    if line is not None:
+                        yield line
+                    line = None
+                else:
+                    line = {}
+            elif line is not None and not closing and tag in OFX_FIELDS:
+                line[OFX_FIELDS[tag]] = value.strip()
+        buffer = buffer[end:]
+        if not chunk:
+            return
+
+def reference_invoice_id(text):
+    """The invoice number quoted in a payment reference, or None"""
+    match = REFERENCE_PATTERN.search(text)
+    return f"INV-{match.group(1)}-{int(match.group(2))}" if match else None
+
+def _words(text):
+    return set(re.findall(r'[a-z0-9]{2,}', text.lower()))
+
+def _name_score(client_name, line_words):
+    """Share of the client's name words found in the line, allowing for typos"""
+    name_words = _words(client_name or '')
+    if not name_words or not line_words:
+        return 0
+    hits = sum(1 for word in name_words
+               if word in line_words or get_close_matches(word, line_words, 1, 0.8))
+    return hits / len(name_words)
+
+def _result(line, status, **extra):
+    result = {'line': line['line'], 'status': status}
+    if line.get('date'):
+        result['date'] = line['date']
+    if line.get('amount_cents') is not None:
+        result['amount'] = format_cents(line['amount_cents'])
+    result['reference'] = line['text']
+    result.update(extra)
+    return result
+
+def reconcile_statement(lines, store, summary, batch_size=RECONCILE_BATCH_SIZE, archive=None, on_paid=None):
+    """Match bank statement credits to open invoices and mark them paid.
+
+    A credit matches the invoice whose number appears in its reference
+    (looked up by id, one query per batch) when the amounts agree. Lines
+    without a usable reference fall back to the open invoices for exactly
+    that amount whose client name best matches the line's text. Each batch
+    of matches is marked paid in one store transaction, so memory stays
+    constant however long the statement is.
+
+    Yields a result dict for every line that was not reconciled, with its
+    status: 'unmatched', 'ambiguous', 'amount_mismatch', 'already_paid' or
+    'invalid'. `summary` (a Counter) is updated with the count per outcome.
+    References to invoices that were moved to `archive` (an InvoiceArchive)
+    are reported as already paid. `on_paid`, if given, is called with the
+    invoices each batch marked paid, as they were before.
+    """
+    batch = []
+    for line_number, line in enumerate(lines, 1):
+        line['line'] = line_number
+        batch.append(line)
+        if len(batch) >= batch_size:
+            yield from _reconcile_batch(batch, store, summary, archive, on_paid)
+            batch = []
+    if batch:
+        yield from _reconcile_batch(batch, store, summary, archive, on_paid)
+
+def _reconcile_batch(batch, store, summary, archive, on_paid):
+    results, credits = [], []
+    for line in batch:
+        summary['lines'] += 1
+        line['text'] = ' '.join(line.get(field) or '' for field in ('reference', 'description', 'payer')).strip()
+        try:
+            line['amount_cents'] = parse_amount(line.get('amount'))
+        except ValueError:
+            line['amount_cents'] = None
+            summary['invalid'] += 1
+            results.append(_result(line, 'invalid', error=f"Invalid amount: {line.get('amount')}"))
+            continue
+        if line['amount_cents'] <= 0:
+            # Debits and fees are not payments
+            summary['ignored'] += 1
+            continue
+        line['invoice_id'] = reference_invoice_id(line['text'])
+        credits.append(line)
+
+    referenced = {line['invoice_id'] for line in credits if line['invoice_id']}
+    invoices = store.get_many(referenced)
+    if archive is not None and len(invoices) < len(referenced):
+        invoices.update(archive.get_many(referenced.difference(invoices)))
+    paid, fuzzy = {}, []
+    for line in credits:
+        invoice = invoices.get(line['invoice_id'])
+        if invoice is None:
+            # No reference, or one that does not exist (e.g. mistyped)
+            fuzzy.append(line)
+        elif invoice.status == InvoiceStatus.PAID or invoice.id in paid:
+            summary['already_paid'] += 1
+            results.append(_result(line, 'already_paid', invoice_id=invoice.id))
+        elif invoice.amount_cents != line['amount_cents']:
+            summary['amount_mismatch'] += 1
+            results.append(_result(line, 'amount_mismatch', invoice_id=invoice.id,
+                                   expected=format_cents(invoice.amount_cents)))
+        else:
+            paid[invoice.id] = invoice
+            summary['matched_reference'] += 1
+
+    candidates = store.open_by_amounts((line['amount_cents'] for line in fuzzy), FUZZY_MAX_CANDIDATES + 1)
+    for line in fuzzy:
+        open_invoices = [invoice for invoice in candidates[line['amount_cents']] if invoice.id not in paid]
+        if len(open_invoices) > FUZZY_MAX_CANDIDATES:
+            summary['ambiguous'] += 1
+            results.append(_result(line, 'ambiguous'))
+            continue
+
+        words = _words(line['text'])
+        scored = sorted(((_name_score(invoice.client_name, words), invoice) for invoice in open_invoices),
+                        key=lambda pair: pair[0], reverse=True)
+        if not scored or scored[0][0] < FUZZY_MIN_SCORE:
+            summary['unmatched'] += 1
+            results.append(_result(line, 'unmatched'))
+        elif len(scored) > 1 and scored[1][0] == scored[0][0]:
+            summary['ambiguous'] += 1
+            results.append(_result(line, 'ambiguous', candidates=[
+                invoice.id for score, invoice in scored if score == scored[0][0]
+            ][:10]))
+        else:
+            paid[scored[0][1].id] = scored[0][1]
+            summary['matched_fuzzy'] += 1
+
+    if paid:
+        store.update_status_many(list(paid), InvoiceStatus.PAID)
+        if on_paid:
+            on_paid(list(paid.values()))
+    results.sort(key=lambda result: result['line'])
+    return results
@@ -0,0 +1,218 @@
+import heapq
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from logger import logger, log_error
+from records import InvoiceStatus
+from services.invoice_messages import delivery_payload
+from services.sqlite_db import get_connection, transaction
+
+# Invoices read from the store per page by load()
+LOAD_BATCH_SIZE = 1000
+
+class ReminderScheduler:
+    """Queues reminders for invoices that are overdue or due soon.
+
+    Invoices sit in a min-heap keyed by the time their next reminder is due,
+    so a tick only pops the entries that are actually due instead of
+    scanning every invoice. The first reminder goes out `lead_days` before
+    the due date and repeats every `repeat_days` until the invoice is paid.
+    A client receives at most one reminder per `client_window` seconds;
+    reminders that hit the limit are pushed back to the end of the window.
+
+    The heap lives in the memory of the one process that runs the scheduler.
+    Other processes (e.g. the other web workers) hand invoices over through
+    a small SQLite table that is drained on every tick. The time of each
+    client's last reminder is kept in SQLite too, so the limit holds when
+    the scheduler restarts or moves to another process.
+    """
+
+    def __init__(self, store, queue, lead_days=3, repeat_days=7, client_window=24 * 3600,
+                 clock=time.time, path=None, attach=None):
+        self.store = store
+        self.queue = queue
+        # Optional function returning the attachment path for an invoice's reminder
+        self.attach = attach
+        self.lead_days = lead_days
+        self.repeat_days = repeat_days
+        self.client_window = client_window
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._heap = []
+        # invoice id -> time of its live heap entry; older entries are skipped when popped
+        self._scheduled = {}
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+        self.path = path
+        get_connection(path).executescript('''
+            CREATE TABLE IF NOT EXISTS reminder_handoff (
+                invoice_id TEXT PRIMARY KEY,
+                remind_at REAL NOT NULL
+            );
+            -- Clients reminded within the last client_window seconds
+            CREATE TABLE IF NOT EXISTS reminder_clients (
+                client TEXT PRIMARY KEY,
+                last_sent REAL NOT NULL
+            );
+        ''')
+
+    @property
+    def _conn(self):
+        return get_connection(self.path)
+
+    def _running_here(self):
+        return self._thread is not None and self._pid == os.getpid()
+
+    def _push(self, when, invoice_id):
+        self._scheduled[invoice_id] = when
+        heapq.heappush(self._heap, (when, invoice_id))
+
+    def _first_reminder(self, invoice):
+        """Time of an open invoice's first reminder, or None if it needs none"""
+        if invoice.status == InvoiceStatus.PAID or not invoice.due_date:
+            return None
+        try:
+            due = datetime.fromisoformat(invoice.due_date)
+        except (TypeError, ValueError):
+            return None
+        return (due - timedelta(days=self.lead_days)).timestamp()
+
+    def schedule(self, invoice):
+        """Schedule the first reminder for an open invoice"""
+        self.schedule_many((invoice,))
+
+    def schedule_many(self, invoices):
+        entries = []
+        for invoice in invoices:
+            when = self._first_reminder(invoice)
+            if when is not None:
+                entries.append((when, invoice.id))
+        if not entries:
+            return
+
+        if self._running_here():
+            with self._lock:
+                for when, invoice_id in entries:
+                    self._push(when, invoice_id)
+            return
+
+        conn = self._conn
+        with transaction(conn):
+            conn.executemany(
+                "INSERT OR REPLACE INTO reminder_handoff (invoice_id, remind_at) VALUES (?, ?)",
+                [(str(invoice_id), when) for when, invoice_id in entries]
+            )
+
+    def _drain_handoff(self):
+        """Move invoices scheduled by other processes onto the heap"""
+        conn = self._conn
+        with transaction(conn):
+            rows = conn.execute("DELETE FROM reminder_handoff RETURNING invoice_id, remind_at").fetchall()
+        if rows:
+            with self._lock:
+                for invoice_id, when in rows:
+                    self._push(when, invoice_id)
+        return len(rows)
+
+    def load(self, batch_size=LOAD_BATCH_SIZE):
+        """Schedule every open invoice, reading the store a page at a time"""
+        cursor = None
+        while True:
+            invoices, cursor = self.store.page(cursor, batch_size)
+            with self._lock:
+                for invoice in invoices:
+                    when = self._first_reminder(invoice)
+                    if when is not None:
+                        self._push(when, invoice.id)
+            if cursor is None:
+                return
+
+    def pending(self):
+        return len(self._scheduled)
+
+    @staticmethod
+    def client_key(invoice):
+        return invoice.client_email or invoice.client_phone or invoice.client_name
+
+    def _last_sent(self, clients):
+        """{client: time of their last reminder} for the clients reminded within the window"""
+        clients = list(clients)
+        last_sent = {}
+        for i in range(0, len(clients), 1000):
+            chunk = clients[i:i + 1000]
+            last_sent.update(self._conn.execute(
+                f"SELECT client, last_sent FROM reminder_clients WHERE client IN ({', '.join('?' * len(chunk))})",
+                chunk
+            ).fetchall())
+        return last_sent
+
+    def tick(self):
+        """Queue every reminder that is due now; returns how many were queued"""
+        self._drain_handoff()
+        now = self._clock()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                when, invoice_id = heapq.heappop(self._heap)
+                if self._scheduled.get(invoice_id) == when:
+                    del self._scheduled[invoice_id]
+                    due.append(invoice_id)
+
+        invoices = [invoice for invoice in map(self.store.get, due)
+                    if invoice is not None and invoice.status != InvoiceStatus.PAID]
+        if not invoices:
+            return 0
+
+        send = []
+        conn = self._conn
+        with transaction(conn):
+            # Forget clients whose window has passed so the table stays small
+            conn.execute("DELETE FROM reminder_clients WHERE last_sent <= ?", (now - self.client_window,))
+            last_sent = self._last_sent({self.client_key(invoice) for invoice in invoices})
+            with self._lock:
+                for invoice in invoices:
+                    client = self.client_key(invoice)
+                    if client in last_sent:
+                        self._push(last_sent[client] + self.client_window, invoice.id)
+                        continue
+                    last_sent[client] = now
+                    self._push(now + self.repeat_days * 86400, invoice.id)
+                    send.append(invoice)
+            conn.executemany("INSERT OR REPLACE INTO reminder_clients (client, last_sent) VALUES (?, ?)",
+                             [(self.client_key(invoice), now) for invoice in send])
+
+        for invoice in send:
+            attachment = self.attach(invoice) if self.attach else None
+            self.queue.enqueue(invoice.channel.label, delivery_payload(invoice, 'reminder', attachment))
+
+        if send:
+            logger.info("Queued %d scheduled reminder(s)", len(send))
+        return len(send)
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.tick()
+            except Exception as e:
+                log_error('reminder_scheduler', e)
+
+    def start(self, interval=60):
+        """Load open invoices and tick every `interval` seconds on a daemon thread"""
+        if self._running_here():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,),
+                                        name='reminder-scheduler', daemon=True)
+        self._pid = os.getpid()
+        self.load()
+        self._drain_handoff()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
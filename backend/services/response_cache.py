@@ -0,0 +1,65 @@
+import hashlib
+import threading
+from functools import wraps
+
+from flask import Response, current_app, request
+
+_registry = {}
+
+class CachedJSON:
+    """A read-mostly JSON body serialised once and served with a strong ETag"""
+
+    def __init__(self, build, max_age):
+        self._build = build
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._entry = None
+
+    def _get(self):
+        entry = self._entry
+        if entry is None:
+            with self._lock:
+                entry = self._entry
+                if entry is None:
+                    body = current_app.json.dumps(self._build()).encode()
+                    etag = hashlib.sha256(body).hexdigest()[:32]
+                    entry = self._entry = (body, etag)
+        return entry
+
+    def invalidate(self):
+        with self._lock:
+            self._entry = None
+
+    def response(self):
+        body, etag = self._get()
+        headers = {'Cache-Control': f"public, max-age={self.max_age}"}
+        if request.if_none_match.contains(etag):
+            response = Response(status=304, headers=headers)
+        else:
+            response = Response(body, mimetype='application/json', headers=headers)
+        response.set_etag(etag)
+        return response
+
+def cached_json(key=None, max_age=300):
+    """Serve a view's JSON from a per-process cache with ETag/304 support.
+
+    The view takes no arguments and returns JSON-serialisable data; it runs
+    once and its bytes are reused until invalidate_cached_json(key) is
+    called. `key` defaults to the view's name.
+    """
+    def decorator(view):
+        entry = _registry[key or view.__name__] = CachedJSON(view, max_age)
+
+        @wraps(view)
+        def wrapper():
+            return entry.response()
+
+        wrapper.invalidate = entry.invalidate
+        return wrapper
+    return decorator
+
+def invalidate_cached_json(key=None):
+    """Drop one cached response, or all of them"""
+    entries = _registry.values() if key is None else [_registry[key]]
+    for entry in entries:
+        entry.invalidate()
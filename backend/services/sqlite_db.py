@@ -0,0 +1,70 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from services.metrics import metrics
+
+# Default location of the local SQLite database (relative to backend/, like logs/)
+DEFAULT_DB_PATH = os.getenv('INVOICE_DB_PATH', os.path.join('data', 'invoice_accelerator.db'))
+
+_local = threading.local()
+
+class TimedConnection(sqlite3.Connection):
+    """Connection that reports the time spent in each statement to the metrics"""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            metrics.record_query('sqlite', time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            metrics.record_query('sqlite', time.perf_counter() - start)
+
+def connect(path=None):
+    """Open a new SQLite connection tuned for concurrent readers and one writer"""
+    path = path or DEFAULT_DB_PATH
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory, exist_ok=True)
+
+    # isolation_level=None: autocommit, transactions are opened explicitly
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False,
+                           factory=TimedConnection)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA busy_timeout=30000')
+    return conn
+
+def get_connection(path=None):
+    """Return this thread's connection to the given database, opening it on first use"""
+    path = path or DEFAULT_DB_PATH
+    connections = getattr(_local, 'connections', None)
+    # SQLite connections must not be shared with a forked child process
+    if connections is None or _local.pid != os.getpid():
+        connections = _local.connections = {}
+        _local.pid = os.getpid()
+
+    conn = connections.get(path)
+    if conn is None:
+        conn = connections[path] = connect(path)
+    return conn
+
+@contextmanager
+def transaction(conn, immediate=True):
+    """Run a block inside BEGIN/COMMIT, rolling back on error"""
+    conn.execute('BEGIN IMMEDIATE' if immediate else 'BEGIN')
+    try:
+        yield conn
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
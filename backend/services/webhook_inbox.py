@@ -0,0 +1,172 @@
+import json
+import threading
+import time
+
+from logger import log_error, log_payment_operation
+from services.sqlite_db import get_connection, transaction
+
+# Attempts before an event that keeps failing is parked as 'failed'
+MAX_ATTEMPTS = 5
+
+def handle_sale_completed(conn, resource):
+    conn.execute(
+        "INSERT INTO paypal_sales (sale_id, amount, currency, billing_agreement_id, custom_id, completed_at) "
+        "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (sale_id) DO NOTHING",
+        (resource.get('id'), (resource.get('amount') or {}).get('total'),
+         (resource.get('amount') or {}).get('currency'), resource.get('billing_agreement_id'),
+         resource.get('custom') or resource.get('custom_id'), time.time())
+    )
+
+def _set_subscription_status(conn, resource, status):
+    conn.execute(
+        "INSERT INTO paypal_subscriptions (subscription_id, status, plan_id, custom_id, updated_at) "
+        "VALUES (?, ?, ?, ?, ?) ON CONFLICT (subscription_id) DO UPDATE SET "
+        "status = excluded.status, plan_id = COALESCE(excluded.plan_id, plan_id), "
+        "custom_id = COALESCE(excluded.custom_id, custom_id), updated_at = excluded.updated_at",
+        (resource.get('id'), status, resource.get('plan_id'), resource.get('custom_id'), time.time())
+    )
+
+def handle_subscription_activated(conn, resource):
+    _set_subscription_status(conn, resource, 'ACTIVE')
+
+def handle_subscription_cancelled(conn, resource):
+    _set_subscription_status(conn, resource, 'CANCELLED')
+
+EVENT_HANDLERS = {
+    'PAYMENT.SALE.COMPLETED': handle_sale_completed,
+    'BILLING.SUBSCRIPTION.ACTIVATED': handle_subscription_activated,
+    'BILLING.SUBSCRIPTION.CANCELLED': handle_subscription_cancelled,
+}
+
+class WebhookInbox:
+    """Durable inbox for PayPal webhook events.
+
+    receive() only records the event (keyed by PayPal's event id, so
+    redeliveries are ignored) and the HTTP request can be acknowledged
+    straight away. A consumer thread then applies pending events in
+    batches, one transaction per batch with a savepoint per event, so a
+    single bad event does not hold up the rest.
+    """
+
+    def __init__(self, path=None, handlers=None, batch_size=500):
+        self.path = path
+        self.handlers = handlers if handlers is not None else EVENT_HANDLERS
+        self.batch_size = batch_size
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        get_connection(path).executescript('''
+            CREATE TABLE IF NOT EXISTS webhook_inbox (
+                event_id TEXT PRIMARY KEY,
+                event_type TEXT,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                received_at REAL NOT NULL,
+                processed_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_webhook_inbox_pending
+                ON webhook_inbox (received_at) WHERE status = 'pending';
+            CREATE TABLE IF NOT EXISTS paypal_sales (
+                sale_id TEXT PRIMARY KEY,
+                amount TEXT,
+                currency TEXT,
+                billing_agreement_id TEXT,
+                custom_id TEXT,
+                completed_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS paypal_subscriptions (
+                subscription_id TEXT PRIMARY KEY,
+                status TEXT,
+                plan_id TEXT,
+                custom_id TEXT,
+                updated_at REAL
+            );
+        ''')
+
+    @property
+    def _conn(self):
+        return get_connection(self.path)
+
+    def receive(self, event):
+        """Store an event; returns False if it was already received"""
+        cursor = self._conn.execute(
+            "INSERT OR IGNORE INTO webhook_inbox (event_id, event_type, payload, received_at) "
+            "VALUES (?, ?, ?, ?)",
+            (event['id'], event.get('event_type'), json.dumps(event), time.time())
+        )
+        self._wakeup.set()
+        return cursor.rowcount == 1
+
+    def process_batch(self, limit=None):
+        """Apply up to `limit` pending events; returns how many were handled"""
+        conn = self._conn
+        with transaction(conn):
+            rows = conn.execute(
+                "SELECT event_id, event_type, payload, attempts FROM webhook_inbox "
+                "WHERE status = 'pending' ORDER BY received_at LIMIT ?",
+                (limit or self.batch_size,)
+            ).fetchall()
+
+            now = time.time()
+            for row in rows:
+                handler = self.handlers.get(row['event_type'])
+                conn.execute('SAVEPOINT event')
+                try:
+                    if handler:
+                        handler(conn, json.loads(row['payload']).get('resource') or {})
+                except Exception as e:
+                    conn.execute('ROLLBACK TO SAVEPOINT event')
+                    status = 'failed' if row['attempts'] + 1 >= MAX_ATTEMPTS else 'pending'
+                    conn.execute(
+                        "UPDATE webhook_inbox SET attempts = attempts + 1, last_error = ?, status = ? "
+                        "WHERE event_id = ?",
+                        (str(e), status, row['event_id'])
+                    )
+                    log_error(f"webhook {row['event_type']}", e)
+                else:
+                    conn.execute(
+                        "UPDATE webhook_inbox SET status = ?, processed_at = ? WHERE event_id = ?",
+                        ('processed' if handler else 'ignored', now, row['event_id'])
+                    )
+                conn.execute('RELEASE SAVEPOINT event')
+
+        if rows:
+            log_payment_operation('webhook_batch_processed', None, None, f"Events: {len(rows)}")
+        return len(rows)
+
+    def depth(self):
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM webhook_inbox WHERE status = 'pending'"
+        ).fetchone()[0]
+
+    def _run(self, poll_interval):
+        while not self._stop.is_set():
+            try:
+                handled = self.process_batch()
+            except Exception as e:
+                log_error('webhook_consumer', e)
+                handled = 0
+            # Keep draining while there is a backlog, otherwise wait for new events
+            if handled < self.batch_size:
+                self._wakeup.wait(poll_interval)
+                self._wakeup.clear()
+
+    def start(self, poll_interval=1.0):
+        if self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(poll_interval,),
+                                        name='webhook-consumer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+# Create global instance
+webhook_inbox = WebhookInbox()
@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+# The app's SQLite services open INVOICE_DB_PATH when they are imported
+os.environ['INVOICE_DB_PATH'] = os.path.join(tempfile.mkdtemp(), 'test.db')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
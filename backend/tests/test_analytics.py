@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+
+from app import app
+from records import Invoice
+from services.analytics import InvoiceAnalytics
+
+TODAY = date(2026, 10, 14)  # a Wednesday
+
+class InvoiceAnalyticsTest(unittest.TestCase):
+    def setUp(self):
+        self.analytics = InvoiceAnalytics(os.path.join(tempfile.mkdtemp(), 'analytics.db'))
+        self.analytics.rebuild(1, [
+            ('2026-10-20', 'Acme', 2, 30000),
+            ('2026-09-01', 'Acme', 1, 5000),
+            ('2026-06-01', 'Beta', 1, 70000),
+            (None, 'Gamma', 1, 100),
+        ])
+
+    def test_ageing_buckets(self):
+        ageing = self.analytics.ageing(1, today=TODAY)
+        self.assertEqual(ageing['not_due'], {'count': 2, 'amount_cents': 30000})
+        self.assertEqual(ageing['31-60'], {'count': 1, 'amount_cents': 5000})
+        self.assertEqual(ageing['90+'], {'count': 1, 'amount_cents': 70000})
+        self.assertEqual(ageing['no_due_date'], {'count': 1, 'amount_cents': 100})
+        self.assertEqual(ageing['0-30'], {'count': 0, 'amount_cents': 0})
+
+    def test_top_clients_largest_first(self):
+        self.assertEqual(self.analytics.top_clients(1, 2), [('Beta', 1, 70000), ('Acme', 3, 35000)])
+
+    def test_cash_in_by_week(self):
+        weeks = self.analytics.cash_in_by_week(1, weeks=2, today=TODAY)
+        self.assertEqual(weeks, [('2026-10-12', 0, 0), ('2026-10-19', 2, 30000)])
+
+    def test_cash_in_skips_malformed_due_dates(self):
+        # Stored before due dates were validated; it sorts inside the window as text
+        self.analytics.record_created(1, 'pending', '2026-10-2x', 'Acme', 100)
+        weeks = self.analytics.cash_in_by_week(1, weeks=2, today=TODAY)
+        self.assertEqual(weeks[1], ('2026-10-19', 2, 30000))
+
+    def test_changes_move_outstanding_totals(self):
+        self.analytics.record_many(1, [
+            (None, 'pending', '2026-10-20', 'Acme', 1000),
+            ('sent', 'paid', '2026-10-20', 'Acme', 15000),
+            ('paid', 'pending', '2026-10-20', 'Delta', 200),
+            ('pending', None, '2026-06-01', 'Beta', 70000),
+            (None, 'paid', '2026-10-20', 'Acme', 999),
+        ])
+        self.assertEqual(self.analytics.top_clients(1), [('Acme', 3, 21000), ('Delta', 1, 200), ('Gamma', 1, 100)])
+        self.assertEqual(self.analytics.ageing(1, today=TODAY)['90+'], {'count': 0, 'amount_cents': 0})
+
+    def test_changes_wait_for_the_first_build(self):
+        self.analytics.record_created(2, 'pending', '2026-10-20', 'Acme', 100)
+        self.assertEqual(self.analytics.top_clients(2), [])
+        self.analytics.ensure_built(2, lambda user_id: [('2026-10-20', 'Acme', 1, 100)])
+        self.assertEqual(self.analytics.top_clients(2), [('Acme', 1, 100)])
+
+class DueDateValidationTest(unittest.TestCase):
+    def test_create_rejects_non_iso_due_dates(self):
+        for due_date in ('2026-10-2x', '2026-02-30', '20261020', '2026-10-20T00:00', '20/10/2026'):
+            with self.assertRaisesRegex(ValueError, 'Invalid due date'):
+                Invoice.create('INV-1', 'Acme', 10, due_date=due_date)
+        self.assertEqual(Invoice.create('INV-1', 'Acme', 10, due_date='2026-10-20').due_date, '2026-10-20')
+
+    def test_create_invoice_route_rejects_bad_due_date(self):
+        client = app.test_client()
+        response = client.post('/api/create-invoice', json={
+            'clientName': 'Acme', 'amount': 10, 'dueDate': '2026-10-2x', 'channel': 'whatsapp'
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['error'], 'Invalid due date: 2026-10-2x')
+        response = client.get('/api/invoices/analytics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.get_json()['success'])
@@ -0,0 +1,85 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from app import app, delivery_queue, invoice_store
+from records import Channel, InvoiceStatus
+from services.bulk_import import import_invoices, read_csv_rows, read_ndjson_rows
+from services.invoice_numbers import InvoiceNumberAllocator
+from services.invoice_store import InMemoryInvoiceStore
+
+ROW = {'clientName': 'Bulk Client', 'clientEmail': 'bulk@example.com', 'amount': '99.50',
+       'dueDate': '2026-11-01'}
+
+class ImportInvoicesTest(unittest.TestCase):
+    def setUp(self):
+        self.store = InMemoryInvoiceStore()
+        self.allocator = InvoiceNumberAllocator(os.path.join(tempfile.mkdtemp(), 'numbers.db'))
+        self.batches = []
+
+    def run_import(self, rows, batch_size=1000):
+        return list(import_invoices(rows, self.store, self.allocator, batch_size, self.batches.append))
+
+    def test_valid_rows_are_created_as_sent_whatsapp_invoices(self):
+        [result] = self.run_import([ROW])
+        invoice = self.store.get(result['invoice_id'])
+        self.assertEqual((invoice.client_name, invoice.amount_cents, invoice.due_date),
+                         ('Bulk Client', 9950, '2026-11-01'))
+        self.assertEqual((invoice.status, invoice.channel), (InvoiceStatus.SENT, Channel.WHATSAPP))
+        self.assertEqual(self.batches, [[invoice]])
+
+    def test_each_row_reports_its_own_errors(self):
+        results = self.run_import([
+            ROW,
+            ValueError('Expecting value'),
+            ['not', 'an', 'object'],
+            dict(ROW, clientName=42),
+            dict(ROW, amount='-1', clientEmail='nope'),
+            dict(ROW, dueDate='2026-10-2x'),
+            dict(ROW, channel='fax'),
+            dict(ROW, channel='email'),
+        ])
+        self.assertEqual([result['row'] for result in results], list(range(1, 9)))
+        self.assertEqual([result['success'] for result in results],
+                         [True, False, False, False, False, False, False, True])
+        self.assertEqual(results[1]['errors'], ['Could not parse row: Expecting value'])
+        self.assertEqual(results[2]['errors'], ['Row must be an object'])
+        self.assertEqual(results[3]['errors'], ['client_name must be text, not int'])
+        self.assertEqual(results[4]['errors'], ['Valid client email is required', 'Invoice amount must be positive'])
+        self.assertEqual(results[5]['errors'], ['Invalid due date: 2026-10-2x'])
+        self.assertTrue(all('invoice_id' not in result for result in results if not result['success']))
+        self.assertEqual(self.store.get(results[7]['invoice_id']).channel, Channel.EMAIL)
+
+    def test_rejected_rows_use_no_numbers(self):
+        results = self.run_import([ROW, dict(ROW, dueDate='2026-10-2x'), ROW])
+        first, last = (int(results[i]['invoice_id'].rsplit('-', 1)[1]) for i in (0, 2))
+        self.assertEqual(last, first + 1)
+
+    def test_rows_are_created_in_batches(self):
+        results = self.run_import([ROW] * 5, batch_size=2)
+        self.assertEqual(len(set(result['invoice_id'] for result in results)), 5)
+        self.assertEqual([len(batch) for batch in self.batches], [2, 2, 1])
+        self.assertEqual(len(self.store), 5)
+
+    def test_csv_and_ndjson_readers(self):
+        csv_rows = list(read_csv_rows(io.BytesIO('\ufeffclientName,amount\nZoë,10\n'.encode())))
+        self.assertEqual(csv_rows, [{'clientName': 'Zoë', 'amount': '10'}])
+        ndjson_rows = list(read_ndjson_rows(io.BytesIO(b'{"amount": 1}\n\n{bad\n')))
+        self.assertEqual(ndjson_rows[0], {'amount': 1})
+        self.assertIsInstance(ndjson_rows[1], ValueError)
+
+class BulkInvoicesRouteTest(unittest.TestCase):
+    def test_created_invoices_are_queued_for_delivery(self):
+        client = app.test_client()
+        response = client.post('/api/bulk-invoices', json=[ROW, dict(ROW, amount='abc')])
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(lines[-1], {'summary': {'created': 1, 'failed': 1}})
+        invoice_id = lines[0]['invoice_id']
+        self.assertEqual(invoice_store.get(invoice_id).status, InvoiceStatus.SENT)
+
+        payloads = [json.loads(row['payload']) for row in delivery_queue._conn.execute(
+            "SELECT payload FROM delivery_jobs WHERE channel = 'whatsapp'")]
+        self.assertEqual([payload['kind'] for payload in payloads if payload['invoice_id'] == invoice_id],
+                         ['invoice'])
@@ -0,0 +1,95 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from app import app, invoice_numbers, invoice_store
+from records import Invoice
+from services.change_feed import InvoiceChangeFeed
+
+class InvoiceChangeFeedTest(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'feed.db')
+        self.feed = InvoiceChangeFeed(self.path)
+
+    def test_each_invoice_gets_its_own_revision(self):
+        self.assertEqual(self.feed.revision(1), 0)
+        self.assertEqual(self.feed.record(1, ['INV-A', 'INV-B', 'INV-A']), 2)
+        self.assertEqual(self.feed.changes_since(1, 0, 10), [('INV-A', 1, False), ('INV-B', 2, False)])
+        # Other users have revisions of their own
+        self.assertEqual(self.feed.record(2, ['INV-C']), 1)
+
+    def test_only_the_latest_change_is_kept(self):
+        self.feed.record(1, ['INV-A', 'INV-B'])
+        self.feed.record(1, ['INV-A'], deleted=True)
+        self.assertEqual(self.feed.changes_since(1, 0, 10), [('INV-B', 2, False), ('INV-A', 3, True)])
+        self.assertEqual(self.feed.changes_since(1, 2, 10), [('INV-A', 3, True)])
+
+    def test_changes_are_paged_oldest_first(self):
+        self.feed.record(1, [f"INV-{i}" for i in range(5)])
+        self.assertEqual([change[1] for change in self.feed.changes_since(1, 1, 2)], [2, 3])
+
+    def test_recording_nothing_keeps_the_revision(self):
+        self.feed.record(1, ['INV-A'])
+        self.assertEqual(self.feed.record(1, []), 1)
+
+    def test_integer_id_column_is_migrated_to_text(self):
+        path = os.path.join(tempfile.mkdtemp(), 'old.db')
+        conn = sqlite3.connect(path)
+        conn.executescript('''
+            CREATE TABLE invoice_changes (
+                user_id INTEGER NOT NULL,
+                invoice_id INTEGER NOT NULL,
+                revision INTEGER NOT NULL,
+                deleted INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, invoice_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX idx_invoice_changes_revision ON invoice_changes (user_id, revision);
+            INSERT INTO invoice_changes VALUES (1, 'INV-A', 1, 0), (1, 42, 2, 1);
+        ''')
+        conn.close()
+
+        feed = InvoiceChangeFeed(path)
+        columns = {row[1]: row[2] for row in feed._conn.execute("PRAGMA table_info(invoice_changes)")}
+        self.assertEqual(columns['invoice_id'], 'TEXT')
+        self.assertEqual(feed.changes_since(1, 0, 10), [('INV-A', 1, False), ('42', 2, True)])
+
+class InvoiceChangesRouteTest(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+        self.invoice = Invoice.create(invoice_numbers.next_number(), 'Feed Client', 120,
+                                      due_date='2026-11-01', channel='whatsapp', status='pending')
+        self.revision = self.client.get('/api/invoices?limit=1').get_json()['revision']
+
+    def changes(self, since):
+        feed = self.client.get(f"/api/invoices/changes?since={since}").get_json()
+        self.assertTrue(feed['success'])
+        return feed
+
+    def test_status_change_is_synced(self):
+        invoice_store.add(self.invoice)
+        response = self.client.post(f"/api/invoices/{self.invoice.id}/status", json={'status': 'sent'})
+        self.assertEqual(response.get_json()['invoice']['status'], 'sent')
+
+        feed = self.changes(self.revision)
+        self.assertEqual([(i['id'], i['status']) for i in feed['invoices']], [(self.invoice.id, 'sent')])
+        self.assertEqual(feed['deleted'], [])
+        self.assertEqual(set(feed['stats']), {'total_invoices', 'pending_count', 'sent_count',
+                                               'paid_count', 'archived_count'})
+        self.assertFalse(feed['has_more'])
+        self.assertEqual(self.changes(feed['revision'])['invoices'], [])
+
+    def test_invalid_status_and_unknown_invoice(self):
+        invoice_store.add(self.invoice)
+        response = self.client.post(f"/api/invoices/{self.invoice.id}/status", json={'status': 'lost'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/invoices/INV-NONE/status', json={'status': 'paid'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_revision_ahead_of_the_server_resets(self):
+        feed = self.changes(self.revision + 1000)
+        self.assertTrue(feed['reset'])
+        self.assertEqual(feed['revision'], self.revision)
+
+    def test_negative_revision(self):
+        self.assertEqual(self.client.get('/api/invoices/changes?since=-1').status_code, 400)
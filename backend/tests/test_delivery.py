@@ -0,0 +1,180 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from services.delivery import ChannelAdapter, DeliveryError, DeliveryQueue, DeliveryWorkerPool
+
+class FakeAdapter(ChannelAdapter):
+    """Records what it sends; fails with the queued errors first"""
+
+    def __init__(self, name='fake', concurrency=1, errors=(), delay=0):
+        self.name = name
+        self.concurrency = concurrency
+        self.errors = list(errors)
+        self.delay = delay
+        self.sent = []
+        self.in_flight = 0
+        self.most_in_flight = 0
+        self._lock = threading.Lock()
+
+    def send(self, payload):
+        with self._lock:
+            self.in_flight += 1
+            self.most_in_flight = max(self.most_in_flight, self.in_flight)
+            error = self.errors.pop(0) if self.errors else None
+        try:
+            time.sleep(self.delay)
+            if error:
+                raise error
+            with self._lock:
+                self.sent.append(payload)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+class DeliveryQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.queue = DeliveryQueue(os.path.join(tempfile.mkdtemp(), 'delivery.db'), lease_seconds=0.2)
+
+    def test_claimed_job_is_hidden_until_the_lease_expires(self):
+        job_id = self.queue.enqueue('fake', {'n': 1})
+        self.assertEqual([job['id'] for job in self.queue.claim('fake')], [job_id])
+        self.assertEqual(self.queue.claim('fake'), [])
+        time.sleep(0.25)
+        # The worker holding it is presumed dead
+        self.assertEqual([job['id'] for job in self.queue.claim('fake')], [job_id])
+
+    def test_claim_is_per_channel(self):
+        self.queue.enqueue('email', {'n': 1})
+        self.assertEqual(self.queue.claim('whatsapp'), [])
+        self.assertEqual(len(self.queue.claim('email')), 1)
+        self.assertEqual(self.queue.depth('email'), 1)
+        self.assertEqual(self.queue.depth('whatsapp'), 0)
+
+    def test_enqueue_many(self):
+        seen = self.queue.generation
+        self.queue.enqueue_many([('email', {'n': 1}), ('whatsapp', {'n': 2}), ('email', {'n': 3})])
+        self.assertNotEqual(self.queue.generation, seen)
+        self.assertEqual([job['payload'] for job in self.queue.claim('email', limit=5)], [{'n': 1}, {'n': 3}])
+        self.assertEqual(self.queue.depth('whatsapp'), 1)
+
+    def test_wait_for_work_returns_for_jobs_enqueued_after_seen(self):
+        seen = self.queue.generation
+        self.queue.enqueue('fake', {'n': 1})
+        start = time.monotonic()
+        self.queue.wait_for_work(5, seen)
+        self.assertLess(time.monotonic() - start, 1)
+
+class DeliveryWorkerPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.queue = DeliveryQueue(os.path.join(tempfile.mkdtemp(), 'delivery.db'))
+
+    def pool(self, adapter, **options):
+        return DeliveryWorkerPool(self.queue, {adapter.name: adapter}, **options)
+
+    def test_retryable_failure_is_retried_after_a_backoff(self):
+        adapter = FakeAdapter(errors=[DeliveryError('busy')])
+        pool = self.pool(adapter, base_delay=60)
+        self.queue.enqueue('fake', {'n': 1})
+        before = time.time()
+        self.assertEqual(pool.run_once(), 1)
+        self.assertEqual(adapter.sent, [])
+
+        row = self.queue._conn.execute("SELECT attempts, available_at, last_error FROM delivery_jobs").fetchone()
+        self.assertEqual(row['attempts'], 1)
+        self.assertEqual(row['last_error'], 'busy')
+        # base_delay * 2**0 with +/-20% jitter
+        self.assertGreaterEqual(row['available_at'], before + 60 * 0.8)
+        self.assertLessEqual(row['available_at'], time.time() + 60 * 1.2)
+        self.assertEqual(pool.run_once(), 0)
+
+        self.queue._conn.execute("UPDATE delivery_jobs SET available_at = 0")
+        self.assertEqual(pool.run_once(), 1)
+        self.assertEqual(adapter.sent, [{'n': 1}])
+        self.assertEqual(self.queue.depth(), 0)
+
+    def test_backoff_doubles_up_to_the_cap(self):
+        pool = self.pool(FakeAdapter(), base_delay=5, max_delay=60)
+        for attempts, expected in ((0, 5), (1, 10), (3, 40), (4, 60), (20, 60)):
+            delay = pool.backoff(attempts)
+            self.assertGreaterEqual(delay, expected * 0.8)
+            self.assertLessEqual(delay, expected * 1.2)
+
+    def test_job_is_dead_lettered_after_its_last_attempt(self):
+        adapter = FakeAdapter(errors=[DeliveryError('down')] * 2)
+        pool = self.pool(adapter)
+        self.queue.enqueue('fake', {'n': 1}, max_attempts=2)
+        pool.run_once()
+        self.queue._conn.execute("UPDATE delivery_jobs SET available_at = 0")
+        pool.run_once()
+
+        self.assertEqual(self.queue.depth(), 0)
+        [dead] = self.queue.dead_letters()
+        self.assertEqual((dead['attempts'], dead['last_error'], dead['channel']), (2, 'down', 'fake'))
+        self.assertEqual(adapter.sent, [])
+
+    def test_permanent_failure_is_dead_lettered_at_once(self):
+        pool = self.pool(FakeAdapter(errors=[DeliveryError('no recipient', retryable=False)]))
+        self.queue.enqueue('fake', {'n': 1}, max_attempts=5)
+        pool.run_once()
+        self.assertEqual(self.queue.depth(), 0)
+        self.assertEqual(self.queue.dead_letters()[0]['attempts'], 1)
+
+    def test_workers_send_every_job_once_within_the_concurrency_limit(self):
+        adapter = FakeAdapter(concurrency=3, delay=0.02)
+        # A long poll interval: only enqueue wakeups get the jobs sent in time
+        pool = self.pool(adapter, poll_interval=30)
+        pool.start()
+        try:
+            time.sleep(0.05)
+            for n in range(24):
+                self.queue.enqueue('fake', {'n': n})
+            self.assertTrue(wait_until(lambda: len(adapter.sent) == 24))
+        finally:
+            pool.stop(timeout=1)
+
+        self.assertEqual(sorted(payload['n'] for payload in adapter.sent), list(range(24)))
+        self.assertLessEqual(adapter.most_in_flight, 3)
+        self.assertGreater(adapter.most_in_flight, 1)
+        self.assertEqual(self.queue.depth('fake'), 0)
+
+    def test_worker_survives_an_adapter_that_breaks_the_queue(self):
+        adapter = FakeAdapter()
+        pool = self.pool(adapter, poll_interval=0.05)
+        complete = self.queue.complete
+        failures = [RuntimeError('database is locked')]
+
+        def flaky_complete(job):
+            if failures:
+                raise failures.pop()
+            complete(job)
+
+        self.queue.complete = flaky_complete
+        pool.start()
+        try:
+            self.queue.enqueue('fake', {'n': 1})
+            self.queue.enqueue('fake', {'n': 2})
+            self.assertTrue(wait_until(lambda: len(adapter.sent) == 2))
+            self.assertTrue(all(thread.is_alive() for thread in pool._threads))
+        finally:
+            pool.stop(timeout=1)
+
+    def test_stop_wakes_idle_workers(self):
+        pool = self.pool(FakeAdapter(concurrency=2), poll_interval=30)
+        pool.start()
+        threads = list(pool._threads)
+        time.sleep(0.05)
+        start = time.monotonic()
+        pool.stop(timeout=5)
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertFalse(any(thread.is_alive() for thread in threads))
@@ -0,0 +1,60 @@
+import json
+import unittest
+
+from app import app, delivery_queue, invoice_store
+
+INVOICE = {'client_name': 'Mail Client', 'client_email': 'mail@example.com',
+           'invoice_amount': '250', 'due_date': '2026-11-01', 'days_overdue': 3}
+
+class GenerateEmailTest(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_batch_rejects_a_locale_that_is_not_text(self):
+        for locale in (['en-ZA'], {'code': 'en-ZA'}, 1):
+            response = self.client.post('/generate_email', json=[dict(INVOICE, id='INV-1', locale=locale)])
+            self.assertEqual(response.status_code, 400)
+            [invalid] = response.get_json()['invalid']
+            self.assertEqual(invalid['errors'], [f"locale must be text, not {type(locale).__name__}"])
+
+    def test_batch_renders_each_email(self):
+        response = self.client.post('/generate_email', json=[dict(INVOICE, id='INV-1', locale='en-ZA'),
+                                                             dict(INVOICE, id='INV-2', tone='firm')])
+        self.assertEqual(response.status_code, 200)
+        emails = response.get_json()['emails']
+        self.assertIn('INV-1', emails[0])
+        self.assertIn('within 7 days', emails[1])
+
+class SendReminderTest(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+        response = self.client.post('/generate_email', json=INVOICE)
+        self.invoice_id = response.get_json()['invoice_id']
+        self.email = response.get_json()['email']
+
+    def queued(self):
+        rows = delivery_queue._conn.execute("SELECT payload FROM delivery_jobs").fetchall()
+        return [payload for payload in (json.loads(row['payload']) for row in rows)
+                if payload['invoice_id'] == self.invoice_id]
+
+    def test_sends_the_generated_email_and_marks_it_sent(self):
+        self.assertEqual(invoice_store.get(self.invoice_id).status.label, 'pending')
+        response = self.client.post('/api/send-reminder', json={'invoice_id': self.invoice_id,
+                                                                'message': self.email})
+        self.assertEqual(response.status_code, 200)
+        [payload] = self.queued()
+        self.assertEqual((payload['kind'], payload['to'], payload['message']),
+                         ('reminder', 'mail@example.com', self.email))
+        self.assertEqual(invoice_store.get(self.invoice_id).status.label, 'sent')
+
+    def test_without_a_message_the_standard_reminder_is_sent(self):
+        self.client.post('/api/send-reminder', json={'invoice_id': self.invoice_id})
+        [payload] = self.queued()
+        self.assertNotEqual(payload['message'], self.email)
+        self.assertIn(self.invoice_id, payload['message'])
+
+    def test_bad_requests(self):
+        for body, status in (([self.invoice_id], 400), ({'invoice_id': self.invoice_id, 'message': ['hi']}, 400),
+                             ({'invoice_id': [self.invoice_id]}, 404), ({'invoice_id': 'INV-NONE'}, 404)):
+            self.assertEqual(self.client.post('/api/send-reminder', json=body).status_code, status, body)
+        self.assertEqual(self.queued(), [])
@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from records import Invoice, InvoiceStatus
+from services.invoice_archive import InvoiceArchive
+from services.invoice_store import InMemoryInvoiceStore, SQLiteInvoiceStore
+
+NOW = datetime(2026, 10, 14)
+
+def paid(invoice_id, paid_at, amount=100):
+    return Invoice.create(invoice_id, 'Archive Client', amount, due_date='2026-01-01',
+                          status='paid', paid_at=paid_at)
+
+class ReopeningStore(InMemoryInvoiceStore):
+    """Re-opens one invoice between the archive's read and its removal"""
+
+    def __init__(self, reopen):
+        super().__init__()
+        self.reopen = reopen
+
+    def remove_many(self, invoice_ids, status=None):
+        if self.reopen:
+            self.update_status(self.reopen, InvoiceStatus.PENDING)
+            self.reopen = None
+        return super().remove_many(invoice_ids, status)
+
+class InvoiceArchiveTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.archive = InvoiceArchive(os.path.join(directory, 'archive.db'))
+        self.stores = [InMemoryInvoiceStore(), SQLiteInvoiceStore(os.path.join(directory, 'store.db'))]
+
+    def fill(self, store):
+        store.add_many([
+            paid('INV-A', '2026-05-03T10:00:00', 100),
+            paid('INV-B', '2026-05-20T10:00:00', 250),
+            paid('INV-C', '2026-06-01T10:00:00', 400),
+            # Paid too recently to archive
+            paid('INV-D', '2026-10-01T10:00:00', 800),
+            Invoice.create('INV-E', 'Archive Client', 50, due_date='2026-01-01'),
+        ])
+
+    def test_settled_invoices_move_to_the_archive(self):
+        for store in self.stores:
+            archive = InvoiceArchive(os.path.join(tempfile.mkdtemp(), 'archive.db'))
+            self.fill(store)
+            removed = []
+            self.assertEqual(archive.archive_settled(store, days=90, batch_size=2, now=NOW,
+                                                     on_removed=removed.extend), 3)
+            self.assertEqual(sorted(invoice.id for invoice in removed), ['INV-A', 'INV-B', 'INV-C'])
+            self.assertEqual(sorted(store.get_many(['INV-A', 'INV-B', 'INV-C', 'INV-D', 'INV-E'])),
+                             ['INV-D', 'INV-E'])
+
+            self.assertEqual(archive.count(), 3)
+            self.assertEqual(archive.count('pending'), 0)
+            self.assertEqual(archive.paid_by_month(), {'2026-05': (2, 35000), '2026-06': (1, 40000)})
+            self.assertEqual(archive.paid_by_month('2026-06'), {'2026-06': (1, 40000)})
+            self.assertEqual(archive.get('INV-B'), paid('INV-B', '2026-05-20T10:00:00', 250))
+            self.assertIsNone(archive.get('INV-D'))
+            self.assertEqual(sorted(archive.get_many(['INV-A', 'INV-C', 'INV-X'])), ['INV-A', 'INV-C'])
+            self.assertEqual([invoice.id for invoice in archive.month('2026-05')], ['INV-A', 'INV-B'])
+            # Nothing is left to move
+            self.assertEqual(archive.archive_settled(store, days=90, now=NOW), 0)
+
+    def test_append_skips_archived_invoices_and_rejects_open_ones(self):
+        invoice = paid('INV-A', '2026-05-03T10:00:00')
+        self.assertEqual(self.archive.append([invoice]), 1)
+        self.assertEqual(self.archive.append([invoice]), 0)
+        self.assertEqual(self.archive.count(), 1)
+        with self.assertRaises(ValueError):
+            self.archive.append([invoice.with_status('sent')])
+
+    def test_invoice_reopened_before_removal_stays_only_in_the_store(self):
+        store = ReopeningStore('INV-B')
+        self.fill(store)
+        removed = []
+        self.assertEqual(self.archive.archive_settled(store, days=90, now=NOW, on_removed=removed.extend), 2)
+        self.assertEqual(sorted(invoice.id for invoice in removed), ['INV-A', 'INV-C'])
+
+        self.assertEqual(store.get('INV-B').status, InvoiceStatus.PENDING)
+        self.assertIsNone(self.archive.get('INV-B'))
+        self.assertEqual(self.archive.count(), 2)
+        self.assertEqual(self.archive.paid_by_month(), {'2026-05': (1, 10000), '2026-06': (1, 40000)})
+        self.assertEqual([invoice.id for invoice in self.archive.month('2026-05')], ['INV-A'])
+
+        # Paid again, it is archived as it is now, not as it was
+        store.remove_many(['INV-B'])
+        store.add(paid('INV-B', '2026-06-10T10:00:00', 300))
+        self.assertEqual(self.archive.archive_settled(store, days=90, now=NOW), 1)
+        self.assertEqual(self.archive.get('INV-B').amount_cents, 30000)
+        self.assertEqual(self.archive.paid_by_month(), {'2026-05': (1, 10000), '2026-06': (2, 70000)})
+
+    def test_blocks_are_append_only(self):
+        self.archive.append([paid('INV-A', '2026-05-03T10:00:00')])
+        with self.assertRaises(Exception):
+            self.archive._conn.execute("DELETE FROM invoice_archive_blocks")
@@ -0,0 +1,61 @@
+import json
+import unittest
+from unittest import mock
+
+from app import app, invoice_numbers, invoice_store
+from records import Invoice
+
+class InvoiceListingTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.created = [
+            Invoice.create(invoice_numbers.next_number(), f"Listing {i}", 10 + i,
+                           due_date='2026-11-01', channel='whatsapp', status='sent')
+            for i in range(7)
+        ]
+        for invoice in cls.created:
+            invoice_store.add(invoice)
+
+    def setUp(self):
+        self.client = app.test_client()
+
+    def pages(self, limit):
+        ids, cursor = [], None
+        while True:
+            query = {'limit': limit, **({'cursor': cursor} if cursor else {})}
+            page = self.client.get('/api/invoices', query_string=query).get_json()
+            self.assertTrue(page['success'])
+            self.assertIsInstance(page['revision'], int)
+            self.assertLessEqual(len(page['invoices']), limit)
+            ids += [invoice['id'] for invoice in page['invoices']]
+            if not page['has_more']:
+                self.assertIsNone(page['next_cursor'])
+                return ids
+            cursor = page['next_cursor']
+
+    def test_pages_list_every_invoice_once_newest_first(self):
+        ids = self.pages(3)
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(len(ids), len(invoice_store))
+        created = [invoice.id for invoice in self.created]
+        self.assertEqual([i for i in ids if i in created], created[::-1])
+
+    def test_stream_matches_pages(self):
+        # Small store pages, so the stream has to carry on across several
+        with mock.patch('app.STREAM_BATCH_SIZE', 2):
+            response = self.client.get('/api/invoices?stream=1')
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        streamed = [json.loads(line)['id'] for line in response.data.decode().splitlines()]
+        self.assertEqual(streamed, self.pages(500))
+
+    def test_stream_continues_after_cursor(self):
+        first = self.client.get('/api/invoices?limit=2').get_json()
+        response = self.client.get('/api/invoices', query_string={'cursor': first['next_cursor']},
+                                   headers={'Accept': 'application/x-ndjson'})
+        streamed = [json.loads(line)['id'] for line in response.data.decode().splitlines()]
+        self.assertEqual(streamed, self.pages(500)[2:])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/invoices?cursor=abc')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.get_json()['success'])
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+
+from app import app, invoice_numbers
+from services.invoice_numbers import InvoiceNumberAllocator
+
+def sequence(invoice_number):
+    return int(invoice_number.rsplit('-', 1)[1])
+
+class InvoiceNumberAllocatorTest(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'numbers.db')
+        self.today = datetime(2026, 10, 14)
+
+    def allocator(self, block_size=3):
+        return InvoiceNumberAllocator(self.path, block_size=block_size, clock=lambda: self.today)
+
+    def test_numbers_are_sequenced_per_day(self):
+        allocator = self.allocator()
+        self.assertEqual([allocator.next_number() for _ in range(4)],
+                         ['INV-20261014-1', 'INV-20261014-2', 'INV-20261014-3', 'INV-20261014-4'])
+        self.today = datetime(2026, 10, 15)
+        self.assertEqual(allocator.next_number(), 'INV-20261015-1')
+
+    def test_allocators_share_the_counter(self):
+        first, second = self.allocator(), self.allocator()
+        self.assertEqual(first.next_number(), 'INV-20261014-1')
+        # The second allocator's block starts after the first's
+        self.assertEqual(second.next_number(), 'INV-20261014-4')
+        self.assertEqual(second.allocate_block(2), ['INV-20261014-7', 'INV-20261014-8'])
+        self.assertEqual(first.next_number(), 'INV-20261014-2')
+
+    def test_threads_never_share_a_number(self):
+        allocator = self.allocator(block_size=5)
+        numbers = []
+
+        def allocate():
+            numbers.extend(allocator.next_number() for _ in range(50))
+
+        threads = [threading.Thread(target=allocate) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(numbers)), 200)
+
+class CreateInvoiceNumberingTest(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_rejected_invoices_use_no_number(self):
+        before = sequence(invoice_numbers.next_number())
+        for path, body in (
+            ('/api/create-invoice', {'clientName': 'Acme', 'amount': 10, 'dueDate': '2026-10-2x'}),
+            ('/api/create-invoice', {'clientName': 'Acme', 'amount': 'ten', 'dueDate': '2026-11-01'}),
+            ('/api/create-invoice', {'clientName': 'Acme', 'amount': 10, 'channel': 'fax'}),
+            ('/generate_email', {'client_name': 'Acme', 'client_email': 'a@example.com',
+                                 'invoice_amount': '10', 'due_date': '2026-10-2x'}),
+        ):
+            self.assertEqual(self.client.post(path, json=body).status_code, 400, body)
+        self.assertEqual(sequence(invoice_numbers.next_number()), before + 1)
+
+    def test_created_invoice_gets_the_next_number(self):
+        before = sequence(invoice_numbers.next_number())
+        response = self.client.post('/api/create-invoice', json={'clientName': 'Acme', 'amount': 10,
+                                                                 'dueDate': '2026-11-01'})
+        self.assertEqual(sequence(response.get_json()['invoice_id']), before + 1)
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+
+from app import app, invoice_numbers, invoice_store
+from records import Invoice
+from services.invoice_pdf import PdfRenderer, cache_key, pdf_fields
+
+def make_invoice(invoice_id='INV-PDF-1', amount=120):
+    return Invoice.create(invoice_id, 'Pdf Client', amount, client_email='pdf@example.com',
+                          due_date='2026-11-01', created_at='2026-10-01T09:00:00', status='pending')
+
+class PdfRendererTest(unittest.TestCase):
+    def setUp(self):
+        self.renderer = PdfRenderer(tempfile.mkdtemp(), workers=1)
+
+    def tearDown(self):
+        self.renderer.shutdown()
+
+    def test_cache_key_follows_the_printed_values(self):
+        invoice = make_invoice()
+        self.assertEqual(cache_key(pdf_fields(invoice)), cache_key(pdf_fields(make_invoice())))
+        self.assertNotEqual(cache_key(pdf_fields(invoice)), cache_key(pdf_fields(make_invoice(amount=121))))
+        # The status is not printed, so paying an invoice keeps its PDF
+        self.assertEqual(cache_key(pdf_fields(invoice)), cache_key(pdf_fields(invoice.with_status('paid'))))
+
+    def test_render_writes_a_pdf_once(self):
+        path, key = self.renderer.render(make_invoice())
+        self.assertEqual(path, self.renderer.path(key))
+        with open(path, 'rb') as f:
+            self.assertTrue(f.read().startswith(b'%PDF-1.4'))
+        mtime = os.stat(path).st_mtime_ns
+        self.assertEqual(self.renderer.render(make_invoice()), (path, key))
+        self.assertEqual(os.stat(path).st_mtime_ns, mtime)
+
+    def test_render_many_counts_only_new_pdfs(self):
+        invoices = [make_invoice(f"INV-PDF-{i}") for i in range(3)]
+        self.renderer.render(invoices[0])
+        # A repeated invoice is rendered once
+        self.assertEqual(self.renderer.render_many(invoices + invoices[1:2]), 2)
+        self.assertEqual(self.renderer.render_many(invoices), 0)
+
+class RenderInvoicePdfsRouteTest(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_ids_must_be_a_list_of_strings(self):
+        for body in ({'invoice_ids': [[1]]}, {'invoice_ids': [{'id': 1}]}, {'invoice_ids': [1]},
+                     {'invoice_ids': 'INV-1'}, {}, ['INV-1']):
+            response = self.client.post('/api/invoices/pdfs', json=body)
+            self.assertEqual(response.status_code, 400, body)
+            self.assertFalse(response.get_json()['success'])
+
+    def test_unknown_ids_are_reported_missing(self):
+        invoice = Invoice.create(invoice_numbers.next_number(), 'Pdf Client', 10, due_date='2026-11-01')
+        invoice_store.add(invoice)
+        response = self.client.post('/api/invoices/pdfs', json={'invoice_ids': [invoice.id, 'INV-NONE', invoice.id]})
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual(body['missing'], ['INV-NONE'])
+        self.assertEqual(body['rendered'] + body['cached'], 1)
@@ -0,0 +1,30 @@
+import unittest
+
+from app import app, invoice_numbers, invoice_store
+from records import Invoice
+
+class InvoiceStatsTest(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def stats(self):
+        response = self.client.get('/api/invoice-stats').get_json()
+        self.assertTrue(response['success'])
+        return response['stats']
+
+    def test_counts_follow_creates_and_status_changes(self):
+        before = self.stats()
+        invoice = Invoice.create(invoice_numbers.next_number(), 'Stats Client', 50,
+                                 due_date='2026-11-01', channel='whatsapp', status='pending')
+        invoice_store.add(invoice)
+        after_create = self.stats()
+        self.assertEqual(after_create['total_invoices'], before['total_invoices'] + 1)
+        self.assertEqual(after_create['pending_count'], before['pending_count'] + 1)
+
+        self.client.post(f"/api/invoices/{invoice.id}/status", json={'status': 'paid'})
+        after_paid = self.stats()
+        self.assertEqual(after_paid['total_invoices'], after_create['total_invoices'])
+        self.assertEqual(after_paid['pending_count'], before['pending_count'])
+        self.assertEqual(after_paid['paid_count'], before['paid_count'] + 1)
+        self.assertEqual(after_paid['total_invoices'], after_paid['pending_count'] + after_paid['sent_count']
+                         + after_paid['paid_count'])
@@ -0,0 +1,136 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from records import Invoice, InvoiceStatus
+from services import invoice_store
+from services.invoice_store import InMemoryInvoiceStore, SQLiteInvoiceStore
+
+def make_invoice(n, amount=100, due_date='2026-11-01', status='pending', paid_at=None, name='Store Client'):
+    return Invoice.create(f"INV-{n}", name, amount, client_email=f"c{n}@example.com", due_date=due_date,
+                          status=status, paid_at=paid_at)
+
+class InvoiceStoreTests:
+    """Run against both backends by the subclasses below"""
+
+    def make_store(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.store = self.make_store()
+
+    def ids(self, invoices):
+        return [invoice.id for invoice in invoices]
+
+    def test_add_and_get(self):
+        invoice = self.store.add(make_invoice(1))
+        self.assertEqual(self.store.get('INV-1'), invoice)
+        self.assertIsNone(self.store.get('INV-2'))
+        with self.assertRaises(Exception):
+            self.store.add(make_invoice(1))
+
+    def test_add_many_is_all_or_nothing(self):
+        self.store.add(make_invoice(1))
+        with self.assertRaises(Exception):
+            self.store.add_many([make_invoice(2), make_invoice(1)])
+        self.assertIsNone(self.store.get('INV-2'))
+        self.assertEqual(len(self.store), 1)
+
+    def test_status_changes_stamp_paid_at(self):
+        self.store.add(make_invoice(1))
+        paid = self.store.update_status('INV-1', 'paid')
+        self.assertEqual(paid.status, InvoiceStatus.PAID)
+        self.assertIsNotNone(paid.paid_at)
+        self.assertEqual(self.store.count('paid'), 1)
+        reopened = self.store.update_status('INV-1', 'sent')
+        self.assertIsNone(reopened.paid_at)
+        self.assertEqual((self.store.count('paid'), self.store.count('sent')), (0, 1))
+        self.assertEqual(self.store.paid_before('9999'), [])
+        self.assertIsNone(self.store.update_status('INV-NONE', 'paid'))
+
+    def test_paid_before_oldest_payment_first(self):
+        self.store.add_many([
+            make_invoice(1, status='paid', paid_at='2026-03-01T00:00:00'),
+            make_invoice(2, status='paid', paid_at='2026-01-01T00:00:00'),
+            make_invoice(3, status='paid', paid_at='2026-09-01T00:00:00'),
+            # Paid before payment times were kept
+            make_invoice(4, status='paid'),
+            make_invoice(5),
+        ])
+        self.store.add(make_invoice(6, status='paid', paid_at='2026-02-01T00:00:00'))
+        self.assertEqual(self.ids(self.store.paid_before('2026-06-01')), ['INV-2', 'INV-6', 'INV-1'])
+        self.assertEqual(self.ids(self.store.paid_before('2026-06-01', limit=2)), ['INV-2', 'INV-6'])
+        self.assertEqual(self.ids(self.store.paid_before('2026-01-01')), [])
+
+    def test_remove_many(self):
+        self.store.add_many([make_invoice(n, amount=n, due_date=f"2026-11-{n:02d}") for n in range(1, 6)])
+        self.store.update_status('INV-2', 'paid')
+        self.assertEqual(self.store.remove_many(['INV-1', 'INV-2', 'INV-NONE'], 'paid'), 1)
+        self.assertEqual(self.store.remove_many(['INV-4']), 1)
+        self.assert_holds(['INV-1', 'INV-3', 'INV-5'])
+
+    def test_remove_many_past_the_bisect_limit(self):
+        self.store.add_many([make_invoice(n, amount=n % 7, due_date=f"2026-11-{n % 28 + 1:02d}")
+                             for n in range(60)])
+        with mock.patch.object(invoice_store, 'BISECT_REMOVE_LIMIT', 5):
+            self.assertEqual(self.store.remove_many([f"INV-{n}" for n in range(0, 60, 2)]), 30)
+            self.assertEqual(self.store.remove_many(['INV-1', 'INV-3']), 2)
+        self.assert_holds([f"INV-{n}" for n in range(5, 60, 2)])
+
+    def assert_holds(self, ids):
+        """Every index lists exactly `ids`"""
+        self.assertEqual(len(self.store), len(ids))
+        self.assertEqual(sorted(self.store.get_many(ids + ['INV-GONE'])), sorted(ids))
+        invoices, cursor = self.store.page(None, 1000)
+        self.assertEqual(sorted(self.ids(invoices)), sorted(ids))
+        self.assertEqual(sorted(self.ids(self.store.due_between())), sorted(ids))
+        self.assertEqual(sorted(self.ids(self.store.search(amount_min=0, limit=1000))), sorted(ids))
+        self.assertEqual(sorted(self.ids(self.store.search('store client', limit=1000))), sorted(ids))
+
+    def test_page_newest_first(self):
+        self.store.add_many([make_invoice(n) for n in range(5)])
+        invoices, cursor = self.store.page(None, 2)
+        self.assertEqual(self.ids(invoices), ['INV-4', 'INV-3'])
+        self.store.add(make_invoice(5))
+        invoices, cursor = self.store.page(cursor, 2)
+        self.assertEqual(self.ids(invoices), ['INV-2', 'INV-1'])
+        invoices, cursor = self.store.page(cursor, 2)
+        self.assertEqual((self.ids(invoices), cursor), (['INV-0'], None))
+
+    def test_due_dates_and_amounts(self):
+        self.store.add_many([make_invoice(1, 50, '2026-11-03'), make_invoice(2, 50, '2026-11-01', status='paid'),
+                             make_invoice(3, 70, '2026-11-02'), make_invoice(4, 50, None)])
+        self.assertEqual(self.ids(self.store.due_between('2026-11-02')), ['INV-3', 'INV-1'])
+        self.assertEqual(self.ids(self.store.due_between(end='2026-11-02', limit=1)), ['INV-2'])
+        self.assertEqual(self.ids(self.store.open_by_amount(5000)), ['INV-1', 'INV-4'])
+        self.assertEqual(self.ids(self.store.by_status('paid')), ['INV-2'])
+
+class InMemoryInvoiceStoreTest(InvoiceStoreTests, unittest.TestCase):
+    def make_store(self):
+        return InMemoryInvoiceStore()
+
+class SQLiteInvoiceStoreTest(InvoiceStoreTests, unittest.TestCase):
+    def make_store(self):
+        return SQLiteInvoiceStore(os.path.join(tempfile.mkdtemp(), 'store.db'))
+
+    def test_paid_at_column_is_added_without_inventing_payment_times(self):
+        path = os.path.join(tempfile.mkdtemp(), 'old.db')
+        conn = sqlite3.connect(path)
+        conn.executescript('''
+            CREATE TABLE invoices (
+                id TEXT PRIMARY KEY, client_name TEXT, amount_cents INTEGER NOT NULL, due_date TEXT,
+                status INTEGER NOT NULL, tone INTEGER NOT NULL, channel INTEGER NOT NULL,
+                business_name TEXT, client_email TEXT, client_phone TEXT, created_at TEXT,
+                days_overdue INTEGER NOT NULL DEFAULT 0
+            );
+            INSERT INTO invoices VALUES ('INV-1', 'Old Client', 100, '2025-01-01', 2, 1, 0,
+                                         NULL, NULL, NULL, '2025-01-01T00:00:00', 0);
+        ''')
+        conn.close()
+
+        store = SQLiteInvoiceStore(path)
+        invoice = store.get('INV-1')
+        self.assertEqual((invoice.status, invoice.paid_at), (InvoiceStatus.PAID, None))
+        self.assertEqual(store.paid_before('9999'), [])
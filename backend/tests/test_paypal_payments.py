@@ -0,0 +1,45 @@
+import unittest
+
+from app import app
+from routes.paypal_payments import PLANS
+from services.webhook_inbox import webhook_inbox
+
+class PayPalRoutesTest(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_plans(self):
+        response = self.client.get('/api/paypal/plans')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), PLANS)
+
+    def test_config(self):
+        response = self.client.get('/api/paypal/config')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.get_json()), {'paypal_configured', 'mode', 'test_mode'})
+
+    def test_webhook_stores_each_event_once(self):
+        event = {'id': 'WH-TEST-1', 'event_type': 'PAYMENT.SALE.COMPLETED', 'resource': {}}
+        depth = webhook_inbox.depth()
+        for _ in range(2):
+            response = self.client.post('/api/paypal/webhook', json=event)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json(), {'success': True})
+        self.assertEqual(webhook_inbox.depth(), depth + 1)
+
+    def test_webhook_requires_event_id(self):
+        response = self.client.post('/api/paypal/webhook', json={'event_type': 'PAYMENT.SALE.COMPLETED'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.get_json()['success'])
+
+    def test_webhook_rejects_non_object_bodies(self):
+        for body in ([{'id': 'WH-TEST-2'}], 'WH-TEST-2', None):
+            response = self.client.post('/api/paypal/webhook', json=body)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.get_json()['error'], 'Expected a JSON object')
+
+    def test_no_checkout_routes(self):
+        # Checkout needs user accounts, which the app does not set up
+        for path in ('/api/paypal/create-subscription', '/api/paypal/create-payment',
+                     '/api/paypal/execute-payment'):
+            self.assertEqual(self.client.post(path, json={}).status_code, 404)
@@ -0,0 +1,74 @@
+import json
+import unittest
+from dataclasses import replace
+
+from app import app
+from records import INVOICE_FIELDS, Channel, Invoice, InvoiceStatus, Tone, dumps_invoices, to_cents
+
+def make_invoice(**fields):
+    return Invoice.create('INV-1', 'Zoë "Z" Ndlovu', '1299.5', client_email='zoe@example.com',
+                          due_date='2026-11-01', channel='email', **fields)
+
+class InvoiceJsonTest(unittest.TestCase):
+    def test_to_json_matches_to_dict(self):
+        invoice = make_invoice(tone='firm', days_overdue=4)
+        self.assertEqual(json.loads(invoice.to_json()), invoice.to_dict())
+        self.assertIn('"invoice_amount":1299.50', invoice.to_json())
+
+    def test_selected_fields_in_order(self):
+        invoice = make_invoice()
+        self.assertEqual(invoice.to_json(['status', 'id']), '{"status":"pending","id":"INV-1"}')
+        self.assertEqual(invoice.to_json(['days_overdue']), '{"days_overdue":0}')
+        with self.assertRaisesRegex(ValueError, 'Unknown invoice fields: secret'):
+            invoice.to_json(['id', 'secret'])
+
+    def test_dumps_invoices(self):
+        invoices = [make_invoice(), replace(make_invoice(), id=7, client_phone='+27 82 000 0000')]
+        self.assertEqual(json.loads(dumps_invoices(invoices)), [invoice.to_dict() for invoice in invoices])
+        self.assertEqual(dumps_invoices([]), '[]')
+
+    def test_non_text_values_are_refused(self):
+        with self.assertRaisesRegex(ValueError, 'Invoice client_name must be text, not int'):
+            replace(make_invoice(), client_name=42).to_json()
+        with self.assertRaisesRegex(ValueError, 'Invoice id must be text, not bool'):
+            replace(make_invoice(), id=True).to_json()
+
+class InvoiceRowTest(unittest.TestCase):
+    def test_round_trip(self):
+        invoice = make_invoice(tone='firm', status='paid', paid_at='2026-10-01T09:00:00')
+        row = invoice.to_row()
+        self.assertEqual(len(row), len(INVOICE_FIELDS))
+        self.assertEqual(row[4:7], (2, 2, 1))
+        self.assertEqual(Invoice.from_row(row), invoice)
+        # As decoded from an archive block
+        self.assertEqual(Invoice.from_row(json.loads(json.dumps(row))), invoice)
+
+class CoerceTest(unittest.TestCase):
+    def test_members_codes_and_labels(self):
+        self.assertIs(InvoiceStatus.coerce(InvoiceStatus.PAID), InvoiceStatus.PAID)
+        self.assertIs(InvoiceStatus.coerce(2), InvoiceStatus.PAID)
+        self.assertIs(InvoiceStatus.coerce('Paid'), InvoiceStatus.PAID)
+        self.assertIs(Channel.coerce('whatsapp'), Channel.WHATSAPP)
+
+    def test_one_message_for_every_bad_value(self):
+        for value in ('bogus', None, 7, True, ['paid'], 1.0):
+            with self.assertRaises(ValueError) as raised:
+                InvoiceStatus.coerce(value)
+            self.assertEqual(str(raised.exception), f"Invalid status: {value} (expected pending, sent or paid)")
+        with self.assertRaisesRegex(ValueError, r'^Invalid tone: loud \(expected friendly, professional or firm\)$'):
+            Tone.coerce('loud')
+        with self.assertRaisesRegex(ValueError, r'^Invalid channel: fax \(expected whatsapp or email\)$'):
+            Channel.coerce('fax')
+
+    def test_status_route_reports_the_message(self):
+        response = app.test_client().post('/api/invoices/INV-1/status', json={})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['error'], 'Invalid status: None (expected pending, sent or paid)')
+
+class ToCentsTest(unittest.TestCase):
+    def test_amounts(self):
+        self.assertEqual(to_cents('1299.505'), 129951)
+        self.assertEqual(to_cents(10), 1000)
+        for amount in ('abc', None, 'nan', 'inf'):
+            with self.assertRaises(ValueError):
+                to_cents(amount)
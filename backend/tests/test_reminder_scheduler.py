@@ -0,0 +1,106 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from records import Invoice
+from services.invoice_store import InMemoryInvoiceStore
+from services.reminder_scheduler import ReminderScheduler
+
+DAY = 86400
+DUE = '2026-11-01'
+FIRST_REMINDER = datetime(2026, 10, 29).timestamp()  # three days before DUE
+
+class FakeQueue:
+    def __init__(self):
+        self.jobs = []
+
+    def enqueue(self, channel, payload):
+        self.jobs.append((channel, payload))
+
+def invoice(invoice_id, email='client@example.com', status='pending', due_date=DUE):
+    return Invoice.create(invoice_id, 'Reminder Client', 100, client_email=email, due_date=due_date,
+                          channel='email', status=status)
+
+class ReminderSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'scheduler.db')
+        self.store = InMemoryInvoiceStore()
+        self.queue = FakeQueue()
+        self.now = FIRST_REMINDER
+
+    def scheduler(self, **options):
+        return ReminderScheduler(self.store, self.queue, clock=lambda: self.now, path=self.path, **options)
+
+    def reminded(self):
+        return [payload['invoice_id'] for _, payload in self.queue.jobs]
+
+    def test_load_pages_through_the_store(self):
+        self.store.add_many([invoice(f"INV-{i}", f"c{i}@example.com") for i in range(5)] +
+                            [invoice('INV-PAID', status='paid'), invoice('INV-NODATE', due_date=None)])
+        scheduler = self.scheduler()
+        scheduler.load(batch_size=2)
+        self.assertEqual(scheduler.pending(), 5)
+
+    def test_reminders_repeat_until_paid(self):
+        self.store.add(invoice('INV-1'))
+        scheduler = self.scheduler()
+        scheduler.load()
+        self.now -= 1
+        self.assertEqual(scheduler.tick(), 0)
+        self.now += 1
+        self.assertEqual(scheduler.tick(), 1)
+        self.assertEqual(scheduler.tick(), 0)
+
+        self.now += 7 * DAY
+        self.assertEqual(scheduler.tick(), 1)
+        self.store.update_status('INV-1', 'paid')
+        self.now += 7 * DAY
+        self.assertEqual(scheduler.tick(), 0)
+        self.assertEqual(self.reminded(), ['INV-1', 'INV-1'])
+
+    def test_a_client_gets_one_reminder_per_window(self):
+        self.store.add_many([invoice('INV-1'), invoice('INV-2'), invoice('INV-3', 'other@example.com')])
+        scheduler = self.scheduler()
+        scheduler.load()
+        self.assertEqual(scheduler.tick(), 2)
+        self.assertIn('INV-3', self.reminded())
+        self.now += DAY - 1
+        self.assertEqual(scheduler.tick(), 0)
+        self.now += 1
+        self.assertEqual(scheduler.tick(), 1)
+        self.assertEqual(sorted(self.reminded()), ['INV-1', 'INV-2', 'INV-3'])
+
+    def test_the_limit_is_shared_through_sqlite(self):
+        self.store.add_many([invoice('INV-1'), invoice('INV-2')])
+        first = self.scheduler()
+        first.schedule(self.store.get('INV-1'))
+        self.assertEqual(first.tick(), 1)
+
+        # Another process (or a restart) runs the scheduler within the window
+        second = self.scheduler()
+        second.schedule(self.store.get('INV-2'))
+        self.now += 60
+        self.assertEqual(second.tick(), 0)
+        self.now = FIRST_REMINDER + DAY
+        self.assertEqual(second.tick(), 1)
+        self.assertEqual(self.reminded(), ['INV-1', 'INV-2'])
+
+    def test_expired_clients_are_forgotten(self):
+        self.store.add_many([invoice('INV-1', 'a@example.com'),
+                             invoice('INV-2', 'b@example.com', due_date='2026-11-05')])
+        scheduler = self.scheduler()
+        scheduler.load()
+        scheduler.tick()
+        self.now += 4 * DAY
+        scheduler.tick()
+        clients = [row[0] for row in scheduler._conn.execute("SELECT client FROM reminder_clients")]
+        self.assertEqual(clients, ['b@example.com'])
+
+    def test_other_processes_hand_invoices_over(self):
+        self.store.add(invoice('INV-1'))
+        # Not running in this process, so the invoice goes through the handoff table
+        self.scheduler().schedule(self.store.get('INV-1'))
+        scheduler = self.scheduler()
+        self.assertEqual(scheduler.tick(), 1)
+        self.assertEqual(scheduler.pending(), 1)
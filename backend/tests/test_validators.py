@@ -0,0 +1,86 @@
+import unittest
+from unittest import mock
+
+import validators
+from validators import validate_field_types, validate_invoice_batch, validate_invoice_data
+
+VALID = {'client_name': 'Acme Ltd', 'client_email': 'billing@acme.co.za',
+         'invoice_amount': '120.50', 'due_date': '2026-11-01'}
+
+def edge_cases():
+    """Rows that each break VALID in one or more ways"""
+    rows = [dict(VALID), {}]
+    for name in (None, '', ' ', 'X', ' X ', '\u00a0X\u00a0', '\u3000\u3000', 'Zoë Ndlovu', '名前'):
+        rows.append(dict(VALID, client_name=name))
+    for email in (None, '', 'acme', 'a@b', 'zoë@acme.co.za', 'billing@acme.co.za ', 'a@b.c'):
+        rows.append(dict(VALID, client_email=email))
+    for amount in (None, '', 'abc', '0', '-5', '-0.0', '1e308', '1e400', '-1e400', 'nan', ' 7 ',
+                   '١٢', 0, -5, 10 ** 400, 1e308, float('nan'), float('inf'), 3):
+        rows.append(dict(VALID, invoice_amount=amount))
+    for due_date in (None, '', ' ', '2026-10-2x'):
+        rows.append(dict(VALID, due_date=due_date))
+    for channel in ('', 'fax', 'WHATSAPP', '📠'):
+        rows.append(dict(VALID, channel=channel))
+    rows.append({'client_name': 'X', 'client_email': 'nope', 'invoice_amount': '-1', 'due_date': ''})
+    rows.append({'client_name': 'Acme', 'invoice_amount': None})
+    return rows
+
+def expected_errors(rows):
+    return {i: validate_invoice_data(row) for i, row in enumerate(rows) if validate_invoice_data(row)}
+
+def batch_errors(rows, column=list):
+    # The columns bulk import builds from its rows
+    return validate_invoice_batch(
+        column([row.get('client_name') for row in rows]),
+        column([row.get('client_email') for row in rows]),
+        column([row.get('invoice_amount', 0) for row in rows]),
+        column([row.get('due_date') for row in rows]),
+    )
+
+class ValidateInvoiceBatchTest(unittest.TestCase):
+    def setUp(self):
+        self.rows = edge_cases()
+        # Type errors are reported before either validator runs
+        self.assertEqual([row for row in self.rows if validate_field_types(row)], [])
+
+    def assert_matches_scalar(self, rows, column=list):
+        error_mask, errors = batch_errors(rows, column)
+        self.assertEqual(errors, expected_errors(rows))
+        self.assertEqual([bool(flag) for flag in error_mask], [i in errors for i in range(len(rows))])
+
+    def test_lists_without_numpy(self):
+        with mock.patch.object(validators, 'np', None):
+            self.assert_matches_scalar(self.rows)
+
+    @unittest.skipIf(validators.np is None, 'numpy is not installed')
+    def test_lists_with_numpy(self):
+        self.assert_matches_scalar(self.rows)
+
+    @unittest.skipIf(validators.np is None, 'numpy is not installed')
+    def test_numpy_arrays(self):
+        np = validators.np
+        fields = ('client_name', 'client_email', 'due_date')
+        rows = [row for row in self.rows if all(isinstance(row.get(field), str) for field in fields)]
+        text = [row for row in rows if isinstance(row['invoice_amount'], str)]
+        numeric = [row for row in rows if isinstance(row['invoice_amount'], (int, float))
+                   and abs(row['invoice_amount']) < 2 ** 63]
+
+        def array(values):
+            return np.array(values, dtype=float if all(isinstance(v, (int, float)) for v in values) else str)
+
+        self.assert_matches_scalar(text, array)
+        self.assert_matches_scalar(numeric, array)
+
+    @unittest.skipIf(validators.np is None, 'numpy is not installed')
+    def test_datetime_due_dates(self):
+        np = validators.np
+        rows = [dict(VALID), dict(VALID, due_date=None), dict(VALID, client_name='X', due_date=None)]
+        due_dates = np.array(['2026-11-01', 'NaT', 'NaT'], dtype='datetime64[D]')
+        _, errors = validate_invoice_batch([row['client_name'] for row in rows],
+                                           [row['client_email'] for row in rows],
+                                           [row['invoice_amount'] for row in rows], due_dates)
+        self.assertEqual(errors, expected_errors(rows))
+
+    def test_columns_must_have_the_same_length(self):
+        with self.assertRaises(ValueError):
+            validate_invoice_batch(['Acme'], [], ['1'], ['2026-11-01'])
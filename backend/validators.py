@@ -1,9 +1,20 @@
 import re
 from flask import jsonify
 
+from records import TEXT_FIELDS
+
+# NumPy is optional and not in requirements.txt. validate_invoice_batch is
+# supported on plain lists, which is what bulk import passes; with NumPy
+# installed it also accepts arrays and combines the checks vectorised.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
 def validate_email(email):
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+    return EMAIL_PATTERN.match(email) is not None
 
 def validate_user_registration(data):
     errors = []
@@ -32,7 +43,7 @@ def validate_invoice_data(data):
         amount = float(data.get('invoice_amount', 0))
         if amount <= 0:
             errors.append('Invoice amount must be positive')
-    except (ValueError, TypeError):
+    except (ValueError, TypeError, OverflowError):
         errors.append('Valid invoice amount is required')
     
     if not data.get('due_date'):
@@ -40,6 +51,24 @@ def validate_invoice_data(data):
     
     return errors
 
+# Invoice fields that must be text (or missing); the checks above assume as much
+INVOICE_TEXT_FIELDS = TEXT_FIELDS + ('tone', 'channel')
+
+def validate_field_types(data):
+    """Messages for invoice fields of the wrong type, e.g. a number where a name belongs.
+
+    Run it before validate_invoice_data, which expects text fields to be text.
+    """
+    errors = [
+        f"{name} must be text, not {type(data[name]).__name__}"
+        for name in INVOICE_TEXT_FIELDS
+        if data.get(name) is not None and not isinstance(data[name], str)
+    ]
+    amount = data.get('invoice_amount')
+    if isinstance(amount, bool) or not isinstance(amount, (str, int, float, type(None))):
+        errors.append(f"invoice_amount must be a number or text, not {type(amount).__name__}")
+    return errors
+
 def validate_payment_data(data):
     errors = []
     
@@ -47,4 +76,97 @@ def validate_payment_data(data):
     if data.get('planId') not in valid_plans:
         errors.append('Valid plan ID is required')
     
-    return errors
\ No newline at end of file
+    return errors
+
+def _as_list(column):
+    return column.tolist() if hasattr(column, 'tolist') else list(column)
+
+def _is_array(column, kinds):
+    return np is not None and isinstance(column, np.ndarray) and column.dtype.kind in kinds
+
+def _name_errors(names):
+    if _is_array(names, 'U'):
+        return np.char.str_len(np.char.strip(names)) < 2
+    return [not name or len(name.strip()) < 2 for name in _as_list(names)]
+
+def _email_errors(emails):
+    match = EMAIL_PATTERN.match
+    # Clients repeat across an import, so each distinct address is matched once
+    seen = {}
+    errors = []
+    for email in _as_list(emails):
+        try:
+            invalid = seen[email]
+        except KeyError:
+            invalid = seen[email] = not email or match(email) is None
+        errors.append(invalid)
+    return errors
+
+def _amount_errors(amounts):
+    """Return (not_positive, not_a_number) flags per row"""
+    if _is_array(amounts, 'biuf'):
+        # NaN compares False, just like float('nan') <= 0
+        return amounts <= 0, np.zeros(len(amounts), dtype=bool)
+
+    not_positive = []
+    not_a_number = []
+    for amount in _as_list(amounts):
+        try:
+            not_positive.append(float(amount) <= 0)
+            not_a_number.append(False)
+        except (ValueError, TypeError, OverflowError):
+            not_positive.append(False)
+            not_a_number.append(True)
+    return not_positive, not_a_number
+
+def _due_date_errors(due_dates):
+    if _is_array(due_dates, 'M'):
+        return np.isnat(due_dates)
+    if _is_array(due_dates, 'U'):
+        return np.char.str_len(due_dates) == 0
+    return [not due_date for due_date in _as_list(due_dates)]
+
+_CHECK_MESSAGES = (
+    'Valid client name is required',
+    'Valid client email is required',
+    'Invoice amount must be positive',
+    'Valid invoice amount is required',
+    'Due date is required',
+)
+# Messages for every combination of failed checks, in validate_invoice_data order
+_BATCH_MESSAGES = [
+    tuple(message for bit, message in enumerate(_CHECK_MESSAGES) if code & (1 << bit))
+    for code in range(1 << len(_CHECK_MESSAGES))
+]
+
+def validate_invoice_batch(client_names, client_emails, invoice_amounts, due_dates):
+    """Validate many invoices given as columns (lists, or NumPy arrays if installed).
+
+    Applies the same rules as validate_invoice_data to every row and returns
+    (error_mask, errors): error_mask[i] is True when row i is invalid, and
+    errors maps the index of each invalid row to exactly the list
+    validate_invoice_data would return for it. A None amount counts as a
+    present-but-invalid value. In datetime64 due date columns, NaT marks a
+    missing date.
+    """
+    n = len(client_names)
+    if not (len(client_emails) == len(invoice_amounts) == len(due_dates) == n):
+        raise ValueError('All columns must have the same length')
+
+    checks = [_name_errors(client_names), _email_errors(client_emails)]
+    checks.extend(_amount_errors(invoice_amounts))
+    checks.append(_due_date_errors(due_dates))
+    if np is not None:
+        # One bit per check; a row's code selects its precomputed message list
+        codes = np.zeros(n, dtype=np.uint8)
+        for bit, check in enumerate(checks):
+            codes |= np.asarray(check, dtype=np.uint8) << bit
+        error_mask = codes != 0
+        rows = zip(np.flatnonzero(error_mask).tolist(), codes[error_mask].tolist())
+    else:
+        codes = [sum(flag << bit for bit, flag in enumerate(row)) for row in zip(*checks)]
+        error_mask = [code != 0 for code in codes]
+        rows = ((i, code) for i, code in enumerate(codes) if code)
+
+    errors = {i: list(_BATCH_MESSAGES[code]) for i, code in rows}
+    return error_mask, errors
@@ -1,13 +1,49 @@
-import React from 'react';
+import React, { useEffect, useState } from 'react';
 import { motion } from 'framer-motion';
 
+const sampleStats = [
+  { label: 'Total Invoices', value: '1,247', change: '+12%', trend: 'up' },
+  { label: 'Revenue', value: 'R 89,420', change: '+23%', trend: 'up' },
+  { label: 'Overdue', value: '23', change: '-5%', trend: 'down' },
+  { label: 'Avg. Payment Time', value: '14 days', change: '-8%', trend: 'down' }
+];
+
+const AGEING_LABELS = [
+  ['not_due', 'Not yet due'],
+  ['0-30', '0–30 days'],
+  ['31-60', '31–60 days'],
+  ['61-90', '61–90 days'],
+  ['90+', '90+ days']
+];
+
+const formatRand = (amount) =>
+  `R ${amount.toLocaleString('en-ZA', { minimumFractionDigits: 2, maximumFractionDigits: 2 })}`;
+
 const AnalyticsDashboard = () => {
-  const stats = [
-    { label: 'Total Invoices', value: '1,247', change: '+12%', trend: 'up' },
-    { label: 'Revenue', value: 'R 89,420', change: '+23%', trend: 'up' },
-    { label: 'Overdue', value: '23', change: '-5%', trend: 'down' },
-    { label: 'Avg. Payment Time', value: '14 days', change: '-8%', trend: 'down' }
-  ];
+  // Signed-in users see their own figures; visitors see the sample ones
+  const [analytics, setAnalytics] = useState(null);
+
+  useEffect(() => {
+    fetch('/api/invoices/analytics', { credentials: 'include' })
+      .then((response) => (response.ok ? response.json() : null))
+      .then((result) => {
+        if (result && result.success) setAnalytics(result.analytics);
+      })
+      .catch(() => {});
+  }, []);
+
+  const overdueCount = analytics
+    ? AGEING_LABELS.slice(1).reduce((sum, [key]) => sum + analytics.ageing[key].count, 0)
+    : 0;
+  const stats = analytics
+    ? [
+        { label: 'Outstanding', value: formatRand(analytics.outstanding_total) },
+        { label: 'Unpaid Invoices', value: analytics.outstanding_count.toLocaleString() },
+        { label: 'Overdue', value: overdueCount.toLocaleString() },
+        { label: '90+ Days Overdue', value: formatRand(analytics.ageing['90+'].amount) }
+      ]
+    : sampleStats;
+  const largestWeek = analytics ? Math.max(1, ...analytics.cash_in.map((week) => week.amount)) : 1;
 
   return (
     <section className="py-20 px-4 sm:px-6 lg:px-8 bg-white dark:bg-gray-900">
@@ -40,31 +76,96 @@ const AnalyticsDashboard = () => {
                 {stat.value}
               </h3>
               <p className="text-gray-600 dark:text-gray-300 mb-2">{stat.label}</p>
-              <span className={`text-sm font-semibold ${
-                stat.trend === 'up' ? 'text-green-500' : 'text-red-500'
-              }`}>
-                {stat.change}
-              </span>
+              {stat.change && (
+                <span className={`text-sm font-semibold ${
+                  stat.trend === 'up' ? 'text-green-500' : 'text-red-500'
+                }`}>
+                  {stat.change}
+                </span>
+              )}
             </motion.div>
           ))}
         </div>
 
-        {/* Chart Placeholder */}
-        <motion.div
-          initial={{ opacity: 0, y: 50 }}
-          whileInView={{ opacity: 1, y: 0 }}
-          transition={{ duration: 0.6, delay: 0.4 }}
-          className="glass dark:glass-dark p-8 rounded-2xl"
-        >
-          <div className="h-64 flex items-center justify-center">
-            <div className="text-center">
-              <div className="text-6xl mb-4">📊</div>
-              <p className="text-gray-600 dark:text-gray-300">
-                Interactive revenue chart coming soon...
-              </p>
-            </div>
+        {analytics ? (
+          <div className="grid grid-cols-1 lg:grid-cols-3 gap-6">
+            {/* Ageing */}
+            <motion.div
+              initial={{ opacity: 0, y: 50 }}
+              whileInView={{ opacity: 1, y: 0 }}
+              transition={{ duration: 0.6, delay: 0.4 }}
+              className="glass dark:glass-dark p-6 rounded-2xl"
+            >
+              <h3 className="text-lg font-bold text-gray-900 dark:text-white mb-4">Ageing</h3>
+              {AGEING_LABELS.map(([key, label]) => (
+                <div key={key} className="flex justify-between py-1 text-gray-600 dark:text-gray-300">
+                  <span>{label} ({analytics.ageing[key].count})</span>
+                  <span className="font-semibold">{formatRand(analytics.ageing[key].amount)}</span>
+                </div>
+              ))}
+            </motion.div>
+
+            {/* Outstanding per client */}
+            <motion.div
+              initial={{ opacity: 0, y: 50 }}
+              whileInView={{ opacity: 1, y: 0 }}
+              transition={{ duration: 0.6, delay: 0.5 }}
+              className="glass dark:glass-dark p-6 rounded-2xl"
+            >
+              <h3 className="text-lg font-bold text-gray-900 dark:text-white mb-4">Largest Outstanding</h3>
+              {analytics.clients.length === 0 && (
+                <p className="text-gray-600 dark:text-gray-300">Nothing outstanding.</p>
+              )}
+              {analytics.clients.map((client) => (
+                <div key={client.client_name} className="flex justify-between py-1 text-gray-600 dark:text-gray-300">
+                  <span className="truncate mr-4">{client.client_name} ({client.count})</span>
+                  <span className="font-semibold">{formatRand(client.amount)}</span>
+                </div>
+              ))}
+            </motion.div>
+
+            {/* Expected cash-in */}
+            <motion.div
+              initial={{ opacity: 0, y: 50 }}
+              whileInView={{ opacity: 1, y: 0 }}
+              transition={{ duration: 0.6, delay: 0.6 }}
+              className="glass dark:glass-dark p-6 rounded-2xl"
+            >
+              <h3 className="text-lg font-bold text-gray-900 dark:text-white mb-4">Expected Cash-in by Week</h3>
+              {analytics.cash_in.map((week) => (
+                <div key={week.week_start} className="py-1 text-gray-600 dark:text-gray-300">
+                  <div className="flex justify-between text-sm">
+                    <span>Week of {week.week_start}</span>
+                    <span className="font-semibold">{formatRand(week.amount)}</span>
+                  </div>
+                  <div className="h-2 bg-gray-200 dark:bg-gray-700 rounded">
+                    <div
+                      className="h-2 bg-green-500 rounded"
+                      style={{ width: `${(week.amount / largestWeek) * 100}%` }}
+                    />
+                  </div>
+                </div>
+              ))}
+            </motion.div>
           </div>
-        </motion.div>
+        ) : (
+          /* Chart Placeholder */
+          <motion.div
+            initial={{ opacity: 0, y: 50 }}
+            whileInView={{ opacity: 1, y: 0 }}
+            transition={{ duration: 0.6, delay: 0.4 }}
+            className="glass dark:glass-dark p-8 rounded-2xl"
+          >
+            <div className="h-64 flex items-center justify-center">
+              <div className="text-center">
+                <div className="text-6xl mb-4">📊</div>
+                <p className="text-gray-600 dark:text-gray-300">
+                  Interactive revenue chart coming soon...
+                </p>
+              </div>
+            </div>
+          </motion.div>
+        )}
       </div>
     </section>
   );